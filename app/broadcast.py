@@ -5,16 +5,41 @@ main.py 在 lifespan 中註冊廣播函數，其他模組透過 emit_* 函數調
 
 重要：所有 emit_* 函數會將事件加入隊列，必須呼叫 flush_events() 或
 commit_and_notify(db) 才會實際發送。這確保 Socket 通知在 DB commit 之後。
+
+看板收到不帶 delta 的 order_update / payment_update 或 chat_message 後會重新查詢，
+為了避免尖峰時段的重複查詢，COALESCE_EVENTS 內的事件以合併鍵
+（事件類型、房間，加上 COALESCE_FIELDS 的 action / payment_status / user_id）分組：
+- 同一請求內合併鍵相同的事件只送最後一筆
+- 跨請求以 settings.broadcast_debounce_ms 節流：距上次發送超過時間窗立即發送，
+  時間窗內的事件合併成一筆，在時間窗結束時送出最新的一筆
+
+帶有看板增量（board_feed 的 seq / delta）的事件每一筆都要依序送達，
+合併會造成序號缺口讓看板退回重新查詢，因此一律立即發送、不合併。
 """
+import asyncio
 import logging
+import time
 from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Any, Awaitable, Callable, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+
 logger = logging.getLogger("jaba.broadcast")
 
+# 可合併的事件類型（看板收到後只會重新載入資料，不需要每一筆都送）
+# store_change 帶有店家名稱等通知內容，每一筆都要送出，不合併
+COALESCE_EVENTS = {"order_update", "payment_update", "chat_message"}
+# 合併鍵包含的欄位：不同動作 / 付款狀態 / 使用者的事件通知內容不同，不能互相取代
+COALESCE_FIELDS = ("action", "payment_status", "user_id")
+
+
+def _is_coalescable(event_type: str, data: Dict[str, Any]) -> bool:
+    """可合併的事件（帶 delta 的看板增量事件除外）"""
+    return event_type in COALESCE_EVENTS and "delta" not in data
+
 # 廣播函數類型定義
 BroadcastFunc = Callable[[str, dict], Awaitable[None]]
 
@@ -51,6 +76,28 @@ def _queue_event(event_type: str, room: str, data: dict) -> None:
     logger.debug(f"Event queued: {event_type} for room {room}")
 
 
+# ===== 跨請求節流（debounce）=====
+
+
+CoalesceKey = Tuple[Optional[str], ...]
+
+
+def _coalesce_key(event: PendingEvent) -> CoalesceKey:
+    """合併鍵：(事件類型, 房間, *COALESCE_FIELDS 的值)"""
+    return (event.event_type, event.room, *(event.data.get(f) for f in COALESCE_FIELDS))
+
+
+# 合併鍵 -> 上次發送時間
+_last_sent: Dict[CoalesceKey, float] = {}
+# 合併鍵 -> 等待時間窗結束後發送的最新事件
+_trailing: Dict[CoalesceKey, PendingEvent] = {}
+_trailing_tasks: Set[asyncio.Task] = set()
+# 超過此數量時清理過期的 _last_sent
+_LAST_SENT_PRUNE_SIZE = 1000
+
+_stats = {"queued": 0, "coalesced": 0, "debounced": 0, "sent": 0}
+
+
 # ===== 廣播函數存儲（由 main.py 注入）=====
 
 
@@ -112,18 +159,93 @@ async def flush_events() -> None:
     if not queue:
         return
 
-    for event in queue:
-        broadcaster = _event_broadcasters.get(event.event_type)
-        if broadcaster:
-            try:
-                await broadcaster(event.room, event.data)
-                logger.debug(f"Event sent: {event.event_type} to room {event.room}")
-            except Exception as e:
-                logger.error(f"Failed to broadcast {event.event_type}: {e}")
+    events = _coalesce(queue)
+    queue.clear()
+
+    for event in events:
+        if _is_coalescable(event.event_type, event.data) and settings.broadcast_debounce_ms > 0:
+            await _send_debounced(event)
         else:
-            logger.warning(f"No broadcaster registered for event type: {event.event_type}")
+            await _dispatch(event)
 
-    queue.clear()
+
+def _coalesce(queue: List[PendingEvent]) -> List[PendingEvent]:
+    """合併鍵相同的可合併事件只保留最後一筆（位置也移到最後一筆的位置）"""
+    _stats["queued"] += len(queue)
+    last_index = {
+        _coalesce_key(event): i
+        for i, event in enumerate(queue)
+        if _is_coalescable(event.event_type, event.data)
+    }
+    events = [
+        event for i, event in enumerate(queue)
+        if not _is_coalescable(event.event_type, event.data)
+        or last_index[_coalesce_key(event)] == i
+    ]
+    _stats["coalesced"] += len(queue) - len(events)
+    return events
+
+
+async def _dispatch(event: PendingEvent) -> None:
+    """實際呼叫廣播函數"""
+    broadcaster = _event_broadcasters.get(event.event_type)
+    if broadcaster:
+        try:
+            await broadcaster(event.room, event.data)
+            _stats["sent"] += 1
+            logger.debug(f"Event sent: {event.event_type} to room {event.room}")
+        except Exception as e:
+            logger.error(f"Failed to broadcast {event.event_type}: {e}")
+    else:
+        logger.warning(f"No broadcaster registered for event type: {event.event_type}")
+
+
+async def _send_debounced(event: PendingEvent) -> None:
+    """時間窗內的事件合併成一筆，在時間窗結束時送出"""
+    key = _coalesce_key(event)
+    window = settings.broadcast_debounce_ms / 1000
+
+    if key in _trailing:
+        # 已有等待中的事件，換成最新的
+        _trailing[key] = event
+        _stats["debounced"] += 1
+        return
+
+    now = time.monotonic()
+    last = _last_sent.get(key)
+    if last is None or now - last >= window:
+        _mark_sent(key, now, window)
+        await _dispatch(event)
+        return
+
+    _trailing[key] = event
+    task = asyncio.create_task(_send_trailing(key, window - (now - last)))
+    _trailing_tasks.add(task)
+    task.add_done_callback(_trailing_tasks.discard)
+
+
+async def _send_trailing(key: CoalesceKey, delay: float) -> None:
+    await asyncio.sleep(delay)
+    event = _trailing.pop(key, None)
+    if event is not None:
+        _mark_sent(key, time.monotonic(), settings.broadcast_debounce_ms / 1000)
+        await _dispatch(event)
+
+
+def _mark_sent(key: CoalesceKey, now: float, window: float) -> None:
+    _last_sent[key] = now
+    if len(_last_sent) > _LAST_SENT_PRUNE_SIZE:
+        for stale in [k for k, sent_at in _last_sent.items() if now - sent_at >= window]:
+            del _last_sent[stale]
+
+
+def get_broadcast_stats() -> dict:
+    """取得事件合併統計"""
+    return {
+        "debounce_ms": settings.broadcast_debounce_ms,
+        "pending": len(_trailing),
+        **_stats,
+    }
 
 
 def clear_events() -> None:
@@ -27,12 +27,41 @@ class Settings:
     # LINE Bot
     line_channel_secret: str = os.getenv("LINE_CHANNEL_SECRET", "")
     line_channel_access_token: str = os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "")
+    line_api_timeout: float = float(os.getenv("LINE_API_TIMEOUT", "10"))  # 單次 LINE API 呼叫逾時秒數
+    line_api_pool_size: int = int(os.getenv("LINE_API_POOL_SIZE", "20"))  # LINE API 連線池大小
+
+    # Webhook 背景處理
+    webhook_workers: int = int(os.getenv("WEBHOOK_WORKERS", "8"))  # 同時處理的分片（群組）數量
+    webhook_queue_size: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))  # 隊列上限（超過回 503）
+    webhook_drain_timeout: float = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))  # 關閉時等待秒數
 
     # 安全設定
     security_ban_threshold: int = int(os.getenv("SECURITY_BAN_THRESHOLD", "5"))
 
     # AI 對話設定
     chat_history_limit: int = int(os.getenv("CHAT_HISTORY_LIMIT", "40"))  # 傳給 AI 的對話歷史筆數
+    ai_worker_pool_size: int = int(os.getenv("AI_WORKER_POOL_SIZE", "4"))  # 常駐 CLI 行程上限（0 = 不使用）
+    ai_worker_max_requests: int = int(os.getenv("AI_WORKER_MAX_REQUESTS", "1"))  # 每個行程服務次數後回收
+    ai_worker_acquire_timeout: float = float(os.getenv("AI_WORKER_ACQUIRE_TIMEOUT", "30"))  # 等待空閒行程秒數
+    ai_worker_idle_ttl: float = float(os.getenv("AI_WORKER_IDLE_TTL", "600"))  # 閒置行程保留秒數
+    ai_chat_concurrency: int = int(os.getenv("AI_CHAT_CONCURRENCY", "4"))  # 同時進行的對話數
+    ai_menu_concurrency: int = int(os.getenv("AI_MENU_CONCURRENCY", "1"))  # 同時進行的菜單辨識數
+    ai_queue_max_wait: float = float(os.getenv("AI_QUEUE_MAX_WAIT", "20"))  # 對話排隊上限秒數（需短於 reply token 效期）
+    ai_menu_queue_max_wait: float = float(os.getenv("AI_MENU_QUEUE_MAX_WAIT", "120"))  # 菜單辨識排隊上限秒數
+
+    # 記憶體快取
+    cache_menu_max_entries: int = int(os.getenv("CACHE_MENU_MAX_ENTRIES", "500"))  # 菜單 / 菜單索引各自的筆數上限
+    cache_menu_ttl: float = float(os.getenv("CACHE_MENU_TTL", "3600"))  # 菜單快取存活秒數
+    cache_today_stores_max_entries: int = int(os.getenv("CACHE_TODAY_STORES_MAX_ENTRIES", "2000"))  # 今日店家快取群組數上限
+    cache_prompt_ttl: float = float(os.getenv("CACHE_PROMPT_TTL", "600"))  # 提示詞快取存活秒數
+    cache_max_bytes: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 每個快取的估算位元組上限
+    cache_bus_enabled: bool = os.getenv("CACHE_BUS_ENABLED", "true").lower() == "true"  # 以 PostgreSQL NOTIFY 同步各 worker 的快取清除
+
+    # Socket.IO 跨行程廣播
+    socketio_manager: str = os.getenv("SOCKETIO_MANAGER", "")  # 空白（單行程）/ postgres / redis
+    socketio_channel: str = os.getenv("SOCKETIO_CHANNEL", "jaba_socketio")  # 廣播 channel 名稱
+    socketio_redis_url: str = os.getenv("SOCKETIO_REDIS_URL", "redis://localhost:6379/0")  # SOCKETIO_MANAGER=redis 時使用
+    broadcast_debounce_ms: int = int(os.getenv("BROADCAST_DEBOUNCE_MS", "300"))  # 同群組同類事件的合併時間窗（0 = 不合併）
 
     @property
     def database_url(self) -> str:
@@ -2,6 +2,7 @@
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
@@ -51,6 +52,8 @@ async def init_db() -> None:
     from app.models import Base
 
     async with engine.begin() as conn:
+        # 搜尋欄位的 GIN 索引需要 pg_trgm（見 repositories/search.py）
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
 
 
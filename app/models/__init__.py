@@ -11,7 +11,7 @@ from app.models.user import User
 from app.models.group import Group, GroupApplication, GroupMember, GroupAdmin
 from app.models.store import Store
 from app.models.menu import Menu, MenuCategory, MenuItem
-from app.models.order import GroupTodayStore, OrderSession, Order, OrderItem
+from app.models.order import GroupTodayStore, OrderSession, Order, OrderItem, BoardDelta
 from app.models.chat import ChatMessage
 from app.models.system import SuperAdmin, AiPrompt
 
@@ -30,6 +30,7 @@ __all__ = [
     "OrderSession",
     "Order",
     "OrderItem",
+    "BoardDelta",
     "ChatMessage",
     "SuperAdmin",
     "AiPrompt",
@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, func
+from sqlalchemy import DateTime, ForeignKey, Index, String, Text, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -47,8 +47,21 @@ class ChatMessage(Base):
     session = relationship("OrderSession", back_populates="chat_messages")
 
     __table_args__ = (
-        # 複合索引用於查詢群組對話
-        # Index("idx_chat_messages_group_created", "group_id", "created_at"),
+        # 群組對話（今日 / 看板）：group_id + created_at 範圍
+        Index(
+            "idx_chat_messages_group_created", "group_id", "created_at",
+            postgresql_where=text("group_id IS NOT NULL"),
+        ),
+        # 群組點餐 Session 對話：group_id + session_id + created_at 範圍
+        Index(
+            "idx_chat_messages_group_session_created", "group_id", "session_id", "created_at",
+            postgresql_where=text("group_id IS NOT NULL"),
+        ),
+        # 個人對話：user_id + created_at 範圍
+        Index(
+            "idx_chat_messages_user_created", "user_id", "created_at",
+            postgresql_where=text("group_id IS NULL"),
+        ),
     )
 
     def __repr__(self) -> str:
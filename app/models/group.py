@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, UniqueConstraint, func
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String, Text, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -31,6 +31,9 @@ class Group(Base):
     # 狀態: pending, active, suspended
     status: Mapped[str] = mapped_column(String(32), default="pending", index=True)
 
+    # 看板增量更新序號（每次訂單異動 +1，見 BoardDelta）
+    board_seq: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+
     # 啟用資訊
     activated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     activated_by: Mapped[Optional[uuid.UUID]] = mapped_column(
@@ -53,6 +56,22 @@ class Group(Base):
     order_sessions = relationship("OrderSession", back_populates="group", cascade="all, delete-orphan")
     chat_messages = relationship("ChatMessage", back_populates="group", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 管理後台模糊搜尋（pg_trgm，見 repositories/search.py）
+        Index(
+            "idx_groups_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_groups_group_code_trgm", "group_code",
+            postgresql_using="gin", postgresql_ops={"group_code": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_groups_line_group_id_trgm", "line_group_id",
+            postgresql_using="gin", postgresql_ops={"line_group_id": "gin_trgm_ops"},
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<Group {self.name or self.line_group_id}>"
 
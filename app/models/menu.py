@@ -4,7 +4,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -110,5 +110,13 @@ class MenuItem(Base):
     category = relationship("MenuCategory", back_populates="items")
     order_items = relationship("OrderItem", back_populates="menu_item")
 
+    __table_args__ = (
+        # 管理後台模糊搜尋（pg_trgm，見 repositories/search.py）
+        Index(
+            "idx_menu_items_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<MenuItem {self.name} ${self.price}>"
@@ -4,7 +4,7 @@ from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, Numeric, String, Text, UniqueConstraint, func
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Integer, Numeric, String, Text, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -172,3 +172,24 @@ class OrderItem(Base):
 
     def __repr__(self) -> str:
         return f"<OrderItem {self.name} x{self.quantity}>"
+
+
+class BoardDelta(Base):
+    """看板增量更新（群組訂單異動紀錄，供看板依序號補齊漏掉的更新）"""
+
+    __tablename__ = "board_deltas"
+
+    group_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True
+    )
+    seq: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+    # 異動內容: {"op": "upsert" | "remove" | "clear", "session_id", "order", ...}
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
+
+    def __repr__(self) -> str:
+        return f"<BoardDelta group={self.group_id} seq={self.seq}>"
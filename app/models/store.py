@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, String, Text, func
+from sqlalchemy import Boolean, DateTime, Index, String, Text, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -46,5 +46,13 @@ class Store(Base):
     today_stores = relationship("GroupTodayStore", back_populates="store", cascade="all, delete-orphan")
     orders = relationship("Order", back_populates="store", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 管理後台模糊搜尋（pg_trgm，見 repositories/search.py）
+        Index(
+            "idx_stores_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<Store {self.name}>"
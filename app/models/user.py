@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, String, Text, func
+from sqlalchemy import Boolean, DateTime, Index, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -49,5 +49,17 @@ class User(Base):
     orders = relationship("Order", back_populates="user")
     chat_messages = relationship("ChatMessage", back_populates="user")
 
+    __table_args__ = (
+        # 管理後台模糊搜尋（pg_trgm，見 repositories/search.py）
+        Index(
+            "idx_users_display_name_trgm", "display_name",
+            postgresql_using="gin", postgresql_ops={"display_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_users_line_user_id_trgm", "line_user_id",
+            postgresql_using="gin", postgresql_ops={"line_user_id": "gin_trgm_ops"},
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<User {self.display_name or self.line_user_id}>"
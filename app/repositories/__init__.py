@@ -18,6 +18,7 @@ from app.repositories.order_repo import (
     OrderSessionRepository,
     OrderRepository,
     OrderItemRepository,
+    BoardDeltaRepository,
 )
 from app.repositories.chat_repo import ChatRepository
 from app.repositories.system_repo import (
@@ -41,6 +42,7 @@ __all__ = [
     "OrderSessionRepository",
     "OrderRepository",
     "OrderItemRepository",
+    "BoardDeltaRepository",
     "ChatRepository",
     "SuperAdminRepository",
     "AiPromptRepository",
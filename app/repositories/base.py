@@ -1,8 +1,10 @@
 """基礎 Repository"""
-from typing import Generic, List, Optional, Type, TypeVar
+import base64
+from datetime import datetime
+from typing import Generic, List, Optional, Tuple, Type, TypeVar
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import Select, func, insert, select, text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Base
@@ -10,6 +12,29 @@ from app.models import Base
 ModelType = TypeVar("ModelType", bound=Base)
 
 
+def encode_cursor(obj: Base) -> str:
+    """以記錄的 (created_at, id) 產生分頁游標"""
+    raw = f"{obj.created_at.isoformat()}|{obj.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """解析分頁游標，格式錯誤時拋出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def next_cursor(items: List[Base], limit: int) -> Optional[str]:
+    """下一頁的游標（本頁未滿表示沒有下一頁）"""
+    if limit <= 0 or len(items) < limit:
+        return None
+    return encode_cursor(items[-1])
+
+
 class BaseRepository(Generic[ModelType]):
     """基礎 Repository 類別"""
 
@@ -38,6 +63,19 @@ class BaseRepository(Generic[ModelType]):
         await self.session.refresh(obj)
         return obj
 
+    async def bulk_create(self, rows: List[dict]) -> List[ModelType]:
+        """批次建立記錄（多筆 INSERT ... RETURNING，回傳順序與 rows 相同）
+
+        與逐筆 create 不同，不會每筆 flush + refresh，筆數多時往返次數固定。
+        """
+        if not rows:
+            return []
+        result = await self.session.scalars(
+            insert(self.model).returning(self.model, sort_by_parameter_order=True),
+            rows,
+        )
+        return list(result.all())
+
     async def update(self, obj: ModelType) -> ModelType:
         """更新記錄"""
         await self.session.flush()
@@ -48,3 +86,42 @@ class BaseRepository(Generic[ModelType]):
         """刪除記錄"""
         await self.session.delete(obj)
         await self.session.flush()
+
+    def _paginate(
+        self, query: Select, limit: int, offset: int = 0, cursor: Optional[str] = None
+    ) -> Select:
+        """依 (created_at, id) 新到舊分頁
+
+        有 cursor 時以 keyset 方式取游標之後的記錄（不使用 OFFSET，深分頁不會變慢），
+        否則沿用 offset。
+        """
+        query = query.order_by(self.model.created_at.desc(), self.model.id.desc())
+        if cursor:
+            created_at, id = decode_cursor(cursor)
+            # 第一個條件可使用 created_at 索引，tuple 比較處理同一時間的記錄
+            query = query.where(
+                self.model.created_at <= created_at,
+                tuple_(self.model.created_at, self.model.id) < tuple_(created_at, id),
+            )
+        elif offset:
+            query = query.offset(offset)
+        return query.limit(limit)
+
+    async def _count(self, query: Select, approximate: bool = False) -> int:
+        """計算查詢筆數
+
+        approximate 為 True 且沒有篩選條件時改用 pg_class.reltuples 估計值
+        （ANALYZE / VACUUM 時更新），避免大表 count(*) 全表掃描。
+        有篩選條件或尚未 ANALYZE 時仍精確計算。
+        """
+        if approximate and query.whereclause is None:
+            estimate = (await self.session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": self.model.__tablename__},
+            )).scalar()
+            if estimate is not None and estimate >= 0:
+                return estimate
+
+        # 排序不影響筆數（搜尋的相似度排序也不必計算）
+        count_query = select(func.count()).select_from(query.order_by(None).subquery())
+        return (await self.session.execute(count_query)).scalar() or 0
@@ -1,5 +1,5 @@
 """對話記錄 Repository"""
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from typing import List, Optional, Tuple
 from uuid import UUID
 import zoneinfo
@@ -20,6 +20,16 @@ def get_today_tw() -> date:
     return datetime.now(TW_TZ).date()
 
 
+def get_day_range_tw(day: date) -> Tuple[datetime, datetime]:
+    """台北時區某日的 [開始, 隔天開始) 時間範圍
+
+    以 created_at 範圍比較取代 func.date(created_at) == day，
+    可以使用 created_at 相關索引，也不受資料庫連線時區影響。
+    """
+    start = datetime.combine(day, time.min, tzinfo=TW_TZ)
+    return start, start + timedelta(days=1)
+
+
 class ChatRepository(BaseRepository[ChatMessage]):
     """對話記錄 Repository"""
 
@@ -47,8 +57,8 @@ class ChatRepository(BaseRepository[ChatMessage]):
             query = query.where(ChatMessage.session_id == session_id)
 
         if today_only:
-            today = get_today_tw()
-            query = query.where(func.date(ChatMessage.created_at) == today)
+            start, end = get_day_range_tw(get_today_tw())
+            query = query.where(ChatMessage.created_at >= start, ChatMessage.created_at < end)
 
         # 載入 user 關聯以取得用戶名稱
         query = query.options(selectinload(ChatMessage.user))
@@ -90,8 +100,8 @@ class ChatRepository(BaseRepository[ChatMessage]):
         )
 
         if today_only:
-            today = get_today_tw()
-            query = query.where(func.date(ChatMessage.created_at) == today)
+            start, end = get_day_range_tw(get_today_tw())
+            query = query.where(ChatMessage.created_at >= start, ChatMessage.created_at < end)
 
         query = query.order_by(ChatMessage.created_at.desc()).limit(limit)
 
@@ -123,10 +133,11 @@ class ChatRepository(BaseRepository[ChatMessage]):
         limit: int = 100,
     ) -> List[ChatMessage]:
         """取得今日對話記錄（用於看板）"""
-        today = get_today_tw()
+        start, end = get_day_range_tw(get_today_tw())
 
         query = select(ChatMessage).where(
-            func.date(ChatMessage.created_at) == today
+            ChatMessage.created_at >= start,
+            ChatMessage.created_at < end,
         )
 
         if group_id:
@@ -3,12 +3,13 @@ from datetime import datetime
 from typing import List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.group import Group, GroupAdmin, GroupApplication, GroupMember
 from app.repositories.base import BaseRepository
+from app.repositories.search import apply_search
 
 
 class GroupRepository(BaseRepository[Group]):
@@ -74,7 +75,9 @@ class GroupRepository(BaseRepository[Group]):
         offset: int = 0,
         search: Optional[str] = None,
         status: Optional[str] = None,
-    ) -> Tuple[List[Group], int]:
+        cursor: Optional[str] = None,
+        approximate_total: bool = False,
+    ) -> Tuple[List[Group], Optional[int]]:
         """分頁取得群組列表
 
         Args:
@@ -82,33 +85,28 @@ class GroupRepository(BaseRepository[Group]):
             offset: 偏移量
             search: 搜尋關鍵字（名稱或代碼）
             status: 狀態篩選（all/active/suspended/pending）
+            cursor: 上一頁回傳的游標（指定時以 keyset 分頁，忽略 offset 且不計算總數；不可與 search 併用）
+            approximate_total: 沒有篩選條件時以估計值作為總數
 
         Returns:
-            (群組列表, 總數)
+            (群組列表, 總數；使用游標時為 None)
         """
         query = select(Group)
 
-        # 搜尋條件
+        # 搜尋條件（pg_trgm 索引）
+        search_columns = (Group.name, Group.group_code, Group.line_group_id)
         if search:
-            search_pattern = f"%{search}%"
-            query = query.where(
-                or_(
-                    Group.name.ilike(search_pattern),
-                    Group.group_code.ilike(search_pattern),
-                    Group.line_group_id.ilike(search_pattern),
-                )
-            )
+            query = apply_search(query, search_columns, search)
 
         # 狀態篩選
         if status and status != "all":
             query = query.where(Group.status == status)
 
-        # 計算總數
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await self.session.execute(count_query)).scalar() or 0
+        # 計算總數（使用游標翻頁時不重複計算）
+        total = None if cursor else await self._count(query, approximate_total)
 
-        # 取得分頁資料
-        query = query.order_by(Group.created_at.desc()).limit(limit).offset(offset)
+        # 取得分頁資料（有搜尋時相似度高的在前）
+        query = self._paginate(query, limit, offset, cursor)
         result = await self.session.execute(query)
         groups = list(result.scalars().all())
 
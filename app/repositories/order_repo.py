@@ -1,25 +1,91 @@
 """訂單 Repository"""
-from datetime import date, datetime
+from datetime import date, datetime, time, timedelta
 from typing import List, Optional
 from uuid import UUID
 import zoneinfo
 
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, delete, event, func, inspect, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import Session, make_transient_to_detached, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models.order import GroupTodayStore, Order, OrderItem, OrderSession
+from app.models.group import Group
+from app.models.order import BoardDelta, GroupTodayStore, Order, OrderItem, OrderSession
+from app.models.store import Store
 from app.repositories.base import BaseRepository
 
 # 台北時區
 TW_TZ = zoneinfo.ZoneInfo("Asia/Taipei")
 
+# session.info 中記錄交易內異動過今日店家的群組（"*" 表示店家資料有異動，全部失效）
+_TODAY_STORES_CHANGED = "today_stores_changed"
+
 
 def get_today_tw() -> date:
     """取得台北時區的今日日期"""
     return datetime.now(TW_TZ).date()
 
 
+def get_next_midnight_tw(today: date) -> float:
+    """取得台北時區隔天 00:00 的 timestamp（今日店家快取到期時間）"""
+    return datetime.combine(today + timedelta(days=1), time.min, tzinfo=TW_TZ).timestamp()
+
+
+def _detached_copy(instance):
+    """複製已載入的欄位為 detached 物件（快取用，不綁定任何 session）"""
+    mapper = inspect(instance).mapper
+    copy = mapper.class_(**{
+        attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs
+    })
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _snapshot_today_stores(today_stores: List[GroupTodayStore]) -> List[GroupTodayStore]:
+    """建立今日店家快取快照（含 store）"""
+    snapshot = []
+    for ts in today_stores:
+        copy = _detached_copy(ts)
+        set_committed_value(copy, "store", _detached_copy(ts.store) if ts.store else None)
+        snapshot.append(copy)
+    return snapshot
+
+
+@event.listens_for(Session, "after_flush")
+def _track_today_store_changes(session: Session, flush_context) -> None:
+    """記錄交易內異動的今日店家 / 店家，commit 後才清除快取
+
+    未提交前清除快取，其他連線可能在 commit 前又把舊資料讀回快取，
+    因此在 commit 後再清一次。
+    """
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, GroupTodayStore):
+            session.info.setdefault(_TODAY_STORES_CHANGED, set()).add(str(obj.group_id))
+        elif isinstance(obj, Store) and obj not in session.new:
+            # 店名變更或店家刪除會影響所有群組的今日店家
+            session.info.setdefault(_TODAY_STORES_CHANGED, set()).add("*")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_today_stores(session: Session) -> None:
+    changed = session.info.pop(_TODAY_STORES_CHANGED, None)
+    if not changed:
+        return
+
+    from app.services.cache_service import CacheService
+
+    if "*" in changed:
+        CacheService.clear_all_today_stores()
+        return
+    for group_id in changed:
+        CacheService.clear_today_stores(group_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_today_store_changes(session: Session) -> None:
+    session.info.pop(_TODAY_STORES_CHANGED, None)
+
+
 class GroupTodayStoreRepository(BaseRepository[GroupTodayStore]):
     """群組今日店家 Repository"""
 
@@ -29,9 +95,23 @@ class GroupTodayStoreRepository(BaseRepository[GroupTodayStore]):
     async def get_today_stores(
         self, group_id: UUID, target_date: Optional[date] = None
     ) -> List[GroupTodayStore]:
-        """取得群組今日店家"""
+        """取得群組今日店家
+
+        今日的查詢結果依 (group_id, 台北日期) 快取到台北時間午夜，
+        快照 merge 回目前 session 使用，呼叫端拿到的仍是一般 ORM 物件。
+        本交易內異動過今日店家 / 店家時直接查 DB（看得到尚未提交的資料，也不寫入快取）。
+        """
+        from app.services.cache_service import CacheService
+
+        today = get_today_tw()
         if target_date is None:
-            target_date = get_today_tw()
+            target_date = today
+
+        cacheable = target_date == today and not self._has_pending_changes(group_id)
+        if cacheable:
+            cached = CacheService.get_today_stores(str(group_id), today)
+            if cached is not None:
+                return [await self.session.merge(ts, load=False) for ts in cached]
 
         result = await self.session.execute(
             select(GroupTodayStore)
@@ -41,7 +121,65 @@ class GroupTodayStoreRepository(BaseRepository[GroupTodayStore]):
             )
             .options(selectinload(GroupTodayStore.store))
         )
-        return list(result.scalars().all())
+        today_stores = list(result.scalars().all())
+
+        if cacheable:
+            CacheService.set_today_stores(
+                str(group_id), today, _snapshot_today_stores(today_stores),
+                expires_at=get_next_midnight_tw(today),
+            )
+        return today_stores
+
+    async def get_today_stores_for_groups(self, group_ids: List[UUID]) -> dict:
+        """一次取得多個群組的今日店家 {group_id: [GroupTodayStore]}（快取未命中的群組以單一查詢載入）"""
+        from app.services.cache_service import CacheService
+
+        today = get_today_tw()
+        stores_by_group: dict = {}
+        missing = []
+        for group_id in group_ids:
+            cached = None
+            if not self._has_pending_changes(group_id):
+                cached = CacheService.get_today_stores(str(group_id), today)
+            if cached is None:
+                missing.append(group_id)
+            else:
+                stores_by_group[group_id] = [
+                    await self.session.merge(ts, load=False) for ts in cached
+                ]
+
+        if missing:
+            result = await self.session.execute(
+                select(GroupTodayStore)
+                .where(
+                    GroupTodayStore.group_id.in_(missing),
+                    GroupTodayStore.date == today,
+                )
+                .options(selectinload(GroupTodayStore.store))
+            )
+            loaded: dict = {group_id: [] for group_id in missing}
+            for ts in result.scalars().all():
+                loaded[ts.group_id].append(ts)
+            expires_at = get_next_midnight_tw(today)
+            for group_id, today_stores in loaded.items():
+                if not self._has_pending_changes(group_id):
+                    CacheService.set_today_stores(
+                        str(group_id), today, _snapshot_today_stores(today_stores),
+                        expires_at=expires_at,
+                    )
+                stores_by_group[group_id] = today_stores
+
+        return stores_by_group
+
+    def _has_pending_changes(self, group_id: UUID) -> bool:
+        """本交易是否有尚未提交的今日店家 / 店家異動"""
+        changed = self.session.info.get(_TODAY_STORES_CHANGED)
+        if changed and (str(group_id) in changed or "*" in changed):
+            return True
+        return any(
+            isinstance(obj, (GroupTodayStore, Store))
+            for obj in (*self.session.new, *self.session.dirty, *self.session.deleted)
+        )
 
     async def set_today_store(
         self,
@@ -191,6 +329,35 @@ class OrderSessionRepository(BaseRepository[OrderSession]):
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
+    async def get_sessions_with_orders(
+        self, group_ids: List[UUID], target_date: date
+    ) -> List[OrderSession]:
+        """一次取得多個群組在指定日期（台北時區）的 Session 及訂單、品項、使用者
+
+        固定 4 次查詢（Session、訂單、品項、使用者），不隨群組或 Session 數量增加。
+        依建立時間新到舊排序。
+        """
+        if not group_ids:
+            return []
+
+        start_dt = datetime.combine(target_date, time.min, tzinfo=TW_TZ)
+        end_dt = start_dt + timedelta(days=1)
+        result = await self.session.execute(
+            select(OrderSession)
+            .where(
+                OrderSession.group_id.in_(group_ids),
+                OrderSession.created_at >= start_dt,
+                OrderSession.created_at < end_dt,
+            )
+            .options(
+                selectinload(OrderSession.orders).selectinload(Order.items),
+                selectinload(OrderSession.orders).selectinload(Order.user),
+            )
+            .order_by(OrderSession.created_at.desc())
+            .execution_options(populate_existing=True)
+        )
+        return list(result.scalars().all())
+
 
 class OrderRepository(BaseRepository[Order]):
     """訂單 Repository"""
@@ -239,3 +406,52 @@ class OrderItemRepository(BaseRepository[OrderItem]):
 
     def __init__(self, session: AsyncSession):
         super().__init__(OrderItem, session)
+
+
+class BoardDeltaRepository(BaseRepository[BoardDelta]):
+    """看板增量更新 Repository"""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(BoardDelta, session)
+
+    async def append(self, group_id: UUID, payload: dict) -> int:
+        """新增一筆異動並回傳序號
+
+        序號以 UPDATE groups ... RETURNING 遞增，同一群組的異動依交易提交順序排列
+        （群組列鎖到交易結束，序號不會跳號或重複）。
+        """
+        result = await self.session.execute(
+            update(Group)
+            .where(Group.id == group_id)
+            # 保留 updated_at，序號異動不算群組資料變更
+            .values(board_seq=Group.board_seq + 1, updated_at=Group.updated_at)
+            .returning(Group.board_seq)
+        )
+        seq = result.scalar_one()
+        self.session.add(BoardDelta(group_id=group_id, seq=seq, payload=payload))
+        await self.session.flush()
+        return seq
+
+    async def get_since(self, group_id: UUID, since: int, limit: int) -> List[BoardDelta]:
+        """取得序號大於 since 的異動（依序號排序）"""
+        result = await self.session.execute(
+            select(BoardDelta)
+            .where(BoardDelta.group_id == group_id, BoardDelta.seq > since)
+            .order_by(BoardDelta.seq)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_current_seq(self, group_id: UUID) -> int:
+        """取得群組目前序號"""
+        result = await self.session.execute(
+            select(Group.board_seq).where(Group.id == group_id)
+        )
+        return result.scalar() or 0
+
+    async def cleanup_before(self, before: datetime) -> int:
+        """刪除指定時間之前的異動"""
+        result = await self.session.execute(
+            delete(BoardDelta).where(BoardDelta.created_at < before)
+        )
+        return result.rowcount
@@ -0,0 +1,39 @@
+"""模糊搜尋 - 管理後台的使用者 / 群組 / 店家 / 品項搜尋共用
+
+搜尋欄位都建有 pg_trgm 的 GIN 索引（gin_trgm_ops，見 migration 006），
+ILIKE '%關鍵字%' 在關鍵字至少 3 個字元時可以走索引，不需全表掃描；
+較短的關鍵字沒有完整的三字元組，PostgreSQL 會自動改用其他方式，結果相同。
+
+結果依 word_similarity（關鍵字與欄位中最相近片段的相似度）由高到低排序，
+多個欄位取最高分。
+"""
+from typing import Sequence
+
+from sqlalchemy import ColumnElement, Select, func, or_
+
+
+def escape_like(term: str) -> str:
+    """跳脫 LIKE 的萬用字元（% _ \\），讓關鍵字照字面比對"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_filter(columns: Sequence[ColumnElement], term: str) -> ColumnElement:
+    """任一欄位包含關鍵字（不分大小寫）"""
+    pattern = f"%{escape_like(term)}%"
+    return or_(*(column.ilike(pattern, escape="\\") for column in columns))
+
+
+def search_rank(columns: Sequence[ColumnElement], term: str) -> ColumnElement:
+    """相似度分數（0 ~ 1，多個欄位取最高分）"""
+    scores = [func.word_similarity(term, func.coalesce(column, "")) for column in columns]
+    return scores[0] if len(scores) == 1 else func.greatest(*scores)
+
+
+def apply_search(query: Select, columns: Sequence[ColumnElement], term: str) -> Select:
+    """加上搜尋條件並依相似度排序（其他排序條件接在相似度之後）"""
+    term = term.strip()
+    if not term:
+        return query
+    return query.where(search_filter(columns, term)).order_by(
+        search_rank(columns, term).desc()
+    )
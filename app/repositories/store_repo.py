@@ -2,13 +2,16 @@
 from typing import List, Optional
 from uuid import UUID
 
-from sqlalchemy import select, or_, and_
+from sqlalchemy import select, or_, and_, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.models.store import Store
 from app.models.menu import Menu, MenuCategory, MenuItem
+from app.models.order import OrderItem
 from app.repositories.base import BaseRepository
+from app.repositories.search import apply_search
 
 
 class StoreRepository(BaseRepository[Store]):
@@ -47,12 +50,9 @@ class StoreRepository(BaseRepository[Store]):
         return result.scalar_one_or_none()
 
     async def search_by_name(self, name: str) -> List[Store]:
-        """根據名稱搜尋店家"""
-        result = await self.session.execute(
-            select(Store)
-            .where(Store.name.ilike(f"%{name}%"))
-            .order_by(Store.name)
-        )
+        """根據名稱搜尋店家（相似度高的在前）"""
+        query = apply_search(select(Store), (Store.name,), name)
+        result = await self.session.execute(query.order_by(Store.name))
         return list(result.scalars().all())
 
     async def get_stores_for_group_code(
@@ -148,6 +148,38 @@ class MenuRepository(BaseRepository[Menu]):
             menu = await self.get_by_store_id(store_id)
         return menu
 
+    async def clear_categories(self, menu: Menu) -> None:
+        """以固定次數的 SQL 刪除菜單所有分類與品項（menu.categories 需已載入）
+
+        訂單品項保留，只把 menu_item_id 設為 NULL（與逐筆 ORM 刪除的結果相同）。
+        """
+        category_ids = select(MenuCategory.id).where(MenuCategory.menu_id == menu.id)
+        item_ids = select(MenuItem.id).where(MenuItem.category_id.in_(category_ids))
+
+        await self.session.execute(
+            update(OrderItem)
+            .where(OrderItem.menu_item_id.in_(item_ids))
+            .values(menu_item_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(
+            delete(MenuItem)
+            .where(MenuItem.category_id.in_(category_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(
+            delete(MenuCategory)
+            .where(MenuCategory.menu_id == menu.id)
+            .execution_options(synchronize_session=False)
+        )
+
+        # 已刪除的物件移出 session，避免 flush 時再處理
+        for category in menu.categories:
+            for item in category.items:
+                self.session.expunge(item)
+            self.session.expunge(category)
+        set_committed_value(menu, "categories", [])
+
 
 class MenuCategoryRepository(BaseRepository[MenuCategory]):
     """菜單分類 Repository"""
@@ -155,6 +187,16 @@ class MenuCategoryRepository(BaseRepository[MenuCategory]):
     def __init__(self, session: AsyncSession):
         super().__init__(MenuCategory, session)
 
+    async def delete_by_ids(self, ids: List[UUID]) -> None:
+        """批次刪除分類（分類下需已無品項）"""
+        if not ids:
+            return
+        await self.session.execute(
+            delete(MenuCategory)
+            .where(MenuCategory.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+
 
 class MenuItemRepository(BaseRepository[MenuItem]):
     """菜單品項 Repository"""
@@ -162,17 +204,33 @@ class MenuItemRepository(BaseRepository[MenuItem]):
     def __init__(self, session: AsyncSession):
         super().__init__(MenuItem, session)
 
+    async def delete_by_ids(self, ids: List[UUID]) -> None:
+        """批次刪除品項（訂單品項保留，menu_item_id 設為 NULL）"""
+        if not ids:
+            return
+        await self.session.execute(
+            update(OrderItem)
+            .where(OrderItem.menu_item_id.in_(ids))
+            .values(menu_item_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(
+            delete(MenuItem)
+            .where(MenuItem.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+
     async def search_by_name(
         self, menu_id: UUID, name: str
     ) -> List[MenuItem]:
-        """根據名稱搜尋品項"""
-        result = await self.session.execute(
+        """根據名稱搜尋品項（相似度高的在前）"""
+        query = (
             select(MenuItem)
             .join(MenuCategory)
             .where(
                 MenuCategory.menu_id == menu_id,
-                MenuItem.name.ilike(f"%{name}%"),
                 MenuItem.is_available == True,
             )
         )
+        result = await self.session.execute(apply_search(query, (MenuItem.name,), name))
         return list(result.scalars().all())
@@ -126,8 +126,9 @@ class SecurityLogRepository(BaseRepository[SecurityLog]):
         offset: int = 0,
         line_user_id: Optional[str] = None,
         line_group_id: Optional[str] = None,
+        cursor: Optional[str] = None,
     ) -> List[SecurityLog]:
-        """取得最近的安全日誌"""
+        """取得最近的安全日誌（指定 cursor 時以 keyset 分頁，忽略 offset）"""
         query = select(SecurityLog)
 
         if line_user_id:
@@ -135,7 +136,7 @@ class SecurityLogRepository(BaseRepository[SecurityLog]):
         if line_group_id:
             query = query.where(SecurityLog.line_group_id == line_group_id)
 
-        query = query.order_by(SecurityLog.created_at.desc()).offset(offset).limit(limit)
+        query = self._paginate(query, limit, offset, cursor)
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
@@ -143,19 +144,17 @@ class SecurityLogRepository(BaseRepository[SecurityLog]):
         self,
         line_user_id: Optional[str] = None,
         line_group_id: Optional[str] = None,
+        approximate: bool = False,
     ) -> int:
-        """取得日誌總數"""
-        from sqlalchemy import func as sql_func
-
-        query = select(sql_func.count()).select_from(SecurityLog)
+        """取得日誌總數（approximate 為 True 且沒有篩選條件時回傳估計值）"""
+        query = select(SecurityLog)
 
         if line_user_id:
             query = query.where(SecurityLog.line_user_id == line_user_id)
         if line_group_id:
             query = query.where(SecurityLog.line_group_id == line_group_id)
 
-        result = await self.session.execute(query)
-        return result.scalar() or 0
+        return await self._count(query, approximate)
 
     async def get_stats(self) -> dict:
         """取得統計資訊"""
@@ -225,8 +224,9 @@ class AiLogRepository(BaseRepository[AiLog]):
         offset: int = 0,
         group_id: Optional[str] = None,
         user_id: Optional[str] = None,
+        cursor: Optional[str] = None,
     ) -> List[AiLog]:
-        """取得 AI 日誌列表"""
+        """取得 AI 日誌列表（指定 cursor 時以 keyset 分頁，忽略 offset）"""
         from uuid import UUID
         from sqlalchemy.orm import selectinload
 
@@ -240,7 +240,7 @@ class AiLogRepository(BaseRepository[AiLog]):
         if user_id:
             query = query.where(AiLog.user_id == UUID(user_id))
 
-        query = query.order_by(AiLog.created_at.desc()).offset(offset).limit(limit)
+        query = self._paginate(query, limit, offset, cursor)
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
@@ -248,20 +248,19 @@ class AiLogRepository(BaseRepository[AiLog]):
         self,
         group_id: Optional[str] = None,
         user_id: Optional[str] = None,
+        approximate: bool = False,
     ) -> int:
-        """取得日誌總數"""
+        """取得日誌總數（approximate 為 True 且沒有篩選條件時回傳估計值）"""
         from uuid import UUID
-        from sqlalchemy import func as sql_func
 
-        query = select(sql_func.count()).select_from(AiLog)
+        query = select(AiLog)
 
         if group_id:
             query = query.where(AiLog.group_id == UUID(group_id))
         if user_id:
             query = query.where(AiLog.user_id == UUID(user_id))
 
-        result = await self.session.execute(query)
-        return result.scalar() or 0
+        return await self._count(query, approximate)
 
     async def get_by_id_with_relations(self, log_id: str) -> Optional[AiLog]:
         """根據 ID 取得日誌（包含關聯）"""
@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import Optional, List, Tuple
 from uuid import UUID
 
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -11,6 +11,7 @@ from app.models.user import User
 from app.models.group import GroupMember
 from app.models.order import Order
 from app.repositories.base import BaseRepository
+from app.repositories.search import apply_search
 
 
 class UserRepository(BaseRepository[User]):
@@ -45,7 +46,9 @@ class UserRepository(BaseRepository[User]):
         offset: int = 0,
         search: Optional[str] = None,
         status: Optional[str] = None,
-    ) -> Tuple[List[User], int]:
+        cursor: Optional[str] = None,
+        approximate_total: bool = False,
+    ) -> Tuple[List[User], Optional[int]]:
         """分頁取得使用者列表
 
         Args:
@@ -53,21 +56,18 @@ class UserRepository(BaseRepository[User]):
             offset: 偏移量
             search: 搜尋關鍵字（名稱或 LINE ID）
             status: 狀態篩選（all/active/banned）
+            cursor: 上一頁回傳的游標（指定時以 keyset 分頁，忽略 offset 且不計算總數；不可與 search 併用）
+            approximate_total: 沒有篩選條件時以估計值作為總數
 
         Returns:
-            (使用者列表, 總數)
+            (使用者列表, 總數；使用游標時為 None)
         """
         query = select(User)
 
-        # 搜尋條件
+        # 搜尋條件（pg_trgm 索引）
+        search_columns = (User.display_name, User.line_user_id)
         if search:
-            search_pattern = f"%{search}%"
-            query = query.where(
-                or_(
-                    User.display_name.ilike(search_pattern),
-                    User.line_user_id.ilike(search_pattern),
-                )
-            )
+            query = apply_search(query, search_columns, search)
 
         # 狀態篩選
         if status == "banned":
@@ -75,12 +75,11 @@ class UserRepository(BaseRepository[User]):
         elif status == "active":
             query = query.where(User.is_banned == False)
 
-        # 計算總數
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await self.session.execute(count_query)).scalar() or 0
+        # 計算總數（使用游標翻頁時不重複計算）
+        total = None if cursor else await self._count(query, approximate_total)
 
-        # 取得分頁資料
-        query = query.order_by(User.created_at.desc()).limit(limit).offset(offset)
+        # 取得分頁資料（有搜尋時相似度高的在前）
+        query = self._paginate(query, limit, offset, cursor)
         result = await self.session.execute(query)
         users = list(result.scalars().all())
 
@@ -24,6 +24,7 @@ from app.repositories import (
     GroupTodayStoreRepository,
     SecurityLogRepository,
 )
+from app.repositories.base import decode_cursor, next_cursor
 from app.repositories.system_repo import AiLogRepository
 from app.services import MenuService, OrderService, CacheService
 
@@ -45,6 +46,17 @@ def _cleanup_expired_sessions():
         del _admin_sessions[k]
 
 
+def _validate_cursor(cursor: Optional[str], search: Optional[str] = None) -> None:
+    """檢查分頁游標格式（搜尋結果依相似度排序，不支援游標）"""
+    if cursor:
+        if search:
+            raise HTTPException(status_code=400, detail="搜尋結果不支援游標分頁")
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="無效的分頁游標")
+
+
 def create_admin_session() -> str:
     """建立 admin session，回傳 token"""
     _cleanup_expired_sessions()
@@ -175,6 +187,7 @@ async def verify_admin(
 async def get_all_stores(
     scope: Optional[str] = None,
     group_code: Optional[str] = None,
+    search: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_admin_token),
 ):
@@ -183,10 +196,13 @@ async def get_all_stores(
     可選參數：
     - scope: 篩選店家層級 (global/group)
     - group_code: 篩選群組代碼 (scope=group 時使用)
+    - search: 搜尋店家名稱（依相似度排序，忽略 scope）
     """
     repo = StoreRepository(db)
 
-    if scope:
+    if search:
+        stores = await repo.search_by_name(search)
+    elif scope:
         stores = await repo.get_stores_by_scope(scope, group_code)
     else:
         stores = await repo.get_all_stores()
@@ -511,6 +527,8 @@ async def get_groups_paginated(
     offset: int = 0,
     search: Optional[str] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    approximate_total: bool = False,
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_admin_token),
 ):
@@ -521,13 +539,17 @@ async def get_groups_paginated(
         offset: 偏移量
         search: 搜尋關鍵字（名稱或代碼）
         status: 狀態篩選（all/active/suspended/pending）
+        cursor: 上一頁回傳的 next_cursor（keyset 分頁，total 回傳 null）
+        approximate_total: 沒有篩選條件時以估計值作為總數
     """
     from app.models import GroupApplication
     from sqlalchemy import select
 
+    _validate_cursor(cursor, search)
     repo = GroupRepository(db)
     groups, total = await repo.get_all_paginated(
-        limit=limit, offset=offset, search=search, status=status
+        limit=limit, offset=offset, search=search, status=status,
+        cursor=cursor, approximate_total=approximate_total,
     )
 
     # 取得每個群組的統計資訊和申請名稱
@@ -564,6 +586,7 @@ async def get_groups_paginated(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": None if search else next_cursor(groups, limit),
     }
 
 
@@ -928,13 +951,10 @@ async def create_proxy_order(
     _: bool = Depends(verify_admin_token),
 ):
     """代理建立訂單（超級管理員用）"""
-    from decimal import Decimal
     from app.broadcast import commit_and_notify, emit_order_update
-    from app.models.order import Order, OrderItem
-    from app.repositories import MenuItemRepository
-    from sqlalchemy.orm import selectinload
-    from sqlalchemy import select
-    from app.models.menu import Menu, MenuCategory, MenuItem
+    from app.models.order import Order
+    from app.services.board_feed import BoardFeed
+    from app.services.menu_index import describe_no_match, match_order, pick_candidate, to_order_item
 
     session_repo = OrderSessionRepository(db)
     order_repo = OrderRepository(db)
@@ -970,43 +990,23 @@ async def create_proxy_order(
         await db.flush()
         await db.refresh(order)
 
-    # 從菜單找價格並新增品項
-    for item_data in data.items:
-        # 從菜單找價格
-        result = await db.execute(
-            select(MenuItem)
-            .join(MenuCategory)
-            .join(Menu)
-            .where(Menu.store_id == store_id)
-        )
-        menu_items = result.scalars().all()
-
-        price = 0
-        for mi in menu_items:
-            if mi.name == item_data.name or item_data.name in mi.name:
-                price = float(mi.price)
-                break
-
-        if price == 0:
+    # 從菜單索引找價格並新增品項
+    menu_indexes = await MenuService(db).get_menu_indexes([store_id])
+    matches = match_order(menu_indexes, [(item_data.name, None) for item_data in data.items])
+    for item_data, candidates in zip(data.items, matches):
+        matched = pick_candidate(candidates)
+        if not matched:
             raise HTTPException(
                 status_code=400,
-                detail=f"菜單中找不到「{item_data.name}」"
+                detail=describe_no_match(item_data.name, candidates)
             )
-
-        order_item = OrderItem(
-            order_id=order.id,
-            name=item_data.name,
-            quantity=item_data.quantity,
-            unit_price=Decimal(str(price)),
-            subtotal=Decimal(str(price * item_data.quantity)),
-            note=item_data.note or "",
-        )
-        db.add(order_item)
+        db.add(to_order_item(matched, order.id, item_data.quantity, item_data.note))
 
     await db.flush()
 
     # 重新計算總金額
     order = await order_repo.calculate_total(order)
+    feed = await BoardFeed(db).order_changed(group_id, active_session.id, user.id)
 
     # 廣播訂單更新
     await emit_order_update(str(group_id), {
@@ -1015,6 +1015,7 @@ async def create_proxy_order(
         "user_id": str(user.id),
         "display_name": user.display_name,
         "proxy": True,
+        **feed,
     })
 
     await commit_and_notify(db)
@@ -1031,12 +1032,10 @@ async def update_proxy_order(
     _: bool = Depends(verify_admin_token),
 ):
     """代理修改訂單（超級管理員用）"""
-    from decimal import Decimal
     from app.broadcast import commit_and_notify, emit_order_update
-    from app.models.order import OrderItem
+    from app.services.board_feed import BoardFeed
     from app.repositories import OrderItemRepository
-    from sqlalchemy import select
-    from app.models.menu import Menu, MenuCategory, MenuItem
+    from app.services.menu_index import describe_no_match, match_order, pick_candidate, to_order_item
 
     order_repo = OrderRepository(db)
     order_item_repo = OrderItemRepository(db)
@@ -1059,37 +1058,17 @@ async def update_proxy_order(
     for item in order.items:
         await order_item_repo.delete(item)
 
-    # 從菜單找價格並新增品項
-    for item_data in data.items:
-        result = await db.execute(
-            select(MenuItem)
-            .join(MenuCategory)
-            .join(Menu)
-            .where(Menu.store_id == store_id)
-        )
-        menu_items = result.scalars().all()
-
-        price = 0
-        for mi in menu_items:
-            if mi.name == item_data.name or item_data.name in mi.name:
-                price = float(mi.price)
-                break
-
-        if price == 0:
+    # 從菜單索引找價格並新增品項
+    menu_indexes = await MenuService(db).get_menu_indexes([store_id])
+    matches = match_order(menu_indexes, [(item_data.name, None) for item_data in data.items])
+    for item_data, candidates in zip(data.items, matches):
+        matched = pick_candidate(candidates)
+        if not matched:
             raise HTTPException(
                 status_code=400,
-                detail=f"菜單中找不到「{item_data.name}」"
+                detail=describe_no_match(item_data.name, candidates)
             )
-
-        order_item = OrderItem(
-            order_id=order.id,
-            name=item_data.name,
-            quantity=item_data.quantity,
-            unit_price=Decimal(str(price)),
-            subtotal=Decimal(str(price * item_data.quantity)),
-            note=item_data.note or "",
-        )
-        db.add(order_item)
+        db.add(to_order_item(matched, order.id, item_data.quantity, item_data.note))
 
     await db.flush()
 
@@ -1098,6 +1077,7 @@ async def update_proxy_order(
 
     # 取得使用者資訊
     user = await user_repo.get_by_id(order.user_id)
+    feed = await BoardFeed(db).order_changed(group_id, order.session_id, order.user_id)
 
     # 廣播訂單更新
     await emit_order_update(str(group_id), {
@@ -1106,6 +1086,7 @@ async def update_proxy_order(
         "user_id": str(order.user_id),
         "display_name": user.display_name if user else "未知",
         "proxy": True,
+        **feed,
     })
 
     await commit_and_notify(db)
@@ -1145,7 +1126,7 @@ async def update_prompt(
     """更新 AI 提示詞"""
     repo = AiPromptRepository(db)
     await repo.set_prompt(name, data.content)
-    CacheService.clear_prompt(name)
+    CacheService.clear_prompt(name, db)
     return {"success": True}
 
 
@@ -1165,6 +1146,69 @@ async def get_chat_stats(
     return stats
 
 
+@router.get("/maintenance/webhook-queue")
+async def get_webhook_queue_stats(
+    _: bool = Depends(verify_admin_token),
+):
+    """取得 Webhook 背景隊列統計（深度、處理數、等待時間）"""
+    from app.services.webhook_queue import webhook_queue
+
+    return webhook_queue.stats()
+
+
+@router.get("/maintenance/ai-workers")
+async def get_ai_worker_stats(
+    _: bool = Depends(verify_admin_token),
+):
+    """取得 AI 常駐行程 pool 統計（忙碌、預熱、回收、拒絕數）"""
+    from app.services.ai_service import get_ai_service
+
+    pool = get_ai_service().worker_pool
+    if pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **pool.stats()}
+
+
+@router.get("/maintenance/ai-scheduler")
+async def get_ai_scheduler_stats(
+    _: bool = Depends(verify_admin_token),
+):
+    """取得 AI 排程統計（各 lane 併發、排隊等待時間、拒絕數）"""
+    from app.services.ai_service import get_ai_service
+
+    return get_ai_service().scheduler.stats()
+
+
+@router.get("/maintenance/fast-path")
+async def get_fast_path_stats(
+    _: bool = Depends(verify_admin_token),
+):
+    """取得點餐快速判斷統計（命中率、節省的 AI 延遲）"""
+    from app.services.order_intent import order_intent_engine
+
+    return order_intent_engine.stats()
+
+
+@router.get("/maintenance/cache")
+async def get_cache_stats(
+    _: bool = Depends(verify_admin_token),
+):
+    """取得記憶體快取統計（各 namespace 筆數、估算位元組、命中率、淘汰數與跨行程廣播狀態）"""
+    from app.services.cache_bus import cache_bus
+
+    return {**CacheService.stats(), "bus": cache_bus.stats()}
+
+
+@router.get("/maintenance/broadcast")
+async def get_broadcast_stats(
+    _: bool = Depends(verify_admin_token),
+):
+    """取得 Socket.IO 事件合併統計（排入、合併、節流、實際發送數）"""
+    from app.broadcast import get_broadcast_stats
+
+    return get_broadcast_stats()
+
+
 @router.post("/maintenance/cleanup-chat")
 async def cleanup_chat_messages(
     retention_days: int = 365,
@@ -1195,22 +1239,32 @@ async def get_security_logs(
     offset: int = 0,
     line_user_id: Optional[str] = None,
     line_group_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    approximate_total: bool = False,
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_admin_token),
 ):
-    """取得安全日誌列表"""
+    """取得安全日誌列表
+
+    cursor 為上一頁回傳的 next_cursor（keyset 分頁，total 回傳 null）；
+    approximate_total 為 true 且沒有篩選條件時以估計值作為總數。
+    """
+    _validate_cursor(cursor)
     repo = SecurityLogRepository(db)
+    limit = min(limit, 100)  # 最多 100 筆
 
     logs = await repo.get_recent(
-        limit=min(limit, 100),  # 最多 100 筆
+        limit=limit,
         offset=offset,
         line_user_id=line_user_id,
         line_group_id=line_group_id,
+        cursor=cursor,
     )
 
-    total = await repo.get_total_count(
+    total = None if cursor else await repo.get_total_count(
         line_user_id=line_user_id,
         line_group_id=line_group_id,
+        approximate=approximate_total,
     )
 
     return {
@@ -1231,6 +1285,7 @@ async def get_security_logs(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor(logs, limit),
     }
 
 
@@ -1254,6 +1309,8 @@ async def get_users(
     offset: int = 0,
     search: Optional[str] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    approximate_total: bool = False,
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_admin_token),
 ):
@@ -1264,10 +1321,14 @@ async def get_users(
         offset: 偏移量
         search: 搜尋關鍵字（名稱或 LINE ID）
         status: 狀態篩選（all/active/banned）
+        cursor: 上一頁回傳的 next_cursor（keyset 分頁，total 回傳 null）
+        approximate_total: 沒有篩選條件時以估計值作為總數
     """
+    _validate_cursor(cursor, search)
     repo = UserRepository(db)
     users, total = await repo.get_all_paginated(
-        limit=limit, offset=offset, search=search, status=status
+        limit=limit, offset=offset, search=search, status=status,
+        cursor=cursor, approximate_total=approximate_total,
     )
 
     # 取得每個使用者的統計資訊
@@ -1291,6 +1352,7 @@ async def get_users(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": None if search else next_cursor(users, limit),
     }
 
 
@@ -1622,18 +1684,28 @@ async def get_ai_logs(
     limit: int = 20,
     offset: int = 0,
     group_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    approximate_total: bool = False,
     db: AsyncSession = Depends(get_db),
     _: bool = Depends(verify_admin_token),
 ):
-    """取得 AI 對話日誌列表"""
+    """取得 AI 對話日誌列表
+
+    cursor 為上一頁回傳的 next_cursor（keyset 分頁，total 回傳 null）；
+    approximate_total 為 true 且沒有篩選條件時以估計值作為總數。
+    """
+    _validate_cursor(cursor)
     repo = AiLogRepository(db)
 
     logs = await repo.get_list(
         limit=limit,
         offset=offset,
         group_id=group_id,
+        cursor=cursor,
+    )
+    total = None if cursor else await repo.get_total_count(
+        group_id=group_id, approximate=approximate_total
     )
-    total = await repo.get_total_count(group_id=group_id)
 
     return {
         "logs": [
@@ -1654,6 +1726,7 @@ async def get_ai_logs(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor(logs, limit),
     }
 
 
@@ -1,12 +1,14 @@
 """看板 API 路由"""
-from datetime import date
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.models.group import Group
+from app.repositories.order_repo import get_today_tw
+from app.services.board_feed import BoardFeed, serialize_board_order
 from app.repositories import (
     GroupRepository,
     OrderSessionRepository,
@@ -40,57 +42,30 @@ async def get_board_orders(
     group_id: Optional[UUID] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """取得看板訂單（當日）"""
+    """取得看板訂單（當日）
+
+    所有群組的 Session、訂單、品項、使用者以固定次數的查詢一次載入。
+    """
     session_repo = OrderSessionRepository(db)
-    group_repo = GroupRepository(db)
+    groups = await _get_board_groups(db, group_id)
 
-    result = []
-
-    if group_id:
-        # 指定群組
-        groups = [await group_repo.get_by_id(group_id)]
-    else:
-        # 所有已啟用群組
-        groups = await group_repo.get_active_groups()
+    sessions_by_group = {group.id: [] for group in groups}
+    for session in await session_repo.get_sessions_with_orders(
+        list(sessions_by_group), get_today_tw()
+    ):
+        sessions_by_group[session.group_id].append(session)
 
+    result = []
     for group in groups:
-        if not group:
-            continue
-
-        # 取得今日的 Session
-        sessions = await session_repo.get_group_sessions(
-            group.id, start_date=date.today(), end_date=date.today()
-        )
-
-        for session in sessions:
-            session_with_orders = await session_repo.get_with_orders(session.id)
-            if not session_with_orders:
-                continue
-
-            orders = []
-            for order in session_with_orders.orders:
-                orders.append({
-                    "user_id": str(order.user_id),
-                    "display_name": order.user.display_name if order.user else "未知",
-                    "items": [
-                        {
-                            "name": item.name,
-                            "quantity": item.quantity,
-                            "subtotal": float(item.subtotal),
-                            "options": item.options,
-                            "note": item.note,
-                        }
-                        for item in order.items
-                    ],
-                    "total": float(order.total_amount),
-                    "payment_status": order.payment_status,
-                })
+        for session in sessions_by_group[group.id]:
+            orders = [serialize_board_order(order) for order in session.orders]
 
             result.append({
                 "group_id": str(group.id),
                 "group_name": group.name,
                 "session_id": str(session.id),
                 "session_status": session.status,
+                "seq": group.board_seq,
                 "orders": orders,
                 "total": sum(o["total"] for o in orders),
                 "count": len(orders),
@@ -99,6 +74,16 @@ async def get_board_orders(
     return result
 
 
+@router.get("/orders/changes")
+async def get_board_order_changes(
+    group_id: UUID,
+    since: int = Query(..., ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """取得群組序號 since 之後的訂單異動（看板補齊漏掉的增量更新，reset 為 true 時需重新載入）"""
+    return await BoardFeed(db).get_changes(group_id, since)
+
+
 @router.get("/chat")
 async def get_board_chat(
     group_id: Optional[UUID] = None,
@@ -130,21 +115,11 @@ async def get_all_today_stores(
 ):
     """取得所有群組的今日店家"""
     today_repo = GroupTodayStoreRepository(db)
-    group_repo = GroupRepository(db)
-
-    result = []
+    groups = await _get_board_groups(db, group_id)
+    stores_by_group = await today_repo.get_today_stores_for_groups([group.id for group in groups])
 
-    if group_id:
-        groups = [await group_repo.get_by_id(group_id)]
-    else:
-        groups = await group_repo.get_active_groups()
-
-    for group in groups:
-        if not group:
-            continue
-
-        today_stores = await today_repo.get_today_stores(group.id)
-        result.append({
+    return [
+        {
             "group_id": str(group.id),
             "group_name": group.name,
             "stores": [
@@ -152,8 +127,17 @@ async def get_all_today_stores(
                     "store_id": str(ts.store_id),
                     "store_name": ts.store.name if ts.store else None,
                 }
-                for ts in today_stores
+                for ts in stores_by_group[group.id]
             ],
-        })
+        }
+        for group in groups
+    ]
 
-    return result
+
+async def _get_board_groups(db: AsyncSession, group_id: Optional[UUID]) -> List[Group]:
+    """指定群組（不存在時為空）或所有已啟用群組"""
+    group_repo = GroupRepository(db)
+    if group_id:
+        group = await group_repo.get_by_id(group_id)
+        return [group] if group else []
+    return await group_repo.get_active_groups()
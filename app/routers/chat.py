@@ -8,7 +8,8 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.services import AiService, CacheService
+from app.services import CacheService
+from app.services.ai_service import get_ai_service
 from app.repositories import (
     StoreRepository,
     GroupTodayStoreRepository,
@@ -50,7 +51,7 @@ async def chat(
     _: bool = Depends(verify_admin_token),
 ):
     """AI 聊天 API"""
-    ai_service = AiService()
+    ai_service = get_ai_service()
 
     # 根據模式取得提示詞
     if request.is_manager:
@@ -59,15 +60,13 @@ async def chat(
         prompt_name = "group_ordering"
 
     # 從快取或資料庫取得提示詞
-    system_prompt = CacheService.get_prompt(prompt_name)
+    async def load_prompt() -> Optional[str]:
+        prompt = await AiPromptRepository(db).get_by_name(prompt_name)
+        return prompt.content if prompt else None
+
+    system_prompt = await CacheService.load_prompt(prompt_name, load_prompt)
     if not system_prompt:
-        prompt_repo = AiPromptRepository(db)
-        prompt = await prompt_repo.get_by_name(prompt_name)
-        if prompt:
-            system_prompt = prompt.content
-            CacheService.set_prompt(prompt_name, system_prompt)
-        else:
-            raise ValueError(f"找不到提示詞：{prompt_name}，請確認資料庫已執行 alembic upgrade")
+        raise ValueError(f"找不到提示詞：{prompt_name}，請確認資料庫已執行 alembic upgrade")
 
     # 建立上下文
     context = await _build_context(db, request.username, request.is_manager, request.group_id)
@@ -83,6 +82,7 @@ async def chat(
         system_prompt=system_prompt,
         context=context,
         history=history,
+        purpose="manager_prompt",
     )
 
     # 記錄 AI Log（超管對話，user_id 和 group_id 為空）
@@ -174,7 +174,7 @@ async def _execute_actions(db: AsyncSession, actions: list) -> None:
                 repo = GroupTodayStoreRepository(db)
                 await repo.clear_today_stores(UUID(group_id))
                 await repo.set_today_store(UUID(group_id), UUID(store_id))
-                CacheService.clear_today_stores(group_id)
+                CacheService.clear_today_stores(group_id, db)
                 # 廣播今日店家變更
                 await emit_store_change(group_id, {
                     "group_id": group_id,
@@ -188,7 +188,7 @@ async def _execute_actions(db: AsyncSession, actions: list) -> None:
             if store_id and group_id:
                 repo = GroupTodayStoreRepository(db)
                 await repo.set_today_store(UUID(group_id), UUID(store_id))
-                CacheService.clear_today_stores(group_id)
+                CacheService.clear_today_stores(group_id, db)
                 # 廣播今日店家變更
                 await emit_store_change(group_id, {
                     "group_id": group_id,
@@ -202,7 +202,7 @@ async def _execute_actions(db: AsyncSession, actions: list) -> None:
             if store_id and group_id:
                 repo = GroupTodayStoreRepository(db)
                 await repo.remove_today_store(UUID(group_id), UUID(store_id))
-                CacheService.clear_today_stores(group_id)
+                CacheService.clear_today_stores(group_id, db)
                 # 廣播今日店家變更
                 await emit_store_change(group_id, {
                     "group_id": group_id,
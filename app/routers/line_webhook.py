@@ -1,9 +1,7 @@
 """LINE Webhook 路由"""
 import logging
-from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Header
-from linebot.v3.webhook import WebhookParser
+from fastapi import APIRouter, HTTPException, Request, Header
 from linebot.v3.exceptions import InvalidSignatureError
 from linebot.v3.webhooks import (
     MessageEvent,
@@ -12,55 +10,97 @@ from linebot.v3.webhooks import (
     LeaveEvent,
     PostbackEvent,
 )
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import settings
-from app.database import get_db
+from app.broadcast import clear_events, flush_events
+from app.database import async_session_factory
 from app.services import LineService
+from app.services.line_client import get_webhook_parser
+from app.services.webhook_queue import webhook_queue
 
 logger = logging.getLogger("jaba.webhook")
 
 router = APIRouter(prefix="/api/webhook", tags=["webhook"])
 
-# LINE Webhook Parser
-parser = WebhookParser(settings.line_channel_secret)
-
 
 @router.post("/line")
 async def line_callback(
     request: Request,
     x_line_signature: str = Header(...),
-    db: AsyncSession = Depends(get_db),
 ):
-    """LINE Webhook 回調"""
+    """LINE Webhook 回調
+
+    只驗證簽章並將事件放入背景隊列，立即回應 LINE；
+    事件依群組分片，由 webhook_queue 的 worker 分片內依序、分片間平行處理。
+    """
     body = await request.body()
     body_str = body.decode("utf-8")
 
     try:
-        events = parser.parse(body_str, x_line_signature)
+        events = get_webhook_parser().parse(body_str, x_line_signature)
     except InvalidSignatureError:
         logger.warning("Invalid LINE signature")
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-    service = LineService(db)
-
-    for event in events:
-        try:
-            if isinstance(event, MessageEvent):
-                if isinstance(event.message, TextMessageContent):
-                    await handle_text_message(service, event)
-            elif isinstance(event, JoinEvent):
-                await handle_join_event(service, event)
-            elif isinstance(event, LeaveEvent):
-                await handle_leave_event(service, event)
-            elif isinstance(event, PostbackEvent):
-                await handle_postback_event(service, event)
-        except Exception as e:
-            logger.error(f"Error handling event: {e}", exc_info=True)
+    if events and not webhook_queue.enqueue_batch(
+        [(get_event_key(event), event) for event in events]
+    ):
+        # 隊列已滿或正在關閉，讓 LINE 稍後重送
+        raise HTTPException(status_code=503, detail="Webhook queue unavailable")
 
     return {"status": "ok"}
 
 
+def get_event_key(event) -> str:
+    """取得事件的分片 key（群組 > 聊天室 > 使用者）"""
+    source = getattr(event, "source", None)
+    if source is None:
+        return "_"
+
+    if source.type == "group":
+        return f"group:{source.group_id}"
+    if source.type == "room":
+        return f"room:{source.room_id}"
+    return f"user:{getattr(source, 'user_id', None) or '_'}"
+
+
+async def process_shard(key: str, events: list) -> None:
+    """依序處理同一分片的事件（由背景 worker 呼叫）
+
+    同一分片共用一個 DB session，每個事件處理完即 commit 並發送 Socket 通知；
+    單一事件失敗只 rollback 該事件，不影響後續事件。
+    """
+    async with async_session_factory() as db:
+        service = LineService(db)
+
+        for event in events:
+            # worker 為長駐 task，先清掉前一個事件可能殘留的廣播
+            clear_events()
+            try:
+                await dispatch_event(service, event)
+                await db.commit()
+                await flush_events()
+            except Exception as e:
+                await db.rollback()
+                clear_events()
+                logger.error(f"Error handling event ({key}): {e}", exc_info=True)
+            finally:
+                # 下一個事件重新從 DB 載入，避免沿用其他連線已修改的舊資料
+                db.expunge_all()
+
+
+async def dispatch_event(service: LineService, event) -> None:
+    """依事件類型分派處理"""
+    if isinstance(event, MessageEvent):
+        if isinstance(event.message, TextMessageContent):
+            await handle_text_message(service, event)
+    elif isinstance(event, JoinEvent):
+        await handle_join_event(service, event)
+    elif isinstance(event, LeaveEvent):
+        await handle_leave_event(service, event)
+    elif isinstance(event, PostbackEvent):
+        await handle_postback_event(service, event)
+
+
 async def handle_text_message(service: LineService, event: MessageEvent):
     """處理文字訊息"""
     text = event.message.text
@@ -0,0 +1,199 @@
+"""AI 呼叫排程器 - 依用途分配併發額度與優先順序
+
+對話（haiku）與菜單辨識（opus）各有獨立的併發額度（lane），
+管理員上傳菜單照片不會吃掉午餐時段群組點餐的名額。
+
+同一 lane 內依用途排優先順序：群組點餐 > 個人 / 申請對話 > 超管對話 > 菜單辨識。
+額度用完時請求排隊等待；預估等待時間超過上限（例如 LINE reply token
+的有效時間）時直接拒絕，讓呼叫端回覆「請稍後再試」，而不是等到 token 過期。
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger("jaba.ai.scheduler")
+
+# 用途優先順序（數字越小越優先）
+PRIORITIES: Dict[str, int] = {
+    "group_ordering": 0,
+    "personal_preferences": 1,
+    "group_application": 1,
+    "manager_prompt": 2,
+    "menu_recognition": 3,
+}
+DEFAULT_PRIORITY = 1
+
+# 執行時間移動平均權重
+_EWMA_ALPHA = 0.2
+
+
+class AiQueueFull(Exception):
+    """排隊等待時間超過上限"""
+
+
+class AiLane:
+    """單一併發額度（有優先順序的 semaphore）"""
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._avg_run_s: Optional[float] = None
+
+        # 統計
+        self._admitted = 0
+        self._rejected = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._by_purpose: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def avg_run_ms(self) -> Optional[float]:
+        """平均執行時間（毫秒，尚無資料時為 None）"""
+        return self._avg_run_s * 1000 if self._avg_run_s is not None else None
+
+    def _pending(self, priority: Optional[int] = None) -> int:
+        """排隊中的請求數（指定 priority 時只計算不低於該優先順序者）"""
+        return sum(
+            1 for p, _, fut in self._waiters
+            if not fut.done() and (priority is None or p <= priority)
+        )
+
+    def estimate_wait(self, priority: int) -> float:
+        """依排在前面的請求數與平均執行時間預估等待秒數"""
+        ahead = self._pending(priority)
+        if self._active < self.concurrency and ahead == 0:
+            return 0.0
+        if self._avg_run_s is None:
+            return 0.0
+        return (ahead // self.concurrency + 1) * self._avg_run_s
+
+    async def _acquire(self, priority: int, max_wait: float) -> None:
+        if self._active < self.concurrency and self._pending() == 0:
+            self._active += 1
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            # 名額由 _release 直接轉交，_active 已在轉交時計入
+            await asyncio.wait_for(fut, timeout=max_wait)
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                # 已取得名額但呼叫端被取消，歸還名額
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self._active -= 1
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self._active += 1
+                fut.set_result(None)
+                return
+
+    def _record(self, purpose: str, wait_ms: float, admitted: bool) -> None:
+        entry = self._by_purpose.setdefault(
+            purpose, {"admitted": 0, "rejected": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+        )
+        if admitted:
+            self._admitted += 1
+            entry["admitted"] += 1
+            self._total_wait_ms += wait_ms
+            entry["total_wait_ms"] += wait_ms
+            self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+            entry["max_wait_ms"] = max(entry["max_wait_ms"], wait_ms)
+        else:
+            self._rejected += 1
+            entry["rejected"] += 1
+
+    @asynccontextmanager
+    async def slot(self, purpose: str, max_wait: float) -> AsyncIterator[None]:
+        """取得執行名額，預估或實際等待超過 max_wait 時丟出 AiQueueFull"""
+        priority = PRIORITIES.get(purpose, DEFAULT_PRIORITY)
+
+        estimate = self.estimate_wait(priority)
+        if estimate > max_wait:
+            self._record(purpose, 0, admitted=False)
+            logger.warning(
+                f"AI lane '{self.name}' rejected {purpose}: "
+                f"estimated wait {estimate:.1f}s > {max_wait}s"
+            )
+            raise AiQueueFull(f"estimated wait {estimate:.1f}s")
+
+        queued_at = time.monotonic()
+        try:
+            await self._acquire(priority, max_wait)
+        except asyncio.TimeoutError:
+            self._record(purpose, 0, admitted=False)
+            logger.warning(f"AI lane '{self.name}' rejected {purpose}: waited {max_wait}s")
+            raise AiQueueFull(f"waited {max_wait}s")
+
+        started_at = time.monotonic()
+        self._record(purpose, (started_at - queued_at) * 1000, admitted=True)
+        try:
+            yield
+        finally:
+            run_s = time.monotonic() - started_at
+            if self._avg_run_s is None:
+                self._avg_run_s = run_s
+            else:
+                self._avg_run_s += _EWMA_ALPHA * (run_s - self._avg_run_s)
+            self._release()
+
+    def stats(self) -> dict:
+        """取得 lane 統計"""
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "waiting": self._pending(),
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._total_wait_ms / self._admitted, 1) if self._admitted else 0,
+            "max_wait_ms": round(self._max_wait_ms, 1),
+            "avg_run_ms": round(self.avg_run_ms, 1) if self.avg_run_ms is not None else None,
+            "by_purpose": {
+                purpose: {
+                    "admitted": int(entry["admitted"]),
+                    "rejected": int(entry["rejected"]),
+                    "avg_wait_ms": round(entry["total_wait_ms"] / entry["admitted"], 1)
+                    if entry["admitted"] else 0,
+                    "max_wait_ms": round(entry["max_wait_ms"], 1),
+                }
+                for purpose, entry in self._by_purpose.items()
+            },
+        }
+
+
+class AiScheduler:
+    """AI 呼叫排程器（對話 / 菜單辨識各一條 lane）"""
+
+    def __init__(self):
+        self.lanes: Dict[str, AiLane] = {
+            "chat": AiLane("chat", settings.ai_chat_concurrency),
+            "menu": AiLane("menu", settings.ai_menu_concurrency),
+        }
+        self.max_wait: Dict[str, float] = {
+            "chat": settings.ai_queue_max_wait,
+            "menu": settings.ai_menu_queue_max_wait,
+        }
+
+    def slot(self, lane: str, purpose: str):
+        """取得指定 lane 的執行名額（async context manager）"""
+        return self.lanes[lane].slot(purpose, self.max_wait[lane])
+
+    def stats(self) -> dict:
+        """取得所有 lane 統計"""
+        return {
+            name: {"max_wait_s": self.max_wait[name], **lane.stats()}
+            for name, lane in self.lanes.items()
+        }
@@ -7,12 +7,17 @@ import re
 import tempfile
 import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 
+from app.config import settings
+from app.services.ai_scheduler import AiQueueFull, AiScheduler
+from app.services.ai_worker_pool import AiWorkerPoolBusy, ClaudeWorkerPool
 from app.services.cache_service import CacheService
 
 logger = logging.getLogger("jaba.ai")
 
+_json_decoder = json.JSONDecoder()
+
 
 def sanitize_user_input(text: str, max_length: int = 200) -> Tuple[str, list[str]]:
     """
@@ -73,6 +78,82 @@ def estimate_tokens(text: str) -> int:
     return len(text) // 2
 
 
+class _ReplyDetector:
+    """串流回應中偵測已完整輸出的回覆 JSON
+
+    片段存成 list，需要全文時才串接；掃描只看新收到的片段，追蹤大括號配對與
+    字串狀態，只保留尚未配對完成的物件文字供解析。每當一個物件的 `}` 出現就
+    解析該物件，同時含 message 與 actions 的記為候選（後出現的取代先前的）。
+
+    回覆前可能先輸出格式範例等同樣形狀的物件，所以串流結束（finish，
+    即 message_stop）時才以最後一個候選設定 found。
+    """
+
+    _TOKENS = re.compile(r'[{}"\\]')
+
+    def __init__(self):
+        self.found: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._parts: list[str] = []
+        self._length = 0                 # 已收到的字元數（片段起點的絕對位置）
+        self._starts: list[int] = []     # 尚未配對的 `{` 位置
+        self._open_parts: list[str] = []  # 最外層未配對 `{` 之後的文字
+        self._open_base = 0              # _open_parts 第一個字元的位置
+        self._in_string = False
+        self._skip = -1                  # 字串中跳脫字元的位置
+        self._reply: Optional[dict] = None
+
+    @property
+    def text(self) -> str:
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def feed(self, chunk: str) -> None:
+        self._parts.append(chunk)
+        offset = self._length
+        self._length += len(chunk)
+        if self.found.done():
+            return
+
+        if self._starts:
+            self._open_parts.append(chunk)
+        for match in self._TOKENS.finditer(chunk):
+            pos = offset + match.start()
+            char = match.group()
+            if pos == self._skip:
+                continue
+            if self._in_string:
+                if char == "\\":
+                    self._skip = pos + 1
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # 物件外的引號屬於說明文字，不影響配對
+                self._in_string = bool(self._starts)
+            elif char == "{":
+                if not self._starts:
+                    self._open_base = pos
+                    self._open_parts = [chunk[match.start():]]
+                self._starts.append(pos)
+            elif char == "}" and self._starts:
+                start = self._starts.pop()
+                opened = "".join(self._open_parts)
+                self._open_parts = [opened]
+                try:
+                    parsed = json.loads(opened[start - self._open_base:pos + 1 - self._open_base])
+                except json.JSONDecodeError:
+                    parsed = None
+                if isinstance(parsed, dict) and "message" in parsed and "actions" in parsed:
+                    self._reply = parsed
+                if not self._starts:
+                    self._open_parts = []
+
+    def finish(self) -> None:
+        """回應串流結束，以最後一個完整的回覆物件設定 found"""
+        if self._reply is not None and not self.found.done():
+            self.found.set_result(self._reply)
+
+
 class AiService:
     """AI 服務 - 使用 Claude Code (CLI)"""
 
@@ -84,6 +165,30 @@ class AiService:
         # 工作目錄（使用獨立目錄，避免讀取專案的 CLAUDE.md）
         self.working_dir = "/tmp/jaba-ai-cli"
         os.makedirs(self.working_dir, exist_ok=True)
+        self.chat_timeout = 120
+        # 對話 / 菜單辨識各自的併發額度與優先順序
+        self.scheduler = AiScheduler()
+        # 對話用常駐 worker pool（AI_WORKER_POOL_SIZE=0 則每次啟動新行程）
+        self.worker_pool: Optional[ClaudeWorkerPool] = None
+        if settings.ai_worker_pool_size > 0:
+            self.worker_pool = ClaudeWorkerPool(
+                claude_path=self.claude_path,
+                working_dir=self.working_dir,
+                size=settings.ai_worker_pool_size,
+                max_requests=settings.ai_worker_max_requests,
+                acquire_timeout=settings.ai_worker_acquire_timeout,
+                idle_ttl=settings.ai_worker_idle_ttl,
+            )
+
+    def start(self) -> None:
+        """啟動 worker pool 背景健康檢查（由 main.py lifespan 呼叫）"""
+        if self.worker_pool:
+            self.worker_pool.start()
+
+    async def close(self) -> None:
+        """關閉所有常駐 CLI 行程"""
+        if self.worker_pool:
+            await self.worker_pool.close()
 
     def _find_claude_path(self) -> str:
         """尋找 Claude Code (CLI) 路徑"""
@@ -117,10 +222,18 @@ class AiService:
         system_prompt: str,
         context: Optional[dict] = None,
         history: Optional[list] = None,
+        purpose: str = "group_ordering",
+        stream: bool = False,
     ) -> dict:
         """
         與 AI 對話（使用 Claude Code (CLI)）
 
+        Args:
+            purpose: 用途（決定排隊優先順序，見 ai_scheduler.PRIORITIES）
+            stream: 串流模式（需啟用 worker pool）。回應訊息串流結束（message_stop）時
+                以最後一個完整的 {"message", "actions"} 物件先回傳，不等 CLI 的 result 事件；
+                呼叫端處理完回覆後須呼叫 finalize() 補齊 _raw 等日誌欄位。
+
         Returns:
             {
                 "message": "AI 回應文字",
@@ -140,7 +253,8 @@ class AiService:
             history_str = self._format_chat_history(history) if history else "(無先前對話)"
 
             # 組合完整訊息
-            context_str = json.dumps(context, ensure_ascii=False, indent=2) if context else "{}"
+            # 精簡格式（不縮排、無多餘空白），減少 prompt token
+            context_str = json.dumps(context, ensure_ascii=False, separators=(",", ":")) if context else "{}"
             current_user = context.get("user_name", "使用者") if context else "使用者"
 
             full_message = f"""[系統上下文]
@@ -164,43 +278,59 @@ class AiService:
 [User Message]
 {full_message}"""
 
-            # 建構 Claude Code (CLI) 命令
-            cmd = [
-                self.claude_path, "-p",
-                "--model", self.chat_model,
-                "--system-prompt", system_prompt,
-                full_message
-            ]
-
-            # 使用 asyncio 非同步執行（設定 cwd 確保 CLI 正確執行）
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=self.working_dir,
+            detector = _ReplyDetector() if stream and self.worker_pool else None
+            run_task = asyncio.ensure_future(
+                self._run_chat_in_slot(purpose, system_prompt, full_message, detector)
             )
-            stdout_bytes, stderr_bytes = await asyncio.wait_for(
-                proc.communicate(),
-                timeout=120
-            )
-            stdout = stdout_bytes.decode('utf-8') if stdout_bytes else ''
-            stderr = stderr_bytes.decode('utf-8') if stderr_bytes else ''
+
+            if detector:
+                await asyncio.wait({run_task, detector.found}, return_when=asyncio.FIRST_COMPLETED)
+                if detector.found.done() and not run_task.done():
+                    result = dict(detector.found.result())
+                    result["_raw"] = detector.text
+                    result["_input_prompt"] = input_prompt
+                    result["_duration_ms"] = int((time.time() - start_time) * 1000)
+                    result["_model"] = self.chat_model
+                    result["_input_tokens"] = estimate_tokens(input_prompt)
+                    result["_output_tokens"] = estimate_tokens(detector.text)
+                    result["_pending"] = asyncio.ensure_future(
+                        self._await_stream(run_task, start_time)
+                    )
+                    logger.debug(f"AI early reply after {result['_duration_ms']}ms")
+                    return result
+                detector.found.cancel()
+
+            stdout, stderr, return_code, usage = await run_task
 
             # 計算執行時間
             duration_ms = int((time.time() - start_time) * 1000)
 
             # 解析回應
-            result = self._parse_response(stdout, stderr, proc.returncode)
+            result = self._parse_response(stdout, stderr, return_code)
 
-            # 附加日誌資訊
+            # 附加日誌資訊（worker 回報實際 token 用量時優先使用）
             result["_input_prompt"] = input_prompt
             result["_duration_ms"] = duration_ms
             result["_model"] = self.chat_model
-            result["_input_tokens"] = estimate_tokens(input_prompt)
-            result["_output_tokens"] = estimate_tokens(result.get("_raw", ""))
+            result["_input_tokens"] = usage.get("input_tokens") or estimate_tokens(input_prompt)
+            result["_output_tokens"] = usage.get("output_tokens") or estimate_tokens(result.get("_raw", ""))
 
             return result
 
+        except (AiQueueFull, AiWorkerPoolBusy) as e:
+            duration_ms = int((time.time() - start_time) * 1000)
+            logger.warning(f"AI chat rejected ({purpose}): {e}")
+            return {
+                "message": "抱歉，目前詢問的人太多了，請稍後再試。",
+                "actions": [],
+                "_raw": "",
+                "_input_prompt": "",
+                "_duration_ms": duration_ms,
+                "_model": self.chat_model,
+                "_input_tokens": 0,
+                "_output_tokens": 0,
+            }
+
         except asyncio.TimeoutError:
             duration_ms = int((time.time() - start_time) * 1000)
             logger.error("AI chat timeout")
@@ -228,6 +358,109 @@ class AiService:
                 "_output_tokens": 0,
             }
 
+    async def finalize(self, result: dict) -> dict:
+        """
+        等待串流模式的 CLI 輸出完畢，以完整回應更新日誌欄位
+
+        非串流或未提早回傳的結果直接原樣回傳。
+        """
+        pending = result.pop("_pending", None)
+        if pending is None:
+            return result
+
+        try:
+            stdout, stderr, return_code, usage, duration_ms = await pending
+        except Exception as e:
+            logger.warning(f"AI stream completion failed: {e}")
+            return result
+
+        final = self._parse_response(stdout, stderr, return_code)
+        if final.get("message") != result.get("message"):
+            logger.warning("AI final response differs from early reply, early reply was used")
+
+        result["_raw"] = final.get("_raw") or result.get("_raw", "")
+        result["_duration_ms"] = duration_ms
+        result["_input_tokens"] = usage.get("input_tokens") or result.get("_input_tokens")
+        result["_output_tokens"] = usage.get("output_tokens") or estimate_tokens(result["_raw"])
+        return result
+
+    async def _await_stream(self, run_task: asyncio.Future, start_time: float) -> tuple:
+        """等待背景中的 CLI 輸出完畢，回傳 (stdout, stderr, return_code, usage, duration_ms)"""
+        stdout, stderr, return_code, usage = await run_task
+        return stdout, stderr, return_code, usage, int((time.time() - start_time) * 1000)
+
+    async def _run_chat_in_slot(
+        self,
+        purpose: str,
+        system_prompt: str,
+        full_message: str,
+        detector: Optional["_ReplyDetector"] = None,
+    ) -> Tuple[str, str, int, dict]:
+        """取得排程名額後執行對話（串流時名額持續到 CLI 輸出完畢）"""
+        async with self.scheduler.slot("chat", purpose):
+            return await self._run_chat(
+                system_prompt,
+                full_message,
+                on_text=detector.feed if detector else None,
+                on_text_end=detector.finish if detector else None,
+            )
+
+    async def _run_chat(
+        self,
+        system_prompt: str,
+        full_message: str,
+        on_text: Optional[Callable[[str], None]] = None,
+        on_text_end: Optional[Callable[[], None]] = None,
+    ) -> Tuple[str, str, int, dict]:
+        """執行一次對話
+
+        有 worker pool 時交給常駐行程，否則啟動一次性的 `claude -p`。
+
+        Returns:
+            (stdout, stderr, return_code, usage)
+        """
+        if self.worker_pool:
+            event = await self.worker_pool.run(
+                model=self.chat_model,
+                system_prompt=system_prompt,
+                message=full_message,
+                timeout=self.chat_timeout,
+                on_text=on_text,
+                on_text_end=on_text_end,
+            )
+            text = event.get("result") or ""
+            if event.get("is_error"):
+                return "", text or event.get("subtype", ""), 1, {}
+            return text, "", 0, event.get("usage") or {}
+
+        # 建構 Claude Code (CLI) 命令
+        cmd = [
+            self.claude_path, "-p",
+            "--model", self.chat_model,
+            "--system-prompt", system_prompt,
+            full_message
+        ]
+
+        # 使用 asyncio 非同步執行（設定 cwd 確保 CLI 正確執行）
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.working_dir,
+        )
+        try:
+            stdout_bytes, stderr_bytes = await asyncio.wait_for(
+                proc.communicate(),
+                timeout=self.chat_timeout
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        stdout = stdout_bytes.decode('utf-8') if stdout_bytes else ''
+        stderr = stderr_bytes.decode('utf-8') if stderr_bytes else ''
+        return stdout, stderr, proc.returncode, {}
+
     def _format_chat_history(self, history: list) -> str:
         """格式化對話歷史"""
         if not history:
@@ -247,54 +480,28 @@ class AiService:
 
     def _extract_last_json_object(self, text: str) -> Optional[str]:
         """
-        使用括號平衡法提取文字中包含 message 欄位的 JSON 物件
+        提取文字中最後一個包含 message 欄位的 JSON 物件
         支援任意巢狀深度
+
+        由最後一個 `{` 往前，以 JSONDecoder.raw_decode 嘗試解析，
+        第一個成功且含 message 的物件即為答案（與由前往後收集、取最後一個的結果相同）。
+        解析失敗的位置很快就會被 C 實作的解碼器拒絕，不需對每個 `{` 各自掃描到結尾。
         """
-        # 找所有 { 的位置
-        brace_positions = [i for i, c in enumerate(text) if c == '{']
-        valid_jsons = []
-
-        for start in brace_positions:
-            depth = 0
-            in_string = False
-            escape_next = False
-
-            for i in range(start, len(text)):
-                char = text[i]
-
-                if escape_next:
-                    escape_next = False
-                    continue
-
-                if char == '\\' and in_string:
-                    escape_next = True
-                    continue
-
-                if char == '"' and not escape_next:
-                    in_string = not in_string
-                    continue
-
-                if in_string:
-                    continue
-
-                if char == '{':
-                    depth += 1
-                elif char == '}':
-                    depth -= 1
-                    if depth == 0:
-                        # 找到完整的 JSON 物件
-                        candidate = text[start:i+1]
-                        # 驗證是否為有效 JSON 且包含 message 欄位
-                        try:
-                            parsed = json.loads(candidate)
-                            if isinstance(parsed, dict) and "message" in parsed:
-                                valid_jsons.append(candidate)
-                        except json.JSONDecodeError:
-                            pass
-                        break
-
-        # 返回最後一個有效的 JSON（通常是 AI 的最終回應）
-        return valid_jsons[-1] if valid_jsons else None
+        end = len(text)
+        while True:
+            start = text.rfind('{', 0, end)
+            if start < 0:
+                return None
+
+            try:
+                parsed, stop = _json_decoder.raw_decode(text, start)
+            except json.JSONDecodeError:
+                parsed = None
+
+            if isinstance(parsed, dict) and "message" in parsed:
+                return text[start:stop]
+
+            end = start
 
     def _parse_response(self, stdout: str, stderr: str, return_code: int) -> dict:
         """
@@ -410,16 +617,23 @@ class AiService:
             ]
 
             # 使用 asyncio 非同步執行（設定 cwd 確保 CLI 正確執行）
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=self.working_dir,
-            )
-            stdout_bytes, stderr_bytes = await asyncio.wait_for(
-                proc.communicate(),
-                timeout=300  # 圖片辨識可能需要較長時間
-            )
+            async with self.scheduler.slot("menu", "menu_recognition"):
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=self.working_dir,
+                )
+                try:
+                    stdout_bytes, stderr_bytes = await asyncio.wait_for(
+                        proc.communicate(),
+                        timeout=300  # 圖片辨識可能需要較長時間
+                    )
+                except asyncio.TimeoutError:
+                    # 結束行程，避免逾時後仍佔用名額以外的資源
+                    proc.kill()
+                    await proc.wait()
+                    raise
             response_text = (stdout_bytes.decode('utf-8') if stdout_bytes else '').strip()
             error_text = (stderr_bytes.decode('utf-8') if stderr_bytes else '').strip()
 
@@ -449,6 +663,8 @@ class AiService:
                 preview = response_text[:300] if len(response_text) > 300 else response_text
                 return {"categories": [], "error": f"AI 回應不包含預期的 JSON 格式。回應：{preview}"}
 
+        except AiQueueFull:
+            return {"categories": [], "error": "目前辨識中的菜單較多，請稍後再試"}
         except asyncio.TimeoutError:
             return {"categories": [], "error": "辨識超時，請稍後再試"}
         except Exception as e:
@@ -459,3 +675,14 @@ class AiService:
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
 
+
+# 全域 AiService（CLI 路徑與工作目錄只需解析一次）
+_ai_service: Optional[AiService] = None
+
+
+def get_ai_service() -> AiService:
+    """取得共用的 AiService（第一次呼叫時建立）"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AiService()
+    return _ai_service
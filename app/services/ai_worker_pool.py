@@ -0,0 +1,411 @@
+"""Claude Code (CLI) 常駐 worker pool
+
+每次 `claude -p` 都要重新啟動 Node 行程，短訊息（如「+1」）的延遲幾乎都花在
+行程啟動上。這裡預先啟動以 stream-json 模式執行的 CLI 行程：
+
+    claude -p --input-format stream-json --output-format stream-json --verbose ...
+
+行程啟動後停在 stdin 等待訊息，請求進來時寫入一行 user 訊息，
+讀到 `{"type": "result"}` 事件即完成一次對話。
+啟用 --include-partial-messages，回應文字會以 text_delta 逐段送給 on_text，
+訊息結束（message_stop）時呼叫 on_text_end，
+呼叫端可在結果完整輸出前就先處理（見 AiService.chat 的串流模式）。
+
+- 依 (model, system_prompt) 分組，system prompt 於啟動時以參數指定
+- 同時存活的行程數上限為 size，全部忙碌時請求排隊等待（backpressure），
+  等待超過 acquire_timeout 則丟出 AiWorkerPoolBusy；已達上限且沒有同 key 的
+  閒置 worker 時，先終止其他 key 閒置最久的 worker 再啟動新行程
+- 每個 worker 服務 max_requests 次後回收；stream-json 模式下同一行程會累積
+  對話上下文，預設 1 次即回收以確保不同群組的對話互不可見
+- 使用後在背景補充預熱的 worker，下一個請求不必等行程啟動
+- 背景健康檢查清除已結束或閒置過久的行程
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger("jaba.ai.pool")
+
+# stream-json 單行可能很長（init 事件含工具清單），放寬 StreamReader 上限
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class AiWorkerPoolBusy(Exception):
+    """所有 worker 忙碌且等待逾時"""
+
+
+class ClaudeWorkerError(Exception):
+    """worker 行程異常結束或回應格式錯誤"""
+
+
+class ClaudeWorker:
+    """單一常駐 CLI 行程"""
+
+    def __init__(self, cmd: List[str], working_dir: str):
+        self.cmd = cmd
+        self.working_dir = working_dir
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.requests_served = 0
+        self.started_at = 0.0
+        self.idle_since = 0.0
+        self._stderr_tail: Deque[str] = deque(maxlen=20)
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """啟動行程（不等待第一個訊息）"""
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.working_dir,
+            limit=_STREAM_LIMIT,
+        )
+        self.started_at = time.monotonic()
+        self.idle_since = self.started_at
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+
+    async def _drain_stderr(self) -> None:
+        """持續讀取 stderr，避免 pipe 塞滿卡住行程"""
+        while self.proc and self.proc.stderr:
+            line = await self.proc.stderr.readline()
+            if not line:
+                break
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    @property
+    def stderr_tail(self) -> str:
+        return "\n".join(self._stderr_tail)
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def ask(
+        self,
+        message: str,
+        on_text: Optional[Callable[[str], None]] = None,
+        on_text_end: Optional[Callable[[], None]] = None,
+    ) -> dict:
+        """送出一則 user 訊息，回傳 result 事件
+
+        Args:
+            on_text: 收到回應文字片段時呼叫
+            on_text_end: 回應訊息串流結束（message_stop，早於 result 事件）時呼叫
+        """
+        if not self.is_alive():
+            raise ClaudeWorkerError(f"worker not running: {self.stderr_tail or '(no stderr)'}")
+
+        payload = {
+            "type": "user",
+            "message": {"role": "user", "content": message},
+        }
+        self.proc.stdin.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        await self.proc.stdin.drain()
+        self.requests_served += 1
+        saw_delta = False
+
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                raise ClaudeWorkerError(
+                    f"worker exited before result: {self.stderr_tail or '(no stderr)'}"
+                )
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(data, dict):
+                continue
+
+            event_type = data.get("type")
+            if event_type == "result":
+                return data
+
+            if on_text is None:
+                continue
+            if event_type == "stream_event":
+                event = data.get("event") or {}
+                if event.get("type") == "message_stop" and on_text_end is not None:
+                    on_text_end()
+                delta = event.get("delta") or {}
+                if delta.get("type") == "text_delta" and delta.get("text"):
+                    saw_delta = True
+                    on_text(delta["text"])
+            elif event_type == "assistant" and not saw_delta:
+                # CLI 未輸出片段時，以完整的 assistant 訊息代替
+                for block in (data.get("message") or {}).get("content") or []:
+                    if block.get("type") == "text" and block.get("text"):
+                        on_text(block["text"])
+
+    async def close(self, timeout: float = 5) -> None:
+        """關閉 stdin 讓行程自行結束，逾時則強制終止"""
+        if self.proc is None:
+            return
+
+        if self.proc.returncode is None:
+            try:
+                self.proc.stdin.close()
+                await asyncio.wait_for(self.proc.wait(), timeout=timeout)
+            except (asyncio.TimeoutError, ProcessLookupError, BrokenPipeError, ConnectionResetError):
+                try:
+                    self.proc.kill()
+                    await self.proc.wait()
+                except ProcessLookupError:
+                    pass
+
+        if self._stderr_task:
+            self._stderr_task.cancel()
+
+
+class ClaudeWorkerPool:
+    """Claude Code (CLI) worker pool"""
+
+    def __init__(
+        self,
+        claude_path: str,
+        working_dir: str,
+        size: int,
+        max_requests: int = 1,
+        warm_per_key: int = 1,
+        acquire_timeout: float = 30,
+        idle_ttl: float = 600,
+        health_interval: float = 30,
+    ):
+        self.claude_path = claude_path
+        self.working_dir = working_dir
+        self.size = max(1, size)
+        self.max_requests = max(1, max_requests)
+        self.warm_per_key = max(0, warm_per_key)
+        self.acquire_timeout = acquire_timeout
+        self.idle_ttl = idle_ttl
+        self.health_interval = health_interval
+
+        self._idle: Dict[str, Deque[ClaudeWorker]] = {}
+        self._key_cmds: Dict[str, List[str]] = {}
+        self._busy = 0
+        self._warming = 0
+        self._waiting = 0
+        self._slots = asyncio.Semaphore(self.size)
+        self._closed = False
+        self._health_task: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+
+        # 統計
+        self._spawned = 0
+        self._recycled = 0
+        self._unhealthy = 0
+        self._served = 0
+        self._warm_hits = 0
+        self._rejected = 0
+        self._evicted = 0
+
+    def start(self) -> None:
+        """啟動背景健康檢查"""
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+            logger.info(
+                f"Claude worker pool started (size={self.size}, "
+                f"max_requests={self.max_requests})"
+            )
+
+    def _key(self, model: str, system_prompt: str) -> str:
+        digest = hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:12]
+        return f"{model}:{digest}"
+
+    def _build_cmd(self, model: str, system_prompt: str) -> List[str]:
+        return [
+            self.claude_path, "-p",
+            "--input-format", "stream-json",
+            "--output-format", "stream-json",
+            "--verbose",
+            "--include-partial-messages",
+            "--model", model,
+            "--system-prompt", system_prompt,
+        ]
+
+    def _alive_count(self) -> int:
+        return self._busy + self._warming + sum(len(q) for q in self._idle.values())
+
+    async def run(
+        self,
+        model: str,
+        system_prompt: str,
+        message: str,
+        timeout: float,
+        on_text: Optional[Callable[[str], None]] = None,
+        on_text_end: Optional[Callable[[], None]] = None,
+    ) -> dict:
+        """以 worker 執行一次對話，回傳 CLI 的 result 事件"""
+        key = self._key(model, system_prompt)
+        self._key_cmds.setdefault(key, self._build_cmd(model, system_prompt))
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise AiWorkerPoolBusy(f"all {self.size} workers busy")
+        finally:
+            self._waiting -= 1
+
+        self._busy += 1
+        worker: Optional[ClaudeWorker] = None
+        try:
+            worker = await self._checkout(key)
+            result = await asyncio.wait_for(worker.ask(message, on_text, on_text_end), timeout=timeout)
+            self._served += 1
+            return result
+        except BaseException:
+            # 逾時或異常的 worker 狀態不明，直接丟棄
+            if worker is not None:
+                self._spawn_background(worker.close(timeout=0))
+                worker = None
+            raise
+        finally:
+            self._busy -= 1
+            if worker is not None:
+                self._checkin(key, worker)
+            self._slots.release()
+            self._spawn_background(self._replenish(key))
+
+    async def _checkout(self, key: str) -> ClaudeWorker:
+        """取得健康的預熱 worker，沒有就新啟動一個"""
+        idle = self._idle.get(key)
+        while idle:
+            worker = idle.popleft()
+            if worker.is_alive():
+                self._warm_hits += 1
+                return worker
+            self._unhealthy += 1
+            await worker.close(timeout=0)
+
+        # 已達上限時先終止其他 key 閒置最久的 worker，行程數不超過 size
+        while self._alive_count() > self.size:
+            victim = self._pop_oldest_idle()
+            if victim is None:
+                break
+            self._evicted += 1
+            await victim.close(timeout=0)
+
+        return await self._spawn(key)
+
+    def _pop_oldest_idle(self) -> Optional[ClaudeWorker]:
+        """取出閒置最久的 worker"""
+        oldest_key = min(
+            (key for key, queue in self._idle.items() if queue),
+            key=lambda key: self._idle[key][0].idle_since,
+            default=None,
+        )
+        if oldest_key is None:
+            return None
+        worker = self._idle[oldest_key].popleft()
+        if not self._idle[oldest_key]:
+            del self._idle[oldest_key]
+        return worker
+
+    def _checkin(self, key: str, worker: ClaudeWorker) -> None:
+        """歸還 worker，達到 max_requests 則回收"""
+        if (
+            self._closed
+            or not worker.is_alive()
+            or worker.requests_served >= self.max_requests
+        ):
+            self._recycled += 1
+            self._spawn_background(worker.close())
+            return
+
+        worker.idle_since = time.monotonic()
+        self._idle.setdefault(key, deque()).append(worker)
+
+    async def _spawn(self, key: str) -> ClaudeWorker:
+        worker = ClaudeWorker(self._key_cmds[key], self.working_dir)
+        await worker.start()
+        self._spawned += 1
+        return worker
+
+    async def _replenish(self, key: str) -> None:
+        """在容量允許下補足預熱 worker"""
+        while (
+            not self._closed
+            and len(self._idle.get(key, ())) + self._warming < self.warm_per_key
+            and self._alive_count() < self.size
+        ):
+            self._warming += 1
+            try:
+                worker = await self._spawn(key)
+            except Exception as e:
+                logger.warning(f"Failed to pre-warm claude worker: {e}")
+                return
+            finally:
+                self._warming -= 1
+            if self._closed or self._alive_count() >= self.size:
+                # 預熱期間容量已被請求用完
+                await worker.close(timeout=0)
+                return
+            worker.idle_since = time.monotonic()
+            self._idle.setdefault(key, deque()).append(worker)
+
+    def _spawn_background(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _health_loop(self) -> None:
+        """定期清除已結束或閒置過久的 worker"""
+        while not self._closed:
+            await asyncio.sleep(self.health_interval)
+            self.prune()
+
+    def prune(self) -> None:
+        """清除已結束或閒置過久的 worker"""
+        now = time.monotonic()
+        for key in list(self._idle):
+            kept: Deque[ClaudeWorker] = deque()
+            for worker in self._idle[key]:
+                if not worker.is_alive():
+                    self._unhealthy += 1
+                    logger.warning(f"Claude worker died: {worker.stderr_tail or '(no stderr)'}")
+                    self._spawn_background(worker.close(timeout=0))
+                elif now - worker.idle_since > self.idle_ttl:
+                    self._recycled += 1
+                    self._spawn_background(worker.close())
+                else:
+                    kept.append(worker)
+            if kept:
+                self._idle[key] = kept
+            else:
+                del self._idle[key]
+
+    async def close(self) -> None:
+        """關閉所有 worker"""
+        self._closed = True
+        if self._health_task:
+            self._health_task.cancel()
+        workers = [w for q in self._idle.values() for w in q]
+        self._idle.clear()
+        await asyncio.gather(*(w.close() for w in workers), return_exceptions=True)
+        for task in list(self._background):
+            task.cancel()
+        logger.info("Claude worker pool closed")
+
+    def stats(self) -> dict:
+        """取得 pool 統計"""
+        return {
+            "size": self.size,
+            "max_requests": self.max_requests,
+            "busy": self._busy,
+            "idle": sum(len(q) for q in self._idle.values()),
+            "warming": self._warming,
+            "waiting": self._waiting,
+            "spawned": self._spawned,
+            "served": self._served,
+            "warm_hits": self._warm_hits,
+            "recycled": self._recycled,
+            "unhealthy": self._unhealthy,
+            "rejected": self._rejected,
+            "evicted": self._evicted,
+        }
@@ -0,0 +1,108 @@
+"""看板增量更新 - 訂單異動以 delta 廣播，看板就地更新不必重新查詢
+
+每次訂單異動（新增 / 修改 / 取消 / 付款 / 清除）在同一個交易內：
+1. 群組序號（groups.board_seq）+1
+2. 異動內容寫入 board_deltas（訂單完整內容、Session 總金額與筆數）
+3. 呼叫端把 {"seq", "delta"} 併入 order_update / payment_update 廣播
+
+看板記住每個群組最後套用的序號：
+- 收到 seq = 上次 + 1 的事件時直接套用 delta
+- 序號有缺口（斷線、多 worker 廣播遺失）時呼叫
+  GET /api/board/orders/changes?group_id=&since= 補齊
+- 異動已被清理或缺口太大時回傳 reset，看板改為重新載入全部訂單
+"""
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.order import Order
+from app.repositories.order_repo import BoardDeltaRepository
+
+# 單次補齊的異動上限，超過時請看板重新載入
+MAX_CHANGES = 200
+
+
+def serialize_board_order(order: Order) -> dict:
+    """看板訂單格式（/api/board/orders 與 delta 共用）"""
+    return {
+        "order_id": str(order.id),
+        "user_id": str(order.user_id),
+        "display_name": order.user.display_name if order.user else "未知",
+        "items": [
+            {
+                "name": item.name,
+                "quantity": item.quantity,
+                "subtotal": float(item.subtotal),
+                "options": item.options,
+                "note": item.note,
+            }
+            for item in order.items
+        ],
+        "total": float(order.total_amount),
+        "payment_status": order.payment_status,
+    }
+
+
+class BoardFeed:
+    """看板增量更新"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.delta_repo = BoardDeltaRepository(session)
+
+    async def order_changed(self, group_id: UUID, session_id: UUID, user_id: UUID) -> dict:
+        """記錄使用者訂單異動（訂單不存在時為移除），回傳要併入廣播的 {"seq", "delta"}
+
+        需在 flush 之後、commit 之前呼叫，序號與訂單異動在同一個交易。
+        """
+        result = await self.session.execute(
+            select(Order)
+            .where(Order.session_id == session_id, Order.user_id == user_id)
+            .options(selectinload(Order.items), selectinload(Order.user))
+            .execution_options(populate_existing=True)
+        )
+        order = result.scalar_one_or_none()
+
+        if order:
+            payload = {"op": "upsert", "session_id": str(session_id), "order": serialize_board_order(order)}
+        else:
+            payload = {"op": "remove", "session_id": str(session_id), "user_id": str(user_id)}
+        return await self._append(group_id, session_id, payload)
+
+    async def session_cleared(self, group_id: UUID, session_id: UUID) -> dict:
+        """記錄 Session 訂單全部清除"""
+        return await self._append(group_id, session_id, {"op": "clear", "session_id": str(session_id)})
+
+    async def get_changes(self, group_id: UUID, since: int) -> dict:
+        """取得序號 since 之後的異動
+
+        Returns:
+            {"group_id", "seq": 目前序號, "reset": 是否需重新載入, "deltas": [{"seq", ...}]}
+        """
+        current = await self.delta_repo.get_current_seq(group_id)
+        response = {"group_id": str(group_id), "seq": current, "reset": False, "deltas": []}
+        if since >= current:
+            return response
+
+        deltas = await self.delta_repo.get_since(group_id, since, MAX_CHANGES + 1)
+        # 已被清理（第一筆不是 since + 1）或缺口太大
+        if not deltas or deltas[0].seq != since + 1 or len(deltas) > MAX_CHANGES:
+            response["reset"] = True
+            return response
+
+        response["deltas"] = [{"seq": delta.seq, **delta.payload} for delta in deltas]
+        return response
+
+    async def _append(self, group_id: UUID, session_id: UUID, payload: dict) -> dict:
+        total, count = (await self.session.execute(
+            select(func.coalesce(func.sum(Order.total_amount), 0), func.count(Order.id))
+            .where(Order.session_id == session_id)
+        )).one()
+        payload["session_total"] = float(total)
+        payload["session_count"] = count
+
+        seq = await self.delta_repo.append(group_id, payload)
+        return {"seq": seq, "delta": payload}
+
@@ -0,0 +1,199 @@
+"""快取失效廣播 - 多個 worker 行程之間同步清除記憶體快取
+
+CacheService 是各行程自己的記憶體，uvicorn 開多個 worker 時，
+某個 worker 清除菜單 / 提示詞 / 今日店家快取，其他 worker 仍會用舊資料。
+
+這裡以 PostgreSQL LISTEN/NOTIFY（沿用既有資料庫，不需額外服務）廣播清除訊息：
+- CacheService.clear_* 清除本機快取後呼叫 publish()（交易內呼叫時延到 commit 之後），
+  訊息放進隊列，由背景 task 合併後以 pg_notify 送出（一次 NOTIFY 可帶多筆）
+- 每個行程用一條專用連線 LISTEN，收到其他行程的訊息時只清除本機快取（不再轉送）
+- LISTEN 連線中斷期間可能漏掉訊息，重新連上時清除本機所有快取
+
+main.py 在 lifespan 中呼叫 start_cache_bus() / stop_cache_bus()。
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import List, Optional, Set, Tuple
+
+import asyncpg
+
+from app.config import settings
+
+logger = logging.getLogger("jaba.cache.bus")
+
+CHANNEL = "jaba_cache_invalidate"
+# NOTIFY payload 上限為 8000 bytes，保留餘裕
+_MAX_PAYLOAD = 7000
+_RECONNECT_DELAY = 5.0
+
+
+class CacheInvalidationBus:
+    """以 PostgreSQL LISTEN/NOTIFY 廣播快取清除"""
+
+    def __init__(self):
+        # 行程識別碼，忽略自己送出的訊息
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._conn: Optional[asyncpg.Connection] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._connected = asyncio.Event()
+
+        # 統計
+        self._published = 0
+        self._received = 0
+        self._dropped = 0
+        self._reconnects = 0
+
+    @property
+    def running(self) -> bool:
+        return self._outbox is not None
+
+    def publish(self, namespace: str, key: str) -> None:
+        """廣播清除訊息（namespace: menu / today_stores / prompt / all；key 為 "*" 表示全部）"""
+        if self._outbox is None:
+            return
+        self._outbox.put_nowait((namespace, key))
+
+    async def start(self) -> None:
+        self._outbox = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._listen_loop(), name="cache-bus-listen"),
+            asyncio.create_task(self._send_loop(), name="cache-bus-send"),
+        ]
+
+    async def stop(self) -> None:
+        self._outbox = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    async def _connect(self) -> asyncpg.Connection:
+        return await asyncpg.connect(
+            host=settings.db_host,
+            port=settings.db_port,
+            user=settings.db_user,
+            password=settings.db_password,
+            database=settings.db_name,
+        )
+
+    async def _listen_loop(self) -> None:
+        """維持 LISTEN 連線，斷線時重連並清除本機快取"""
+        first = True
+        while True:
+            try:
+                conn = await self._connect()
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _: closed.set())
+                await conn.add_listener(CHANNEL, self._on_notify)
+                self._conn = conn
+                self._connected.set()
+                if not first:
+                    # 斷線期間可能漏掉其他行程的清除訊息
+                    self._reconnects += 1
+                    _apply_local("all", "*")
+                    logger.info("Cache bus reconnected, local caches cleared")
+                first = False
+                await closed.wait()
+                logger.warning("Cache bus connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache bus connect failed: {e}")
+            finally:
+                self._connected.clear()
+                self._conn = None
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+    async def _send_loop(self) -> None:
+        """合併隊列中的清除訊息後送出"""
+        outbox = self._outbox
+        while True:
+            messages: Set[Tuple[str, str]] = {await outbox.get()}
+            while not outbox.empty():
+                messages.add(outbox.get_nowait())
+
+            conn = self._conn
+            if conn is None:
+                self._dropped += len(messages)
+                logger.warning(f"Cache bus not connected, dropped {len(messages)} invalidations")
+                continue
+            try:
+                for payload in _pack(self.origin, sorted(messages)):
+                    await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+                self._published += len(messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._dropped += len(messages)
+                logger.warning(f"Cache bus publish failed: {e}")
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Cache bus ignored malformed payload: {payload[:100]}")
+            return
+        if data.get("origin") == self.origin:
+            return
+        for namespace, key in data.get("items", []):
+            self._received += 1
+            _apply_local(namespace, key)
+
+    def stats(self) -> dict:
+        """取得統計"""
+        return {
+            "running": self.running,
+            "connected": self._connected.is_set(),
+            "origin": self.origin,
+            "pending": self._outbox.qsize() if self._outbox else 0,
+            "published": self._published,
+            "received": self._received,
+            "dropped": self._dropped,
+            "reconnects": self._reconnects,
+        }
+
+
+def _pack(origin: str, messages: List[Tuple[str, str]]) -> List[str]:
+    """把清除訊息分成不超過 payload 上限的多個 JSON"""
+    payloads = []
+    batch: List[Tuple[str, str]] = []
+    for message in messages:
+        candidate = json.dumps({"origin": origin, "items": batch + [message]})
+        if batch and len(candidate.encode()) > _MAX_PAYLOAD:
+            payloads.append(json.dumps({"origin": origin, "items": batch}))
+            batch = []
+        batch.append(message)
+    if batch:
+        payloads.append(json.dumps({"origin": origin, "items": batch}))
+    return payloads
+
+
+def _apply_local(namespace: str, key: str) -> None:
+    """只清除本機快取（不再廣播）"""
+    from app.services.cache_service import CacheService
+
+    CacheService.invalidate_local(namespace, key)
+
+
+# 全域實例
+cache_bus = CacheInvalidationBus()
+
+
+async def start_cache_bus() -> None:
+    """啟動快取失效廣播（settings.cache_bus_enabled 為 False 時不啟動）"""
+    if settings.cache_bus_enabled:
+        await cache_bus.start()
+        logger.info(f"Cache bus started (origin={cache_bus.origin})")
+
+
+async def stop_cache_bus() -> None:
+    """停止快取失效廣播"""
+    if cache_bus.running:
+        await cache_bus.stop()
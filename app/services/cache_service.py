@@ -1,10 +1,61 @@
-"""快取服務 - 使用記憶體 dict"""
-from typing import Any, Optional
+"""快取服務 - 各 namespace 為有上限的 LRU / TTL 快取（見 lru_cache.BoundedCache）
+
+clear_* 會透過 cache_bus 廣播給其他 worker 行程，各行程以 invalidate_local 清除自己的快取。
+
+在交易內清除快取時請傳入 session：本機快取立即清除，commit 後再清一次並廣播；
+rollback 時不廣播。否則其他 worker 收到廣播時資料尚未提交，會把舊資料重新讀回快取。
+"""
+from datetime import date
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.cache_bus import cache_bus
+from app.services.lru_cache import BoundedCache
 
 # 全域快取
-_menu_cache: dict[str, Any] = {}
-_today_stores_cache: dict[str, Any] = {}
-_prompt_cache: dict[str, str] = {}
+_menu_cache = BoundedCache(
+    "menu", settings.cache_menu_max_entries, settings.cache_max_bytes, settings.cache_menu_ttl
+)
+# store_id -> (menu updated_at, MenuIndex)
+_menu_index_cache = BoundedCache(
+    "menu_index", settings.cache_menu_max_entries, settings.cache_max_bytes, settings.cache_menu_ttl
+)
+# group_id -> (台北日期, 今日店家)，到期時間為台北隔天午夜
+_today_stores_cache = BoundedCache(
+    "today_stores", settings.cache_today_stores_max_entries, settings.cache_max_bytes
+)
+_prompt_cache = BoundedCache("prompt", 100, settings.cache_max_bytes, settings.cache_prompt_ttl)
+
+_caches = (_menu_cache, _menu_index_cache, _today_stores_cache, _prompt_cache)
+
+# session.info 中等待 commit 後廣播的 (namespace, key)
+_PENDING_INVALIDATIONS = "cache_invalidations"
+
+
+def _invalidate(namespace: str, key: str, session: Optional[AsyncSession] = None) -> None:
+    """清除本機快取並廣播（有 session 時廣播延到 commit 之後）"""
+    CacheService.invalidate_local(namespace, key)
+    if session is not None:
+        session.info.setdefault(_PENDING_INVALIDATIONS, set()).add((namespace, key))
+        return
+    cache_bus.publish(namespace, key)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_invalidations(session: Session) -> None:
+    """commit 後再清一次本機快取（交易期間可能被其他請求以舊資料填回）並廣播"""
+    for namespace, key in sorted(session.info.pop(_PENDING_INVALIDATIONS, ())):
+        CacheService.invalidate_local(namespace, key)
+        cache_bus.publish(namespace, key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_INVALIDATIONS, None)
 
 
 class CacheService:
@@ -19,38 +70,56 @@ class CacheService:
     @staticmethod
     def set_menu(store_id: str, menu: Any) -> None:
         """設定菜單快取"""
-        _menu_cache[store_id] = menu
+        _menu_cache.set(store_id, menu)
 
     @staticmethod
-    def clear_menu(store_id: str) -> None:
-        """清除菜單快取"""
-        _menu_cache.pop(store_id, None)
+    async def load_menu(store_id: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """取得菜單快取，未命中時以 loader 載入（同一店家同時只載入一次）"""
+        return await _menu_cache.get_or_load(store_id, loader)
 
     @staticmethod
-    def clear_all_menus() -> None:
+    def clear_menu(store_id: str, session: Optional[AsyncSession] = None) -> None:
+        """清除菜單快取（含菜單索引）"""
+        _invalidate("menu", store_id, session)
+
+    @staticmethod
+    def clear_all_menus(session: Optional[AsyncSession] = None) -> None:
         """清除所有菜單快取"""
-        _menu_cache.clear()
+        _invalidate("menu", "*", session)
+
+    # Menu Index Cache（品項索引與 AI 用精簡菜單）
+    @staticmethod
+    def get_menu_index(store_id: str, version: Any) -> Optional[Any]:
+        """取得菜單索引快取（版本不符視為未命中）"""
+        cached = _menu_index_cache.get(store_id, validate=lambda v: v[0] == version)
+        return cached[1] if cached else None
+
+    @staticmethod
+    def set_menu_index(store_id: str, version: Any, index: Any) -> None:
+        """設定菜單索引快取"""
+        _menu_index_cache.set(store_id, (version, index))
 
-    # Today Stores Cache
+    # Today Stores Cache（GroupTodayStoreRepository.get_today_stores 讀取）
     @staticmethod
-    def get_today_stores(group_id: str) -> Optional[Any]:
-        """取得今日店家快取"""
-        return _today_stores_cache.get(group_id)
+    def get_today_stores(group_id: str, today: date) -> Optional[Any]:
+        """取得今日店家快取（日期不符或已過台北午夜視為未命中）"""
+        cached = _today_stores_cache.get(group_id, validate=lambda v: v[0] == today)
+        return cached[1] if cached else None
 
     @staticmethod
-    def set_today_stores(group_id: str, stores: Any) -> None:
-        """設定今日店家快取"""
-        _today_stores_cache[group_id] = stores
+    def set_today_stores(group_id: str, today: date, stores: Any, expires_at: float) -> None:
+        """設定今日店家快取（expires_at 為台北隔天午夜的 timestamp）"""
+        _today_stores_cache.set(group_id, (today, stores), expires_at=expires_at)
 
     @staticmethod
-    def clear_today_stores(group_id: str) -> None:
+    def clear_today_stores(group_id: str, session: Optional[AsyncSession] = None) -> None:
         """清除今日店家快取"""
-        _today_stores_cache.pop(group_id, None)
+        _invalidate("today_stores", group_id, session)
 
     @staticmethod
-    def clear_all_today_stores() -> None:
+    def clear_all_today_stores(session: Optional[AsyncSession] = None) -> None:
         """清除所有今日店家快取"""
-        _today_stores_cache.clear()
+        _invalidate("today_stores", "*", session)
 
     # Prompt Cache
     @staticmethod
@@ -61,22 +130,50 @@ class CacheService:
     @staticmethod
     def set_prompt(name: str, content: str) -> None:
         """設定提示詞快取"""
-        _prompt_cache[name] = content
+        _prompt_cache.set(name, content)
 
     @staticmethod
-    def clear_prompt(name: str) -> None:
+    async def load_prompt(name: str, loader: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """取得提示詞快取，未命中時以 loader 載入（同一提示詞同時只載入一次）"""
+        return await _prompt_cache.get_or_load(name, loader)
+
+    @staticmethod
+    def clear_prompt(name: str, session: Optional[AsyncSession] = None) -> None:
         """清除提示詞快取"""
-        _prompt_cache.pop(name, None)
+        _invalidate("prompt", name, session)
 
     @staticmethod
-    def clear_all_prompts() -> None:
+    def clear_all_prompts(session: Optional[AsyncSession] = None) -> None:
         """清除所有提示詞快取"""
-        _prompt_cache.clear()
+        _invalidate("prompt", "*", session)
 
     # Clear All
     @staticmethod
-    def clear_all() -> None:
+    def clear_all(session: Optional[AsyncSession] = None) -> None:
         """清除所有快取"""
-        _menu_cache.clear()
-        _today_stores_cache.clear()
-        _prompt_cache.clear()
+        _invalidate("all", "*", session)
+
+    @staticmethod
+    def invalidate_local(namespace: str, key: str) -> None:
+        """只清除本行程的快取（namespace: menu / today_stores / prompt / all；key 為 "*" 表示全部）"""
+        if namespace == "all":
+            for cache in _caches:
+                cache.clear()
+            return
+
+        caches = {
+            "menu": (_menu_cache, _menu_index_cache),
+            "today_stores": (_today_stores_cache,),
+            "prompt": (_prompt_cache,),
+        }.get(namespace, ())
+        for cache in caches:
+            if key == "*":
+                cache.clear()
+            else:
+                cache.delete(key)
+
+    # Stats
+    @staticmethod
+    def stats() -> dict:
+        """取得各 namespace 統計（筆數、估算位元組、命中率、淘汰數）"""
+        return {cache.name: cache.stats() for cache in _caches}
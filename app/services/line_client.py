@@ -0,0 +1,71 @@
+"""LINE Messaging API 客戶端 - 非同步共用連線池
+
+LineService 的所有 LINE API 呼叫都透過這裡的 AsyncMessagingApi 發送，
+底層為 aiohttp 連線池，跨請求保持 keep-alive，不會阻塞 event loop。
+
+連線池與 WebhookParser 皆為行程層級單例，main.py 在 lifespan 啟動時
+呼叫 init_line_client() 建立，關閉時呼叫 close_line_client() 釋放。
+"""
+import logging
+from typing import Optional
+
+from linebot.v3 import WebhookParser
+from linebot.v3.messaging import AsyncApiClient, AsyncMessagingApi, Configuration
+
+from app.config import settings
+
+logger = logging.getLogger("jaba.line")
+
+# 全域客戶端（第一次使用時建立，應用程式關閉時釋放）
+_api_client: Optional[AsyncApiClient] = None
+_messaging_api: Optional[AsyncMessagingApi] = None
+_webhook_parser: Optional[WebhookParser] = None
+
+
+def init_line_client() -> None:
+    """建立共用客戶端（由 main.py lifespan 呼叫）"""
+    get_messaging_api()
+    get_webhook_parser()
+
+
+def get_messaging_api() -> AsyncMessagingApi:
+    """取得共用的非同步 MessagingApi
+
+    必須在 event loop 中呼叫（aiohttp session 綁定於當前 loop）。
+    """
+    global _api_client, _messaging_api
+
+    if _messaging_api is None:
+        configuration = Configuration(access_token=settings.line_channel_access_token)
+        # 同時連往 LINE API 的連線數上限
+        configuration.connection_pool_maxsize = settings.line_api_pool_size
+        _api_client = AsyncApiClient(configuration)
+        _messaging_api = AsyncMessagingApi(_api_client)
+        logger.info(
+            f"LINE API client created (pool_size={settings.line_api_pool_size}, "
+            f"timeout={settings.line_api_timeout}s)"
+        )
+
+    return _messaging_api
+
+
+def get_webhook_parser() -> WebhookParser:
+    """取得共用的 WebhookParser"""
+    global _webhook_parser
+
+    if _webhook_parser is None:
+        _webhook_parser = WebhookParser(settings.line_channel_secret)
+
+    return _webhook_parser
+
+
+async def close_line_client() -> None:
+    """關閉共用連線池（應用程式關閉時呼叫）"""
+    global _api_client, _messaging_api
+
+    if _api_client is not None:
+        await _api_client.close()
+        logger.info("LINE API client closed")
+
+    _api_client = None
+    _messaging_api = None
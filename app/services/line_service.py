@@ -4,16 +4,14 @@ import hmac
 import base64
 import logging
 import os
+import time
 from datetime import date
 from decimal import Decimal
 from typing import Optional
 from uuid import UUID
 
-from linebot.v3 import WebhookParser
 from linebot.v3.messaging import (
-    ApiClient,
-    Configuration,
-    MessagingApi,
+    AsyncMessagingApi,
     ReplyMessageRequest,
     TextMessage,
     PushMessageRequest,
@@ -30,9 +28,9 @@ from app.config import settings
 from app.models.user import User
 from app.models.group import Group, GroupApplication
 from app.models.chat import ChatMessage
-from app.models.order import OrderSession, Order, OrderItem, GroupTodayStore
+from app.models.order import OrderSession, Order, GroupTodayStore
 from app.models.store import Store
-from app.models.menu import Menu, MenuCategory, MenuItem
+from app.models.menu import Menu, MenuCategory
 from app.repositories import (
     UserRepository,
     GroupRepository,
@@ -47,8 +45,19 @@ from app.repositories import (
     StoreRepository,
     MenuItemRepository,
 )
-from app.services.ai_service import AiService, sanitize_user_input
+from app.services.ai_service import AiService, get_ai_service, sanitize_user_input
+from app.services.board_feed import BoardFeed
 from app.services.cache_service import CacheService
+from app.services.line_client import get_messaging_api, get_webhook_parser
+from app.services.menu_index import (
+    describe_no_match,
+    find_by_code,
+    match_order,
+    pick_candidate,
+    to_order_item,
+)
+from app.services.menu_service import MenuService
+from app.services.order_intent import order_intent_engine
 from app.repositories import AiPromptRepository, SecurityLogRepository
 from app.repositories.system_repo import AiLogRepository
 from app.models.system import AiLog, SecurityLog
@@ -60,20 +69,24 @@ APPLY_URL = os.environ.get("APP_URL", "") + "/board.html"
 
 
 class LineService:
-    """LINE 服務"""
+    """LINE 服務
+
+    API 客戶端、Webhook 解析器與 AiService 為行程層級單例（lifespan 建立），
+    每個請求只建立綁定 DB session 的 Repositories。
+    """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        messaging_api: Optional[AsyncMessagingApi] = None,
+        ai_service: Optional[AiService] = None,
+    ):
         self.session = session
         self.channel_secret = settings.line_channel_secret
-        self.channel_access_token = settings.line_channel_access_token
 
-        # 設定 API 客戶端
-        configuration = Configuration(access_token=self.channel_access_token)
-        self.api_client = ApiClient(configuration)
-        self.messaging_api = MessagingApi(self.api_client)
-
-        # Webhook 解析器
-        self.parser = WebhookParser(self.channel_secret)
+        # API 客戶端（共用非同步連線池）
+        self.messaging_api = messaging_api or get_messaging_api()
+        self.api_timeout = settings.line_api_timeout
 
         # Repositories
         self.user_repo = UserRepository(session)
@@ -92,8 +105,9 @@ class LineService:
         self.security_log_repo = SecurityLogRepository(session)
         self.ai_log_repo = AiLogRepository(session)
 
-        # AI 服務
-        self.ai_service = AiService()
+        # AI 服務（共用）
+        self.ai_service = ai_service or get_ai_service()
+        self.menu_service = MenuService(session)
 
     async def _record_ai_log(
         self,
@@ -153,17 +167,18 @@ class LineService:
 
     def parse_webhook(self, body: str, signature: str):
         """解析 Webhook 事件"""
-        return self.parser.parse(body, signature)
+        return get_webhook_parser().parse(body, signature)
 
     async def reply_message(self, reply_token: str, message: str) -> None:
         """回覆訊息"""
         try:
             logger.info(f"Replying message: {message[:50]}...")
-            self.messaging_api.reply_message(
+            await self.messaging_api.reply_message(
                 ReplyMessageRequest(
                     reply_token=reply_token,
                     messages=[TextMessage(text=message)],
-                )
+                ),
+                _request_timeout=self.api_timeout,
             )
             logger.info("Reply sent successfully")
         except Exception as e:
@@ -175,7 +190,7 @@ class LineService:
         """回覆帶有 Quick Reply 按鈕的訊息"""
         try:
             logger.info(f"Replying with quick reply: {message[:50]}...")
-            self.messaging_api.reply_message(
+            await self.messaging_api.reply_message(
                 ReplyMessageRequest(
                     reply_token=reply_token,
                     messages=[
@@ -184,7 +199,8 @@ class LineService:
                             quick_reply=QuickReply(items=items),
                         )
                     ],
-                )
+                ),
+                _request_timeout=self.api_timeout,
             )
             logger.info("Quick reply sent successfully")
         except Exception as e:
@@ -193,11 +209,12 @@ class LineService:
     async def push_message(self, to: str, message: str) -> None:
         """推送訊息"""
         try:
-            self.messaging_api.push_message(
+            await self.messaging_api.push_message(
                 PushMessageRequest(
                     to=to,
                     messages=[TextMessage(text=message)],
-                )
+                ),
+                _request_timeout=self.api_timeout,
             )
         except Exception as e:
             logger.error(f"Push message error: {e}")
@@ -205,7 +222,9 @@ class LineService:
     async def get_user_profile(self, user_id: str) -> Optional[dict]:
         """取得使用者資料"""
         try:
-            profile = self.messaging_api.get_profile(user_id)
+            profile = await self.messaging_api.get_profile(
+                user_id, _request_timeout=self.api_timeout
+            )
             return {
                 "user_id": profile.user_id,
                 "display_name": profile.display_name,
@@ -220,7 +239,9 @@ class LineService:
     ) -> Optional[dict]:
         """取得群組成員資料"""
         try:
-            profile = self.messaging_api.get_group_member_profile(group_id, user_id)
+            profile = await self.messaging_api.get_group_member_profile(
+                group_id, user_id, _request_timeout=self.api_timeout
+            )
             return {
                 "user_id": profile.user_id,
                 "display_name": profile.display_name,
@@ -233,7 +254,9 @@ class LineService:
     async def get_group_name(self, group_id: str) -> str:
         """取得群組名稱"""
         try:
-            summary = self.messaging_api.get_group_summary(group_id)
+            summary = await self.messaging_api.get_group_summary(
+                group_id, _request_timeout=self.api_timeout
+            )
             return summary.group_name
         except Exception as e:
             logger.error(f"Get group name error: {e}")
@@ -351,6 +374,7 @@ class LineService:
                     }
                     for msg in history[-history_limit:]
                 ],
+                purpose="personal_preferences",
             )
 
             # 記錄 AI Log
@@ -927,7 +951,7 @@ class LineService:
             store = matched_stores[0]
             await self.today_store_repo.clear_today_stores(group.id)
             await self.today_store_repo.set_today_store(group.id, store.id, user.id)
-            CacheService.clear_today_stores(str(group.id))
+            CacheService.clear_today_stores(str(group.id), self.session)
             # 先提交交易，確保其他連線可以讀到新資料
             await self.session.commit()
             # 廣播店家變更
@@ -1111,7 +1135,7 @@ class LineService:
         await self.today_store_repo.set_today_store(group.id, store.id, user.id)
 
         # 清除快取
-        CacheService.clear_today_stores(str(group.id))
+        CacheService.clear_today_stores(str(group.id), self.session)
 
         # 先提交交易，確保其他連線可以讀到新資料
         await self.session.commit()
@@ -1148,7 +1172,7 @@ class LineService:
         await self.today_store_repo.set_today_store(group.id, store.id, user.id)
 
         # 清除快取
-        CacheService.clear_today_stores(str(group.id))
+        CacheService.clear_today_stores(str(group.id), self.session)
 
         # 先提交交易，確保其他連線可以讀到新資料
         await self.session.commit()
@@ -1195,7 +1219,7 @@ class LineService:
         await self.today_store_repo.remove_today_store(group.id, matched_store.id)
 
         # 清除快取
-        CacheService.clear_today_stores(str(group.id))
+        CacheService.clear_today_stores(str(group.id), self.session)
 
         # 先提交交易，確保其他連線可以讀到新資料
         await self.session.commit()
@@ -1224,7 +1248,7 @@ class LineService:
         await self.today_store_repo.clear_today_stores(group.id)
 
         # 清除快取
-        CacheService.clear_today_stores(str(group.id))
+        CacheService.clear_today_stores(str(group.id), self.session)
 
         # 先提交交易，確保其他連線可以讀到新資料
         await self.session.commit()
@@ -1475,20 +1499,28 @@ class LineService:
             "content": text,
         })
 
+        ai_response = None
         try:
             # 取得系統提示詞
             system_prompt = await self._get_group_system_prompt()
 
             # 取得今日店家與菜單
             today_stores = await self.today_store_repo.get_today_stores(group.id)
-            menus_context = await self._build_menus_context(today_stores)
+            menu_indexes = await self.menu_service.get_menu_indexes(
+                [ts.store_id for ts in today_stores]
+            )
+            menus_context = self.menu_service.build_menus_context(
+                [ts.store for ts in today_stores if ts.store], menu_indexes
+            )
 
             # 取得目前訂單狀態
             session_orders = []
+            orders = []
             if active_session:
                 session_with_orders = await self.session_repo.get_with_orders(active_session.id)
                 if session_with_orders:
-                    for order in session_with_orders.orders:
+                    orders = session_with_orders.orders
+                    for order in orders:
                         session_orders.append({
                             "display_name": order.user.display_name if order.user else "未知",
                             "items": [
@@ -1527,33 +1559,57 @@ class LineService:
                 # 有可疑內容，靜默不回應
                 return
 
-            # 呼叫 AI
-            ai_response = await self.ai_service.chat(
-                message=sanitized_text,
-                system_prompt=system_prompt,
-                context={
-                    "mode": "group_ordering" if active_session else "group_idle",
-                    "user_name": user.display_name or "使用者",
-                    "today_stores": [
-                        {"id": str(ts.store_id), "name": ts.store.name if ts.store else None}
-                        for ts in today_stores
-                    ],
-                    "menus": menus_context,
-                    "session_orders": session_orders,
-                    "user_preferences": user.preferences,
-                },
-                history=[
-                    {
-                        "role": msg.role,
-                        "name": msg.user.display_name if msg.user else "系統",
-                        "content": msg.content,
-                    }
-                    for msg in history[-history_limit:]
-                ],
-            )
+            # 規則可確定的訊息（+1、取消、完整品項名稱）直接處理，不呼叫 AI
+            fast_result = None
+            if active_session:
+                fast_start = time.perf_counter()
+                fast_result = order_intent_engine.resolve(
+                    text=sanitized_text,
+                    indexes=menu_indexes,
+                    has_order=any(order.user_id == user.id for order in orders),
+                    previous_items=self._get_previous_order_items(orders, user.id),
+                    preferences=user.preferences,
+                )
+                if fast_result:
+                    order_intent_engine.record_hit(
+                        fast_result.intent,
+                        (time.perf_counter() - fast_start) * 1000,
+                        self.ai_service.scheduler.lanes["chat"].avg_run_ms,
+                    )
 
-            # 記錄 AI Log
-            await self._record_ai_log(ai_response, user_id=user.id, group_id=group.id)
+            if fast_result:
+                ai_response = {
+                    "message": fast_result.message,
+                    "actions": fast_result.actions,
+                    "_fast_path": fast_result.intent,
+                }
+            else:
+                # 呼叫 AI
+                ai_response = await self.ai_service.chat(
+                    message=sanitized_text,
+                    system_prompt=system_prompt,
+                    context={
+                        "mode": "group_ordering" if active_session else "group_idle",
+                        "user_name": user.display_name or "使用者",
+                        "today_stores": [
+                            {"id": str(ts.store_id), "name": ts.store.name if ts.store else None}
+                            for ts in today_stores
+                        ],
+                        "menus": menus_context,
+                        "session_orders": session_orders,
+                        "user_preferences": user.preferences,
+                    },
+                    history=[
+                        {
+                            "role": msg.role,
+                            "name": msg.user.display_name if msg.user else "系統",
+                            "content": msg.content,
+                        }
+                        for msg in history[-history_limit:]
+                    ],
+                    purpose="group_ordering",
+                    stream=True,
+                )
 
             response_text = ai_response.get("message", "").strip()
 
@@ -1616,46 +1672,23 @@ class LineService:
         except Exception as e:
             logger.error(f"AI chat error: {e}", exc_info=True)
             await self.reply_message(reply_token, "抱歉，我現在有點忙，請稍後再試。")
-
-    async def _build_menus_context(self, today_stores: list) -> dict:
-        """建構菜單上下文"""
-        menus = {}
-        for ts in today_stores:
-            store = ts.store
-            if not store:
-                continue
-
-            result = await self.session.execute(
-                select(Menu)
-                .where(Menu.store_id == store.id)
-                .options(
-                    selectinload(Menu.categories).selectinload(MenuCategory.items)
-                )
-            )
-            menu = result.scalar_one_or_none()
-
-            if menu:
-                menus[str(store.id)] = {
-                    "name": store.name,
-                    "categories": [
-                        {
-                            "name": cat.name,
-                            "items": [
-                                {
-                                    "id": str(item.id),
-                                    "name": item.name,
-                                    "price": float(item.price),
-                                    "variants": item.variants,
-                                    "description": item.description,
-                                }
-                                for item in cat.items
-                            ],
-                        }
-                        for cat in menu.categories
-                    ],
-                }
-
-        return menus
+        finally:
+            # 串流模式下回覆已先送出，等 AI 輸出完畢再以完整回應記錄 AI Log
+            if ai_response is not None and "_fast_path" not in ai_response:
+                await self.ai_service.finalize(ai_response)
+                await self._record_ai_log(ai_response, user_id=user.id, group_id=group.id)
+
+    def _get_previous_order_items(self, orders: list, user_id: UUID) -> list[dict]:
+        """取得最近一位其他人的訂單品項（跟單用）"""
+        others = [order for order in orders if order.user_id != user_id and order.items]
+        if not others:
+            return []
+
+        previous = max(others, key=lambda order: order.updated_at or order.created_at)
+        return [
+            {"name": item.name, "quantity": item.quantity, "note": item.note}
+            for item in previous.items
+        ]
 
     # ========== 動作執行 ==========
 
@@ -1708,14 +1741,16 @@ class LineService:
                 logger.error(f"Action {action_type} error: {e}")
                 results.append({"success": False, "error": str(e)})
 
-        # 如果有成功的動作，先 commit 再廣播
+        # 如果有成功的動作，記錄看板增量更新，先 commit 再廣播
         if broadcast_action:
+            feed = await BoardFeed(self.session).order_changed(group.id, session.id, user.id)
             await self.session.commit()
             await emit_order_update(str(group.id), {
                 "group_id": str(group.id),
                 "action": broadcast_action,
                 "user_id": str(user.id),
                 "display_name": user.display_name,
+                **feed,
             })
             await flush_events()
 
@@ -1749,29 +1784,29 @@ class LineService:
             )
             order = await self.order_repo.create(order)
 
+        # 今日菜單索引（整筆訂單共用），整筆訂單一次比對
+        menu_indexes = await self.menu_service.get_menu_indexes(
+            [ts.store_id for ts in today_stores]
+        )
+        matches = match_order(
+            menu_indexes,
+            # AI 可選擇性提供類別（有類別會更精確）
+            [(item_data.get("name", ""), item_data.get("category")) for item_data in items],
+        )
+
         # 新增品項
-        for item_data in items:
+        for item_data, candidates in zip(items, matches):
             item_name = item_data.get("name", "")
             quantity = item_data.get("quantity", 1)
             note = item_data.get("note", "")
-            category = item_data.get("category", None)  # AI 可選擇性提供類別
-
-            # 從菜單找價格（有類別會更精確）
-            price = await self._find_item_price(today_stores, item_name, category)
-
-            # 找不到價格（品項不在菜單中）
-            if price == 0:
-                return {"success": False, "error": f"菜單中找不到「{item_name}」"}
-
-            order_item = OrderItem(
-                order_id=order.id,
-                name=item_name,
-                quantity=quantity,
-                unit_price=Decimal(str(price)),
-                subtotal=Decimal(str(price * quantity)),
-                note=note,
-            )
-            await self.order_item_repo.create(order_item)
+
+            # 名稱比對不出來時，改用 AI 帶回的品項代碼（同名品項在不同類別時可區分）；
+            # 都找不到或有多個相近品項時不建立，避免記成錯的品項或 $0
+            matched = pick_candidate(candidates) or find_by_code(menu_indexes, item_data.get("id"))
+            if not matched:
+                return {"success": False, "error": describe_no_match(item_name, candidates)}
+
+            await self.order_item_repo.create(to_order_item(matched, order.id, quantity, note))
 
         # 重新計算總金額
         await self.order_repo.calculate_total(order)
@@ -1888,73 +1923,18 @@ class LineService:
 
         return extra_messages
 
-    async def _find_item_price(
-        self, today_stores: list, item_name: str, category: str = None
-    ) -> float:
-        """從今日菜單找品項價格
-
-        Args:
-            today_stores: 今日店家列表
-            item_name: 品項名稱
-            category: 類別名稱（可選，如「便當」「單點類」）
-
-        搜尋優先順序：
-        1. 若有指定類別，在該類別中精確匹配
-        2. 若有指定類別，在該類別中部分匹配
-        3. 無類別時，精確匹配名稱
-        4. 無類別時，部分匹配
-        """
-        all_items = []
-        for ts in today_stores:
-            result = await self.session.execute(
-                select(MenuItem, MenuCategory.name.label("category_name"))
-                .join(MenuCategory)
-                .join(Menu)
-                .where(Menu.store_id == ts.store_id)
-            )
-            for row in result.all():
-                all_items.append({
-                    "item": row[0],
-                    "category": row[1],
-                })
-
-        # 若有指定類別，優先在該類別中搜尋
-        if category:
-            # 類別內精確匹配
-            for data in all_items:
-                if data["category"] == category and data["item"].name == item_name:
-                    return float(data["item"].price)
-            # 類別內部分匹配
-            for data in all_items:
-                if data["category"] == category and item_name in data["item"].name:
-                    return float(data["item"].price)
-
-        # 無類別或類別內找不到：精確匹配
-        for data in all_items:
-            if data["item"].name == item_name:
-                return float(data["item"].price)
-
-        # 部分匹配
-        for data in all_items:
-            if item_name in data["item"].name:
-                return float(data["item"].price)
-
-        return 0
-
     # ========== 系統提示詞 ==========
 
     async def _load_prompt_from_db(self, name: str) -> str:
         """從快取或 DB 讀取提示詞（無 fallback，必須有資料）"""
-        # 先查快取
-        cached = CacheService.get_prompt(name)
-        if cached:
-            return cached
+        async def load() -> Optional[str]:
+            prompt = await self.prompt_repo.get_by_name(name)
+            return prompt.content if prompt else None
 
-        # 查 DB
-        prompt = await self.prompt_repo.get_by_name(name)
-        if prompt:
-            CacheService.set_prompt(name, prompt.content)
-            return prompt.content
+        # 先查快取，未命中時查 DB
+        content = await CacheService.load_prompt(name, load)
+        if content:
+            return content
 
         # 沒有資料就報錯
         raise ValueError(f"找不到提示詞：{name}，請確認資料庫已執行 alembic upgrade")
@@ -2197,6 +2177,7 @@ class LineService:
                     "user_name": user.display_name or "使用者",
                 },
                 history=chat_history,
+                purpose="group_application",
             )
 
             # 記錄 AI Log
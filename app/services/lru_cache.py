@@ -0,0 +1,249 @@
+"""有上限的記憶體快取 - LRU 淘汰、TTL 到期、未命中時合併載入
+
+CacheService 的每一種快取（菜單、菜單索引、今日店家、提示詞）各是一個
+BoundedCache namespace，各自設定筆數 / 位元組上限與 TTL：
+
+- 超過筆數或位元組上限時淘汰最久未使用的項目（LRU）
+- 到期的項目在讀取時視為未命中並移除
+- get_or_load：同一個 key 同時未命中時只有第一個呼叫端執行 loader，
+  其他呼叫端等待同一份結果（single-flight），避免快取失效瞬間大量請求同時查 DB
+- 命中 / 未命中 / 淘汰 / 到期次數由 stats() 提供給管理後台
+
+位元組數是遞迴估算的近似值（sys.getsizeof 加總），只用於設定上限，不是精確的記憶體用量。
+"""
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger("jaba.cache")
+
+# 估算大小時的遞迴深度上限
+_SIZE_MAX_DEPTH = 8
+
+
+def estimate_size(value: Any) -> int:
+    """估算物件大小（位元組，含容器內容與物件屬性）"""
+    seen = set()
+
+    def walk(obj: Any, depth: int) -> int:
+        if id(obj) in seen or depth > _SIZE_MAX_DEPTH:
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+            return size
+        if isinstance(obj, dict):
+            return size + sum(walk(k, depth + 1) + walk(v, depth + 1) for k, v in obj.items())
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            return size + sum(walk(item, depth + 1) for item in obj)
+        attrs = getattr(obj, "__dict__", None)
+        if isinstance(attrs, dict):
+            # 略過 SQLAlchemy 的 instance state
+            size += sum(
+                walk(v, depth + 1) for k, v in attrs.items() if not k.startswith("_sa_")
+            )
+        return size
+
+    return walk(value, 0)
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: Optional[float]):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class BoundedCache:
+    """單一 namespace 的 LRU + TTL 快取"""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        max_bytes: int = 0,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Args:
+            name: namespace 名稱（統計用）
+            max_entries: 筆數上限
+            max_bytes: 估算位元組上限（0 = 不限制）
+            ttl: 預設存活秒數（None = 不到期）
+        """
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self._bytes = 0
+
+        # 統計
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._loads = 0
+        self._coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, validate: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """
+        取得快取值
+
+        Args:
+            validate: 額外檢查（例如版本、日期），回傳 False 時視為未命中並移除
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        if entry.expires_at is not None and time.time() >= entry.expires_at:
+            self._remove(key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+        if validate is not None and not validate(entry.value):
+            self._remove(key)
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """
+        設定快取值
+
+        Args:
+            ttl: 存活秒數（預設使用 namespace 的 ttl）
+            expires_at: 到期時間 timestamp（指定時優先於 ttl）
+        """
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = time.time() + ttl if ttl is not None else None
+
+        size = estimate_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            # 單一項目就超過上限，不快取
+            self._remove(key)
+            logger.warning(f"Cache '{self.name}' skipped {key!r}: {size} bytes > {self.max_bytes}")
+            return
+
+        self._remove(key)
+        self._entries[key] = _Entry(value, size, expires_at)
+        self._bytes += size
+        self._evict()
+
+    def delete(self, key: Hashable) -> None:
+        """清除單一項目（進行中的載入結果不會寫回）"""
+        self._remove(key)
+        self._loading.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """清除符合條件的 key"""
+        for key in [key for key in self._entries if predicate(key)]:
+            self._remove(key)
+        for key in [key for key in self._loading if predicate(key)]:
+            self._loading.pop(key, None)
+
+    def clear(self) -> None:
+        """清除全部"""
+        self._entries.clear()
+        self._loading.clear()
+        self._bytes = 0
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Optional[Any]:
+        """
+        取得快取值，未命中時呼叫 loader 載入並寫入快取
+
+        同一 key 同時只會有一個 loader 在執行，其他呼叫端等待其結果。
+        loader 回傳 None 時不寫入快取。
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            self._coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # 負責載入的請求被取消（而不是自己被取消）時改由自己載入
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.get_or_load(key, loader, ttl)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._loading[key] = fut
+        self._loads += 1
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as exc:
+            fut.set_exception(exc)
+            fut.exception()  # 沒有等待者時避免 "exception was never retrieved"
+            raise
+        finally:
+            # 載入期間被 delete / clear 時不寫回
+            if self._loading.get(key) is fut:
+                del self._loading[key]
+                if value is not None and not fut.done():
+                    self.set(key, value, ttl=ttl)
+            if not fut.done():
+                fut.set_result(value)
+        return value
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes and self._bytes > self.max_bytes and len(self._entries) > 1
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._evictions += 1
+
+    def stats(self) -> dict:
+        """取得統計"""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "loads": self._loads,
+            "coalesced": self._coalesced,
+            "loading": len(self._loading),
+        }
@@ -0,0 +1,462 @@
+"""菜單品項索引與模糊比對 - 以記憶體索引查詢品項，不需每次查 DB
+
+每家店的菜單編譯成一個 MenuIndex：
+- 名稱（原文 / 正規化後）→ 品項的 hash 索引
+- 分類 → 品項
+- 正規化名稱的單字與雙字（bigram）倒排索引
+- 拼音索引（有安裝 pypinyin 時），同音字 / 打錯字也能找到
+
+模糊比對（match_item）綜合以下分數排序候選品項，每個候選附 0~1 的信心分數：
+- 名稱完全相同
+- 尺寸變體（「紅茶 L」「大杯紅茶」「紅茶大」對到有 L 變體的「紅茶」，價格用變體價）
+- 包含（「雞腿」⊂「雞腿便當」）；查詢多出其他內容時（「雞腿便當加蛋」⊃「雞腿便當」）
+  分數低於 MIN_CONFIDENCE，不直接採用
+- 縮寫（「珍奶」的字依序出現在「珍珠奶茶」）
+- bigram Dice 相似度
+- 拼音相同
+
+正規化會移除空白、標點與注音符號（「珍奶ㄉ」→「珍奶」），全形轉半形並轉小寫。
+
+索引與 AI 菜單上下文一起依 (store_id, menu.updated_at) 快取在 CacheService，
+由 MenuService.get_menu_indexes 取得，save_menu / delete_menu 時失效。
+"""
+import heapq
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.models.menu import Menu
+from app.models.order import OrderItem
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 選用套件：pip install 'jaba-ai[fuzzy]'
+    lazy_pinyin = None
+
+# 低於此分數不視為匹配
+MIN_CONFIDENCE = 0.6
+# 第一名與第二名分數差距小於此值視為無法判斷
+AMBIGUITY_MARGIN = 0.05
+
+# 查詢包含品項名稱且多出其他內容時的分數上限（低於 MIN_CONFIDENCE）
+_PARTIAL_SCORE = 0.55
+
+# 縮寫比對的查詢長度上限
+_MAX_ABBREVIATION = 4
+
+# 注音符號與聲調
+_BOPOMOFO = {chr(c) for c in range(0x3100, 0x3130)} | {chr(c) for c in range(0x31A0, 0x31C0)}
+_BOPOMOFO |= {"ˊ", "ˇ", "ˋ", "˙"}
+
+# 常見尺寸說法 → 變體名稱
+_SIZE_ALIASES = {
+    "大杯": "l", "大": "l", "中杯": "m", "中": "m", "小杯": "s", "小": "s",
+}
+
+
+@dataclass(frozen=True)
+class IndexedItem:
+    """索引中的品項"""
+    name: str
+    normalized: str
+    category: str
+    price: float
+    variants: tuple
+    description: Optional[str]
+    code: Optional[str] = None  # AI 菜單上下文中的品項代碼（品項 ID 前 8 碼）
+
+
+@dataclass(frozen=True)
+class MatchCandidate:
+    """模糊比對候選"""
+    item: IndexedItem
+    store_id: str
+    score: float
+    price: float
+    variant: Optional[str] = None  # 匹配到的變體名稱
+    in_category: bool = False  # 是否在 AI 指定的類別（同分時優先）
+
+
+def normalize_name(name: str) -> str:
+    """正規化品項名稱（全形轉半形、轉小寫，去除空白、標點與注音符號）"""
+    text = unicodedata.normalize("NFKC", name).lower()
+    return "".join(
+        ch for ch in text
+        if not ch.isspace()
+        and ch not in _BOPOMOFO
+        and unicodedata.category(ch)[0] not in ("P", "S")
+    )
+
+
+def _bigrams(text: str) -> Set[str]:
+    """雙字 gram（單字名稱以自身為 gram）"""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _grams(text: str) -> Set[str]:
+    """單字與雙字 gram"""
+    return set(text) | _bigrams(text)
+
+
+def _is_subsequence(query: str, name: str) -> bool:
+    """query 的字依序出現在 name 中"""
+    chars = iter(name)
+    return all(ch in chars for ch in query)
+
+
+def _rank(candidate: "MatchCandidate") -> tuple:
+    """排序鍵：分數高者優先，同分時 AI 指定類別中的品項優先"""
+    return (-candidate.score, not candidate.in_category)
+
+
+def _pinyin_key(text: str) -> Optional[str]:
+    if lazy_pinyin is None or not text:
+        return None
+    return "".join(lazy_pinyin(text))
+
+
+class MenuIndex:
+    """單一店家的菜單索引"""
+
+    def __init__(self, store_id: str, version, items: List[IndexedItem], categories: list):
+        self.store_id = store_id
+        self.version = version
+        self.items = items  # 依分類、品項排序
+        # AI 對話用精簡菜單（MenuService.get_menus_context）
+        self.categories = categories
+
+        self._by_name: Dict[str, List[int]] = {}
+        self._by_code: Dict[str, int] = {}
+        self._by_normalized: Dict[str, List[int]] = {}
+        self._by_category: Dict[str, List[int]] = {}
+        self._by_pinyin: Dict[str, List[int]] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._char_sets: Dict[str, Set[int]] = {}
+        self._bigram_counts: List[int] = []
+        # 品項變體：{正規化變體名稱: (原變體名稱, 價格)}
+        self._variants: List[Dict[str, tuple]] = []
+
+        for pos, item in enumerate(items):
+            self._by_name.setdefault(item.name, []).append(pos)
+            if item.code:
+                self._by_code[item.code] = pos
+            self._by_normalized.setdefault(item.normalized, []).append(pos)
+            self._by_category.setdefault(item.category, []).append(pos)
+            for gram in _grams(item.normalized):
+                self._postings.setdefault(gram, []).append(pos)
+            for ch in item.normalized:
+                self._char_sets.setdefault(ch, set()).add(pos)
+            self._bigram_counts.append(len(_bigrams(item.normalized)))
+
+            pinyin = _pinyin_key(item.normalized)
+            if pinyin:
+                self._by_pinyin.setdefault(pinyin, []).append(pos)
+
+            variants = {}
+            for variant in item.variants:
+                if isinstance(variant, dict) and variant.get("name"):
+                    key = normalize_name(str(variant["name"]))
+                    if key:
+                        variants[key] = (variant["name"], float(variant.get("price") or item.price))
+            self._variants.append(variants)
+
+    @classmethod
+    def from_menu(cls, menu: Menu) -> "MenuIndex":
+        """由已載入分類與品項的 Menu 建立索引"""
+        items: List[IndexedItem] = []
+        categories = []
+        for cat in sorted(menu.categories, key=lambda x: x.sort_order):
+            context_items = []
+            for item in sorted(cat.items, key=lambda x: x.sort_order):
+                code = str(item.id)[:8]
+                items.append(IndexedItem(
+                    name=item.name,
+                    normalized=normalize_name(item.name),
+                    category=cat.name,
+                    price=float(item.price),
+                    variants=tuple(item.variants or ()),
+                    description=item.description,
+                    code=code,
+                ))
+                # 已售完的品項不給 AI（仍保留在索引，修改既有訂單時比對得到）
+                if item.is_available is False:
+                    continue
+                # 精簡格式：品項 ID 只留前 8 碼，省略空欄位，價格為整數時不帶小數
+                entry = {"id": code, "name": item.name, "price": _compact_price(item.price)}
+                if item.variants:
+                    entry["variants"] = item.variants
+                if item.description:
+                    entry["description"] = item.description
+                context_items.append(entry)
+            categories.append({"name": cat.name, "items": context_items})
+
+        return cls(str(menu.store_id), menu.updated_at, items, categories)
+
+    def find_by_code(self, code: str) -> Optional[IndexedItem]:
+        """以 AI 菜單上下文中的品項代碼查詢"""
+        pos = self._by_code.get(code)
+        return self.items[pos] if pos is not None else None
+
+    def find_exact(self, name: str, category: Optional[str] = None) -> List[IndexedItem]:
+        """名稱完全相同（原文優先，再比正規化名稱）"""
+        positions = self._by_name.get(name) or self._by_normalized.get(normalize_name(name), [])
+        return self._in_category(positions, category)
+
+    def match(
+        self, query: str, category: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[MatchCandidate]:
+        """模糊比對，回傳依分數排序的候選品項（limit 為 None 時回傳全部）"""
+        return self.match_many([(query, category)], limit)[(query, category)]
+
+    def match_many(
+        self, queries: Iterable[tuple], limit: Optional[int] = None
+    ) -> Dict[tuple, List[MatchCandidate]]:
+        """多個品項名稱一次比對，回傳 {(品項名稱, 類別): 依分數排序的候選}
+
+        所有查詢的 bigram 合併後，每個 gram 的倒排索引只走一次，
+        同時累加到所有含該 gram 的查詢；相同的正規化名稱只計分一次。
+        """
+        normalized_queries: Dict[str, Set[str]] = {}
+        keys: Dict[tuple, str] = {}
+        for query, category in queries:
+            normalized = normalize_name(query)
+            keys[(query, category)] = normalized
+            if normalized:
+                normalized_queries.setdefault(normalized, _bigrams(normalized))
+
+        # 以倒排索引累加各查詢與品項的共同 bigram 數量，只對有交集的品項計分
+        gram_queries: Dict[str, List[str]] = {}
+        for normalized, query_bigrams in normalized_queries.items():
+            for gram in query_bigrams:
+                gram_queries.setdefault(gram, []).append(normalized)
+        overlaps: Dict[str, Counter] = {normalized: Counter() for normalized in normalized_queries}
+        for gram, gram_matches in gram_queries.items():
+            postings = self._postings.get(gram)
+            if not postings:
+                continue
+            for normalized in gram_matches:
+                overlaps[normalized].update(postings)
+
+        results = {}
+        for (query, category), normalized in keys.items():
+            if not normalized:
+                results[(query, category)] = []
+                continue
+            results[(query, category)] = self._score(
+                normalized, normalized_queries[normalized], overlaps[normalized], category, limit
+            )
+        return results
+
+    def _score(
+        self,
+        normalized: str,
+        query_bigrams: Set[str],
+        overlap: Counter,
+        category: Optional[str],
+        limit: Optional[int],
+    ) -> List[MatchCandidate]:
+        """計分排序
+
+        需要逐字比對的只有少數候選：查詢的每個字都出現在品項中（完全相同、包含、縮寫）、
+        品項名稱是查詢的一段（變體、查詢多出其他內容）、拼音相同、去掉尺寸說法後相同。
+        其餘候選只有部分 bigram 交集，分數就是 Dice 相似度，依交集數由多到少計分，
+        已有 limit 筆且剩下的交集數不可能更高分時停止。
+        """
+        # 查詢的每個字都出現的品項；縮寫只比對短查詢，長查詢仍需有 bigram 交集
+        char_sets = [self._char_sets.get(ch) for ch in set(normalized)]
+        textual = set.intersection(*char_sets) if all(char_sets) else set()
+        if len(normalized) > _MAX_ABBREVIATION:
+            textual &= overlap.keys()
+        # 品項名稱是查詢的一段（完全相同、變體、查詢多出其他內容）
+        length = len(normalized)
+        for start in range(length - 1):
+            for end in range(start + 2, length + 1):
+                textual.update(self._by_normalized.get(normalized[start:end], ()))
+
+        pinyin = _pinyin_key(normalized)
+        pinyin_hits = set(self._by_pinyin.get(pinyin, ())) if pinyin else set()
+        textual |= pinyin_hits
+
+        # 尺寸說法（「大杯紅茶」「紅茶大」）：去掉後再比一次
+        size_query = None
+        for alias, variant_key in _SIZE_ALIASES.items():
+            if len(normalized) <= len(alias):
+                continue
+            if normalized.startswith(alias):
+                size_query = (normalized[len(alias):], variant_key)
+            elif normalized.endswith(alias):
+                size_query = (normalized[:-len(alias)], variant_key)
+            else:
+                continue
+            textual.update(self._by_normalized.get(size_query[0], ()))
+            break
+
+        allowed = set(self._by_category.get(category, ())) if category else None
+        # 最小堆積，堆頂是目前最差的候選：(分數, 在指定類別, -菜單順序, 價格, 變體)
+        heap: List[tuple] = []
+
+        def push(pos: int, score: float, price: float, variant: Optional[str]) -> None:
+            in_category = allowed is not None and pos in allowed
+            if in_category and score:
+                score = min(1.0, score + 0.05)
+            if score <= 0:
+                return
+            entry = (round(score, 4), in_category, -pos, price, variant)
+            if limit is None or len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        for pos in textual:
+            push(pos, *self._textual_score(
+                pos, normalized, query_bigrams, overlap.get(pos, 0), size_query, pos in pinyin_hits
+            ))
+
+        query_count = len(query_bigrams)
+        for pos, shared in overlap.most_common():
+            if pos in textual:
+                continue
+            # 交集數 shared 的 Dice 上限（品項 bigram 數至少為 shared）加上類別加分與四捨五入誤差
+            if limit and len(heap) >= limit and heap[0][0] > 1.6 * shared / (query_count + shared) + 0.0501:
+                break
+            push(pos, 1.6 * shared / (query_count + self._bigram_counts[pos]), self.items[pos].price, None)
+
+        return [
+            MatchCandidate(
+                item=self.items[-neg_pos], store_id=self.store_id, score=score,
+                price=price, variant=variant, in_category=in_category,
+            )
+            for score, in_category, neg_pos, price, variant in sorted(heap, reverse=True)
+        ]
+
+    def _textual_score(
+        self, pos: int, normalized: str, query_bigrams: Set[str], shared: int,
+        size_query: Optional[tuple], pinyin_hit: bool,
+    ) -> tuple:
+        """逐字比對計分（完全相同、變體、包含、縮寫、拼音、查詢多出其他內容），回傳 (分數, 價格, 變體)"""
+        item = self.items[pos]
+        name = item.normalized
+        if name == normalized:
+            return 1.0, item.price, None
+
+        # 變體：查詢 = 品項名稱 + 變體名稱（順序不拘）
+        for key, (variant_name, variant_price) in self._variants[pos].items():
+            if normalized in (name + key, key + name) or (
+                size_query and size_query[0] == name and size_query[1] == key
+            ):
+                return 0.98, variant_price, variant_name
+
+        score = 0.0
+        if normalized in name:
+            score = 0.6 + 0.35 * len(normalized) / len(name)
+        elif _is_subsequence(normalized, name):
+            score = 0.6 + 0.25 * len(normalized) / len(name)
+        if pinyin_hit:
+            score = max(score, 0.9)
+        if shared:
+            dice = 2 * shared / (len(query_bigrams) + self._bigram_counts[pos])
+            score = max(score, 0.8 * dice)
+        if name in normalized:
+            # 查詢比品項名稱多出其他內容（「雞腿便當加蛋」⊃「雞腿便當」），
+            # 多出的部分（加點、尺寸）無法記錄，不直接採用，請使用者確認
+            score = _PARTIAL_SCORE * len(name) / len(normalized)
+        return score, item.price, None
+
+    def _in_category(self, positions: Iterable[int], category: Optional[str]) -> List[IndexedItem]:
+        if category is None:
+            return [self.items[pos] for pos in positions]
+        allowed = set(self._by_category.get(category, ()))
+        return [self.items[pos] for pos in positions if pos in allowed]
+
+
+def match_item(
+    indexes: List[MenuIndex], query: str, category: Optional[str] = None, limit: int = 5
+) -> List[MatchCandidate]:
+    """在多家店的索引中模糊比對，回傳依分數排序的候選（最多 limit 筆）"""
+    candidates = [c for index in indexes for c in index.match(query, category, limit)]
+    # 同分時依指定類別、今日店家順序、菜單順序（sort 為穩定排序）
+    candidates.sort(key=_rank)
+    return candidates[:limit]
+
+
+def match_order(
+    indexes: List[MenuIndex], queries: List[tuple], limit: int = 5
+) -> List[List[MatchCandidate]]:
+    """整筆訂單一次比對（每家店以 match_many 一次計分所有不重複的品項名稱）
+
+    Args:
+        queries: [(品項名稱, 類別或 None), ...]
+    """
+    distinct = list(dict.fromkeys(queries))
+    merged: Dict[tuple, List[MatchCandidate]] = {query: [] for query in distinct}
+    for index in indexes:
+        for query, candidates in index.match_many(distinct, limit).items():
+            merged[query].extend(candidates)
+    for candidates in merged.values():
+        # 同分時依指定類別、今日店家順序、菜單順序（sort 為穩定排序）
+        candidates.sort(key=_rank)
+        del candidates[limit:]
+    return [merged[query] for query in queries]
+
+
+def find_by_code(indexes: List[MenuIndex], code: Optional[str]) -> Optional[MatchCandidate]:
+    """以品項代碼在多家店的索引中查詢（AI 在訂單中帶回上下文的品項代碼時使用）"""
+    if not code:
+        return None
+    for index in indexes:
+        item = index.find_by_code(str(code))
+        if item is not None:
+            return MatchCandidate(item=item, store_id=index.store_id, score=1.0, price=item.price)
+    return None
+
+
+def pick_candidate(candidates: List[MatchCandidate]) -> Optional[MatchCandidate]:
+    """從候選中選出可直接採用的品項（信心不足或前兩名太接近時回傳 None）"""
+    if not candidates or candidates[0].score < MIN_CONFIDENCE:
+        return None
+    if candidates[0].score >= 1.0:
+        return candidates[0]
+    if len(candidates) > 1 and candidates[0].score - candidates[1].score < AMBIGUITY_MARGIN:
+        return None
+    return candidates[0]
+
+
+def to_order_item(
+    matched: MatchCandidate, order_id, quantity: int, note: Optional[str] = None
+) -> OrderItem:
+    """以比對結果建立訂單品項（名稱用菜單品項名稱，尺寸變體記在備註）"""
+    note = note or ""
+    if matched.variant and matched.variant not in note:
+        note = f"{matched.variant} {note}".strip()
+    price = Decimal(str(matched.price))
+    return OrderItem(
+        order_id=order_id,
+        name=matched.item.name,
+        quantity=quantity,
+        unit_price=price,
+        subtotal=price * quantity,
+        note=note,
+    )
+
+
+def describe_no_match(query: str, candidates: List[MatchCandidate]) -> str:
+    """pick_candidate 沒有結果時給使用者的說明"""
+    similar = []
+    for candidate in candidates:
+        if candidate.score >= MIN_CONFIDENCE and candidate.item.name not in similar:
+            similar.append(candidate.item.name)
+    if len(similar) > 1:
+        return f"「{query}」有好幾個相似品項：{'、'.join(similar[:3])}，要哪一個呢？"
+    if not similar and candidates and candidates[0].item.normalized in normalize_name(query):
+        return f"菜單中找不到「{query}」，是指「{candidates[0].item.name}」嗎？加點或尺寸請分開說明"
+    return f"菜單中找不到「{query}」"
+
+
+def _compact_price(price) -> float:
+    """價格轉為 JSON 數字（整數價格不帶 .0）"""
+    value = float(price)
+    return int(value) if value.is_integer() else value
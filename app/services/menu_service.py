@@ -1,13 +1,18 @@
 """菜單服務"""
 import io
 import logging
-from typing import List, Optional
-from uuid import UUID
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
 
 from PIL import Image
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models.menu import Menu, MenuCategory, MenuItem
+from app.models.menu import Menu, MenuCategory
 from app.models.store import Store
 from app.repositories import (
     StoreRepository,
@@ -16,8 +21,9 @@ from app.repositories import (
     MenuItemRepository,
     AiPromptRepository,
 )
-from app.services.ai_service import AiService
+from app.services.ai_service import get_ai_service
 from app.services.cache_service import CacheService
+from app.services.menu_index import MenuIndex
 
 logger = logging.getLogger("jaba.menu")
 
@@ -31,27 +37,18 @@ class MenuService:
         self.menu_repo = MenuRepository(session)
         self.category_repo = MenuCategoryRepository(session)
         self.item_repo = MenuItemRepository(session)
-        self.ai_service = AiService()
+        self.ai_service = get_ai_service()
 
     async def get_store_menu(self, store_id: UUID) -> Optional[dict]:
         """取得店家菜單"""
-        # 檢查快取
-        cache_key = str(store_id)
-        cached = CacheService.get_menu(cache_key)
-        if cached:
-            return cached
+        async def load() -> Optional[dict]:
+            store = await self.store_repo.get_with_menu(store_id)
+            if not store or not store.menu:
+                return None
+            return self._serialize_menu(store.menu)
 
-        # 從資料庫取得
-        store = await self.store_repo.get_with_menu(store_id)
-        if not store or not store.menu:
-            return None
-
-        menu_data = self._serialize_menu(store.menu)
-
-        # 存入快取
-        CacheService.set_menu(cache_key, menu_data)
-
-        return menu_data
+        # 先查快取，未命中時從資料庫載入（同一店家同時只查一次）
+        return await CacheService.load_menu(str(store_id), load)
 
     def _serialize_menu(self, menu: Menu) -> dict:
         """序列化菜單"""
@@ -81,6 +78,63 @@ class MenuService:
             ],
         }
 
+    async def get_menu_indexes(self, store_ids: List[UUID]) -> List[MenuIndex]:
+        """
+        取得多家店的菜單索引（依傳入順序，沒有菜單的店家略過）
+
+        索引依 (store_id, menu.updated_at) 快取，只查一次各店菜單版本，
+        版本相同就不重新載入分類與品項；save_menu / delete_menu 會清除快取。
+        """
+        if not store_ids:
+            return []
+
+        result = await self.session.execute(
+            select(Menu.store_id, Menu.updated_at).where(Menu.store_id.in_(store_ids))
+        )
+        versions = {str(store_id): updated_at for store_id, updated_at in result.all()}
+
+        indexes: Dict[str, MenuIndex] = {}
+        missing = []
+        for store_id, version in versions.items():
+            cached = CacheService.get_menu_index(store_id, version)
+            if cached is None:
+                missing.append(UUID(store_id))
+            else:
+                indexes[store_id] = cached
+
+        if missing:
+            result = await self.session.execute(
+                select(Menu)
+                .where(Menu.store_id.in_(missing))
+                .options(selectinload(Menu.categories).selectinload(MenuCategory.items))
+            )
+            for menu in result.scalars().all():
+                index = MenuIndex.from_menu(menu)
+                CacheService.set_menu_index(index.store_id, index.version, index)
+                indexes[index.store_id] = index
+
+        return [indexes[str(store_id)] for store_id in store_ids if str(store_id) in indexes]
+
+    async def get_menus_context(self, stores: List[Store]) -> Dict[str, dict]:
+        """
+        取得 AI 對話用的菜單上下文（精簡菜單隨菜單索引一起快取）
+
+        Returns:
+            {store_id: {"name": 店名, "categories": [...]}}
+        """
+        indexes = await self.get_menu_indexes([store.id for store in stores])
+        return self.build_menus_context(stores, indexes)
+
+    @staticmethod
+    def build_menus_context(stores: List[Store], indexes: List[MenuIndex]) -> Dict[str, dict]:
+        """由菜單索引組出 AI 菜單上下文（店名不屬於菜單版本，組裝時才帶入）"""
+        categories_by_store = {index.store_id: index.categories for index in indexes}
+        return {
+            str(store.id): {"name": store.name, "categories": categories_by_store[str(store.id)]}
+            for store in stores
+            if str(store.id) in categories_by_store
+        }
+
     async def recognize_menu_image(self, image_bytes: bytes) -> dict:
         """辨識菜單圖片"""
         # 確保 prompt 已載入到快取
@@ -94,14 +148,11 @@ class MenuService:
 
     async def _ensure_prompt_cached(self, name: str) -> None:
         """確保 prompt 已載入到快取"""
-        if CacheService.get_prompt(name):
-            return
+        async def load() -> Optional[str]:
+            prompt = await AiPromptRepository(self.session).get_by_name(name)
+            return prompt.content if prompt else None
 
-        # 從 DB 載入
-        prompt_repo = AiPromptRepository(self.session)
-        prompt = await prompt_repo.get_by_name(name)
-        if prompt:
-            CacheService.set_prompt(name, prompt.content)
+        await CacheService.load_prompt(name, load)
 
     def _compress_image(
         self, image_bytes: bytes, max_size: int = 1920, quality: int = 85
@@ -169,39 +220,49 @@ class MenuService:
             }
         ]
         """
-        # 取得或建立菜單
+        # 取得或建立菜單（更新版本時間，讓 AI 菜單上下文快取失效）
         menu = await self.menu_repo.get_or_create(store_id)
+        menu.updated_at = datetime.now(timezone.utc)
 
         # 刪除現有分類和品項
-        for category in menu.categories:
-            await self.category_repo.delete(category)
+        await self.menu_repo.clear_categories(menu)
 
-        # 建立新分類和品項
+        # 建立新分類和品項（各一次批次 INSERT，往返次數不隨品項數增加）
+        category_rows = []
+        item_rows = []
         for sort_order, cat_data in enumerate(categories_data):
-            category = MenuCategory(
-                menu_id=menu.id,
-                name=cat_data["name"],
-                sort_order=sort_order,
-            )
-            category = await self.category_repo.create(category)
-
+            category_id = uuid4()
+            category_rows.append({
+                "id": category_id,
+                "menu_id": menu.id,
+                "name": cat_data["name"],
+                "sort_order": sort_order,
+            })
             for item_order, item_data in enumerate(cat_data.get("items", [])):
-                item = MenuItem(
-                    category_id=category.id,
-                    name=item_data["name"],
-                    price=item_data["price"],
-                    description=item_data.get("description"),
-                    variants=item_data.get("variants", []),
-                    promo=item_data.get("promo"),
-                    sort_order=item_order,
-                )
-                await self.item_repo.create(item)
-
-        # 清除快取
-        CacheService.clear_menu(str(store_id))
+                item_rows.append({
+                    "id": uuid4(),
+                    "category_id": category_id,
+                    "name": item_data["name"],
+                    "price": item_data["price"],
+                    "description": item_data.get("description"),
+                    "variants": item_data.get("variants", []),
+                    "promo": item_data.get("promo"),
+                    "sort_order": item_order,
+                })
+
+        categories = await self.category_repo.bulk_create(category_rows)
+        items = await self.item_repo.bulk_create(item_rows)
+
+        # 直接設定關聯（不需重新查詢）
+        items_by_category = {category.id: [] for category in categories}
+        for item in items:
+            items_by_category[item.category_id].append(item)
+        for category in categories:
+            set_committed_value(category, "items", items_by_category[category.id])
+        set_committed_value(menu, "categories", categories)
 
-        # 重新載入菜單
-        await self.session.refresh(menu, ["categories"])
+        # 清除快取（commit 後才廣播給其他 worker）
+        CacheService.clear_menu(str(store_id), self.session)
         return menu
 
     async def delete_menu(self, store_id: UUID) -> bool:
@@ -232,38 +293,126 @@ class MenuService:
             apply_items: 要套用的品項清單 [{"name": "xxx", "price": 100, "category": "分類", ...}]
             remove_items: 要刪除的品項名稱清單（正規化後的名稱）
         """
-        # 取得現有菜單
-        existing_menu = await self.get_store_menu(store_id)
-        if not existing_menu:
+        # 取得現有菜單（ORM 物件，就地修改以保留品項 ID）
+        menu = await self.menu_repo.get_by_store_id(store_id)
+        if not menu:
             # 沒有現有菜單，直接建立
             categories_data = self._group_items_by_category(apply_items)
             return await self.save_menu(store_id, categories_data)
 
-        # 建立現有品項索引
+        # 更新版本時間，讓 AI 菜單上下文快取失效
+        menu.updated_at = datetime.now(timezone.utc)
+
+        # 建立現有分類與品項索引
+        categories_by_name = {cat.name: cat for cat in menu.categories}
         existing_by_key = {}
-        for cat in existing_menu.get("categories", []):
-            for item in cat.get("items", []):
-                key = self._normalize_name(item["name"])
-                existing_by_key[key] = {
-                    "category": cat["name"],
-                    **item,
-                }
+        for cat in menu.categories:
+            for item in cat.items:
+                existing_by_key[self._normalize_name(item.name)] = item
+
+        # 同名品項以最後一筆為準
+        apply_by_key = {self._normalize_name(item["name"]): item for item in apply_items}
 
-        # 移除指定品項
+        # 1. 刪除指定品項（同時被套用的品項改為修改）
+        removed = []
         for key in remove_items:
             normalized_key = self._normalize_name(key)
-            if normalized_key in existing_by_key:
-                del existing_by_key[normalized_key]
+            if normalized_key in existing_by_key and normalized_key not in apply_by_key:
+                removed.append(existing_by_key.pop(normalized_key))
+        await self.item_repo.delete_by_ids([item.id for item in removed])
+        for item in removed:
+            self.session.expunge(item)
+        removed_ids = {item.id for item in removed}
+
+        # 2. 建立新分類（排在現有分類之後）
+        next_category_order = max((cat.sort_order for cat in menu.categories), default=-1) + 1
+        category_rows = []
+        for item_data in apply_by_key.values():
+            cat_name = item_data.get("category", "未分類")
+            if cat_name in categories_by_name or any(r["name"] == cat_name for r in category_rows):
+                continue
+            category_rows.append({
+                "id": uuid4(),
+                "menu_id": menu.id,
+                "name": cat_name,
+                "sort_order": next_category_order,
+            })
+            next_category_order += 1
+        all_categories = list(menu.categories)
+        for category in await self.category_repo.bulk_create(category_rows):
+            categories_by_name[category.name] = category
+            all_categories.append(category)
+
+        # 各分類目前的品項與下一個排序值（新增或移入的品項排在最後）
+        items_by_category = {
+            cat.id: [item for item in cat.items if item.id not in removed_ids]
+            for cat in menu.categories
+        }
+        for row in category_rows:
+            items_by_category[row["id"]] = []
+        next_item_order = {
+            cat_id: max((item.sort_order for item in items), default=-1) + 1
+            for cat_id, items in items_by_category.items()
+        }
 
-        # 套用新品項（新增或修改）
-        for item in apply_items:
-            key = self._normalize_name(item["name"])
-            existing_by_key[key] = item
+        # 3. 修改現有品項（只更新有變動的欄位），收集新品項
+        item_rows = []
+        for key, item_data in apply_by_key.items():
+            category = categories_by_name[item_data.get("category", "未分類")]
+            fields = {
+                "name": item_data["name"],
+                "price": Decimal(str(item_data["price"])),
+                "description": item_data.get("description"),
+                "variants": item_data.get("variants", []),
+                "promo": item_data.get("promo"),
+            }
 
-        # 重組成分類結構
-        categories_data = self._group_items_by_category(list(existing_by_key.values()))
+            item = existing_by_key.get(key)
+            if item is None:
+                item_rows.append({
+                    "id": uuid4(),
+                    "category_id": category.id,
+                    "sort_order": next_item_order[category.id],
+                    **fields,
+                })
+                next_item_order[category.id] += 1
+                continue
+
+            for field, value in fields.items():
+                if getattr(item, field) != value:
+                    setattr(item, field, value)
+            if item.category_id != category.id:
+                items_by_category[item.category_id].remove(item)
+                items_by_category[category.id].append(item)
+                item.category_id = category.id
+                item.sort_order = next_item_order[category.id]
+                next_item_order[category.id] += 1
+
+        # 4. 新增品項（批次 INSERT 前會先 flush 上面的修改）
+        for item in await self.item_repo.bulk_create(item_rows):
+            items_by_category[item.category_id].append(item)
+
+        # 5. 刪除已無品項的分類（與整份重建時相同，不保留空分類）
+        empty_categories = [cat for cat in all_categories if not items_by_category[cat.id]]
+        await self.session.flush()  # 移出分類的品項需先寫入
+        await self.category_repo.delete_by_ids([cat.id for cat in empty_categories])
+        for cat in empty_categories:
+            self.session.expunge(cat)
+
+        # 直接設定關聯（不需重新查詢）
+        categories = sorted(
+            (cat for cat in all_categories if items_by_category[cat.id]),
+            key=lambda cat: cat.sort_order,
+        )
+        for cat in categories:
+            set_committed_value(
+                cat, "items", sorted(items_by_category[cat.id], key=lambda item: item.sort_order)
+            )
+        set_committed_value(menu, "categories", categories)
 
-        return await self.save_menu(store_id, categories_data)
+        # 清除快取（commit 後才廣播給其他 worker）
+        CacheService.clear_menu(str(store_id), self.session)
+        return menu
 
     def _group_items_by_category(self, items: List[dict]) -> List[dict]:
         """將品項依分類分組"""
@@ -391,3 +540,4 @@ class MenuService:
             changes.append(f"促銷 {old_label} → {new_label}")
 
         return changes
+
@@ -0,0 +1,181 @@
+"""點餐意圖快速判斷 - 結構單純的訊息不經過 AI
+
+點餐中群組的每則訊息原本都會呼叫 AI，包含「+1」「取消」或直接打出
+菜單品項名稱這類不需要理解語意的訊息。這裡以規則先判斷：
+
+- 取消：「取消」「不要了」等，且使用者已有訂單
+- 跟單：「+1」「我也要」「同上」等，複製最近一位其他人的訂單
+- 點餐：訊息（去掉「我要」等前綴與數量）恰好等於今日菜單中唯一一個品項
+
+判斷結果轉成與 AI 相同格式的 group_create_order / group_cancel_order 動作，
+交給 LineService._execute_group_actions 執行。只要有任何不確定
+（品項重名、名稱含「飯/麵」選擇、有尺寸變體、使用者有飲食限制或過敏需要提醒），
+就回傳 None 交給 AI 處理。
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.services.menu_index import IndexedItem, MenuIndex
+
+logger = logging.getLogger("jaba.intent")
+
+CANCEL_PHRASES = {"取消", "不要了", "我不要了", "取消訂單", "取消點餐", "我要取消", "幫我取消"}
+FOLLOW_PHRASES = {"+1", "＋1", "我也要", "我也是", "同上", "跟", "跟單", "一樣"}
+
+# 點餐前綴（「我要雞腿便當」「來一個雞腿便當」）
+_ORDER_PREFIX = re.compile(r"^(?:我要|我想要|要|幫我點|我點|點|來)(?:一個|一份|一碗|一杯|個|份|碗|杯)?")
+# 數量後綴（「x2」「*2」「2份」「兩個」）
+_QUANTITY_SUFFIX = re.compile(r"(?:\s*[xX×*]\s*(\d+)|\s*(\d+|[一二兩三四五六七八九十])\s*[份個碗杯盒])$")
+_CHINESE_NUMBERS = {
+    "一": 1, "二": 2, "兩": 2, "三": 3, "四": 4, "五": 5,
+    "六": 6, "七": 7, "八": 8, "九": 9, "十": 10,
+}
+# 一次最多接受的數量，超過交給 AI 確認
+_MAX_QUANTITY = 20
+
+
+@dataclass
+class FastPathResult:
+    """快速判斷結果（格式與 AI 回應相同）"""
+    intent: str  # order / follow / cancel
+    message: str
+    actions: List[dict] = field(default_factory=list)
+
+
+class OrderIntentEngine:
+    """規則式點餐意圖判斷"""
+
+    def __init__(self):
+        # 統計
+        self._attempts = 0
+        self._hits: Dict[str, int] = {"order": 0, "follow": 0, "cancel": 0}
+        self._fast_ms_total = 0.0
+        self._saved_ms_total = 0.0
+
+    def resolve(
+        self,
+        text: str,
+        indexes: List[MenuIndex],
+        has_order: bool,
+        previous_items: Optional[List[dict]] = None,
+        preferences: Optional[dict] = None,
+    ) -> Optional[FastPathResult]:
+        """
+        判斷訊息意圖
+
+        Args:
+            text: 使用者訊息
+            indexes: 今日店家的菜單索引（MenuService.get_menu_indexes）
+            has_order: 使用者在本次點餐是否已有訂單
+            previous_items: 最近一位其他人的訂單品項 [{"name", "quantity", "note"}]
+            preferences: 使用者偏好（有飲食限制或過敏時不點餐，交給 AI 提醒）
+
+        Returns:
+            可直接執行的結果；無法確定時回傳 None
+        """
+        self._attempts += 1
+        normalized = " ".join(text.split())
+
+        if normalized in CANCEL_PHRASES:
+            if not has_order:
+                return None
+            return FastPathResult(
+                intent="cancel",
+                message="好的，已幫你取消訂單～",
+                actions=[{"type": "group_cancel_order", "data": {}}],
+            )
+
+        if normalized in FOLLOW_PHRASES:
+            if not previous_items or _needs_reminder(preferences):
+                return None
+            items = [
+                {"name": item["name"], "quantity": item.get("quantity", 1), "note": item.get("note") or ""}
+                for item in previous_items
+            ]
+            names = "、".join(f"{item['name']} x{item['quantity']}" for item in items)
+            return FastPathResult(
+                intent="follow",
+                message=f"好的，跟單 {names}！",
+                actions=[{"type": "group_create_order", "data": {"items": items}}],
+            )
+
+        if _needs_reminder(preferences):
+            return None
+
+        names, quantity = _parse_order_text(normalized)
+        if quantity is None:
+            return None
+
+        # 先比對原文，找不到再比對去掉前綴的名稱
+        matches: List[IndexedItem] = []
+        for name in names:
+            matches = [item for index in indexes for item in index.find_exact(name)]
+            if matches:
+                break
+        if len(matches) != 1:
+            return None
+
+        item = matches[0]
+        # 有選擇（飯/麵）或尺寸變體時需要追問，交給 AI
+        if "/" in item.name or item.variants:
+            return None
+
+        return FastPathResult(
+            intent="order",
+            message=f"好的，{item.name} x{quantity}！",
+            actions=[{
+                "type": "group_create_order",
+                "data": {"items": [{"name": item.name, "quantity": quantity, "category": item.category}]},
+            }],
+        )
+
+    def record_hit(self, intent: str, elapsed_ms: float, ai_avg_ms: Optional[float]) -> None:
+        """記錄命中（ai_avg_ms 為 AI 對話平均耗時，用於估算節省的延遲）"""
+        self._hits[intent] = self._hits.get(intent, 0) + 1
+        self._fast_ms_total += elapsed_ms
+        if ai_avg_ms:
+            self._saved_ms_total += max(0.0, ai_avg_ms - elapsed_ms)
+
+    def stats(self) -> dict:
+        """取得命中率與節省的延遲"""
+        hits = sum(self._hits.values())
+        return {
+            "attempts": self._attempts,
+            "hits": hits,
+            "hit_rate": round(hits / self._attempts, 3) if self._attempts else 0,
+            "hits_by_intent": dict(self._hits),
+            "avg_fast_path_ms": round(self._fast_ms_total / hits, 2) if hits else 0,
+            "saved_ms_total": round(self._saved_ms_total),
+        }
+
+
+def _needs_reminder(preferences: Optional[dict]) -> bool:
+    """使用者有飲食限制或過敏時，點餐需要 AI 判斷是否提醒"""
+    if not preferences:
+        return False
+    return bool(preferences.get("dietary_restrictions") or preferences.get("allergies"))
+
+
+def _parse_order_text(text: str) -> tuple[list[str], Optional[int]]:
+    """拆出候選品項名稱（原文、去掉前綴）與數量（數量不合理時回傳 None）"""
+    quantity = 1
+    match = _QUANTITY_SUFFIX.search(text)
+    if match:
+        raw = match.group(1) or match.group(2)
+        quantity = int(raw) if raw.isdigit() else _CHINESE_NUMBERS[raw]
+        text = text[:match.start()].strip()
+
+    names = [text]
+    stripped = _ORDER_PREFIX.sub("", text).strip()
+    if stripped and stripped != text:
+        names.append(stripped)
+
+    if quantity < 1 or quantity > _MAX_QUANTITY:
+        return names, None
+    return names, quantity
+
+
+# 全域實例（統計跨請求累積）
+order_intent_engine = OrderIntentEngine()
@@ -13,6 +13,7 @@ from app.repositories import (
     OrderSessionRepository,
     GroupTodayStoreRepository,
 )
+from app.services.board_feed import BoardFeed
 from app.services.cache_service import CacheService
 
 logger = logging.getLogger("jaba.order")
@@ -217,12 +218,16 @@ class OrderService:
         # 取得 group_id 並廣播付款狀態
         session = await self.session_repo.get_by_id(order.session_id)
         if session:
+            feed = await BoardFeed(self.session).order_changed(
+                session.group_id, session.id, order.user_id
+            )
             await emit_payment_update(str(session.group_id), {
                 "group_id": str(session.group_id),
                 "order_id": str(order.id),
                 "user_id": str(order.user_id),
                 "payment_status": "paid",
                 "paid_amount": float(order.paid_amount),
+                **feed,
             })
 
         return order
@@ -241,11 +246,15 @@ class OrderService:
         # 取得 group_id 並廣播付款狀態
         session = await self.session_repo.get_by_id(order.session_id)
         if session:
+            feed = await BoardFeed(self.session).order_changed(
+                session.group_id, session.id, order.user_id
+            )
             await emit_payment_update(str(session.group_id), {
                 "group_id": str(session.group_id),
                 "order_id": str(order.id),
                 "user_id": str(order.user_id),
                 "payment_status": "refunded",
+                **feed,
             })
 
         return order
@@ -265,11 +274,13 @@ class OrderService:
             await self.order_repo.delete(order)
 
         # 廣播訂單清除
+        feed = await BoardFeed(self.session).session_cleared(session.group_id, session_id)
         await emit_order_update(str(session.group_id), {
             "group_id": str(session.group_id),
             "session_id": str(session_id),
             "action": "cleared",
             "deleted_count": deleted_count,
+            **feed,
         })
 
         return deleted_count
@@ -1,12 +1,13 @@
 """定時任務排程器"""
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from app.database import get_db_context
 from app.repositories.chat_repo import ChatRepository
+from app.repositories.order_repo import BoardDeltaRepository
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,18 @@ async def cleanup_old_chat_messages():
     logger.info(f"[{datetime.now()}] 清理完成")
 
 
+async def cleanup_board_deltas():
+    """清理兩天前的看板增量更新（看板只需要補齊當日漏掉的更新）"""
+    try:
+        async with get_db_context() as db:
+            before = datetime.now(timezone.utc) - timedelta(days=2)
+            deleted = await BoardDeltaRepository(db).cleanup_before(before)
+            await db.commit()
+            logger.info(f"已清理看板增量更新: {deleted} 筆")
+    except Exception as e:
+        logger.error(f"清理看板增量更新失敗: {e}")
+
+
 def start_scheduler():
     """啟動排程器"""
     # 每月1號凌晨3點執行清理
@@ -51,6 +64,15 @@ def start_scheduler():
         replace_existing=True,
     )
 
+    # 每天凌晨4點清理看板增量更新
+    scheduler.add_job(
+        cleanup_board_deltas,
+        CronTrigger(hour=4, minute=0),
+        id="cleanup_board_deltas",
+        name="清理看板增量更新",
+        replace_existing=True,
+    )
+
     scheduler.start()
     logger.info("排程器已啟動，已設定每月清理任務")
 
@@ -0,0 +1,183 @@
+"""Socket.IO 跨行程廣播 - 依設定選擇 client manager
+
+預設（SOCKETIO_MANAGER 未設定）為單一行程的記憶體 manager，
+flush_events 的廣播只會送到連在同一個 worker 的看板。
+
+多 worker / 多台部署時：
+- postgres：以 PostgreSQL LISTEN/NOTIFY 轉送廣播（沿用既有資料庫，不需額外服務）
+- redis：python-socketio 內建的 AsyncRedisManager（需安裝 redis 套件，
+  pip install 'jaba-ai[redis]'，並設定 SOCKETIO_REDIS_URL）
+
+NOTIFY payload 上限 8000 bytes，較大的廣播（例如整個群組的訂單）
+會切成多段送出，接收端收齊後再組回。
+"""
+import asyncio
+import base64
+import logging
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional
+
+import asyncpg
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from app.config import settings
+
+logger = logging.getLogger("jaba.socketio")
+
+# 單一 NOTIFY 的 payload 上限（PostgreSQL 為 8000 bytes，保留餘裕）
+_MAX_PAYLOAD = 7500
+# 分段內容（base64 前）的大小
+_CHUNK_SIZE = 5000
+# 同時等待組回的分段訊息上限（超過時丟棄最舊的）
+_MAX_PENDING_CHUNKS = 100
+_RECONNECT_DELAY = 2.0
+
+
+class AsyncPostgresManager(AsyncPubSubManager):
+    """以 PostgreSQL LISTEN/NOTIFY 為訊息佇列的 Socket.IO client manager
+
+    用法與 socketio.AsyncRedisManager 相同::
+
+        sio = socketio.AsyncServer(client_manager=AsyncPostgresManager(dsn))
+    """
+
+    name = "postgres"
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        channel: str = "jaba_socketio",
+        write_only: bool = False,
+        logger=None,
+        json=None,
+        connect_kwargs: Optional[dict] = None,
+    ):
+        """
+        Args:
+            dsn: PostgreSQL 連線字串（None 時使用 connect_kwargs / settings 的資料庫設定）
+            channel: NOTIFY channel，所有行程必須相同
+            connect_kwargs: 傳給 asyncpg.connect 的參數
+        """
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.dsn = dsn
+        self.connect_kwargs = connect_kwargs or {}
+        self._publish_conn: Optional[asyncpg.Connection] = None
+        self._publish_lock = asyncio.Lock()
+        self._chunks: "OrderedDict[str, List[Optional[str]]]" = OrderedDict()
+
+    async def _connect(self) -> asyncpg.Connection:
+        return await asyncpg.connect(self.dsn, **self.connect_kwargs)
+
+    async def _publish(self, data):
+        payloads = _split_payload(self.json.dumps(data), self.json)
+        async with self._publish_lock:
+            for retries_left in (1, 0):
+                try:
+                    if self._publish_conn is None or self._publish_conn.is_closed():
+                        self._publish_conn = await self._connect()
+                    for payload in payloads:
+                        await self._publish_conn.execute(
+                            "SELECT pg_notify($1, $2)", self.channel, payload
+                        )
+                    return
+                except Exception as exc:
+                    self._publish_conn = None
+                    if retries_left:
+                        self._get_logger().error(f"Cannot publish to postgres... retrying: {exc}")
+                    else:
+                        self._get_logger().error(f"Cannot publish to postgres... giving up: {exc}")
+
+    async def _listen(self) -> AsyncIterator[str]:
+        """LISTEN 連線中斷時自動重連（重連期間的廣播會遺失，看板重連時會重新載入）"""
+        queue: asyncio.Queue = asyncio.Queue()
+        while True:
+            conn = None
+            try:
+                conn = await self._connect()
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _: closed.set())
+                await conn.add_listener(
+                    self.channel, lambda *args: queue.put_nowait(args[3])
+                )
+                self._get_logger().info("Socket.IO postgres listener connected")
+
+                while not closed.is_set():
+                    getter = asyncio.ensure_future(queue.get())
+                    waiter = asyncio.ensure_future(closed.wait())
+                    done, _ = await asyncio.wait(
+                        {getter, waiter}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if getter not in done:
+                        getter.cancel()
+                        continue
+                    waiter.cancel()
+                    message = self._assemble(getter.result())
+                    if message is not None:
+                        yield message
+                self._get_logger().error("Socket.IO postgres listener disconnected")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._get_logger().error(f"Socket.IO postgres listener error: {exc}")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+    def _assemble(self, payload: str) -> Optional[str]:
+        """組回分段訊息（未分段的訊息直接回傳）"""
+        if not payload.startswith('{"chunk"'):
+            return payload
+        try:
+            part = self.json.loads(payload)
+            parts = self._chunks.setdefault(part["chunk"], [None] * part["n"])
+            parts[part["i"]] = part["d"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            self._get_logger().warning("Socket.IO postgres listener ignored malformed chunk")
+            return None
+
+        while len(self._chunks) > _MAX_PENDING_CHUNKS:
+            self._chunks.popitem(last=False)
+        if any(p is None for p in parts):
+            return None
+        del self._chunks[part["chunk"]]
+        return b"".join(base64.b64decode(p) for p in parts).decode("utf-8")
+
+
+def _split_payload(message: str, json_module) -> List[str]:
+    """超過 NOTIFY 上限的訊息切成多段（每段帶訊息 ID、序號與總段數）"""
+    raw = message.encode("utf-8")
+    if len(raw) <= _MAX_PAYLOAD:
+        return [message]
+    chunk_id = uuid.uuid4().hex
+    pieces = [raw[i:i + _CHUNK_SIZE] for i in range(0, len(raw), _CHUNK_SIZE)]
+    return [
+        json_module.dumps({
+            "chunk": chunk_id, "i": i, "n": len(pieces),
+            "d": base64.b64encode(piece).decode("ascii"),
+        })
+        for i, piece in enumerate(pieces)
+    ]
+
+
+def create_client_manager() -> Optional[socketio.AsyncManager]:
+    """依 settings.socketio_manager 建立 client manager（None 表示使用預設的單行程 manager）"""
+    backend = settings.socketio_manager.lower()
+    if not backend or backend == "memory":
+        return None
+    if backend == "postgres":
+        return AsyncPostgresManager(
+            channel=settings.socketio_channel,
+            connect_kwargs={
+                "host": settings.db_host,
+                "port": settings.db_port,
+                "user": settings.db_user,
+                "password": settings.db_password,
+                "database": settings.db_name,
+            },
+        )
+    if backend == "redis":
+        return socketio.AsyncRedisManager(settings.socketio_redis_url, channel=settings.socketio_channel)
+    raise ValueError(f"Unknown SOCKETIO_MANAGER: {settings.socketio_manager}")
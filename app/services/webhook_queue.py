@@ -0,0 +1,222 @@
+"""Webhook 事件工作隊列 - 先回應 LINE，再由背景 worker 處理事件
+
+line_callback 驗證簽章後把事件放進隊列並立即回傳 200，
+實際處理（含 AI 呼叫）由固定數量的 worker 在背景執行。
+
+分片（shard）規則：事件依群組 / 聊天室（1 對 1 聊天則為使用者）分成
+各自的 FIFO 通道。
+- 同一分片同時只會有一個 worker 處理，事件嚴格依收到順序執行，
+  「+1」不會超車前面的「開單」。
+- 不同分片互不等待，由 worker pool 平行處理；一個群組在跑 AI
+  不會擋住其他群組。
+- worker 一次取出分片目前累積的事件（最多 shard_batch_size 筆），
+  交給 handler 在同一個 DB session 中依序處理，處理完若通道又有新事件
+  則重新排到就緒隊列尾端，避免單一熱門群組長期佔用 worker。
+
+main.py 在 lifespan 中呼叫 start_webhook_queue() 注入分片處理函數，
+關閉時呼叫 stop_webhook_queue() 等待隊列處理完畢（graceful drain）。
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger("jaba.webhook.queue")
+
+# 分片處理函數類型定義：(分片 key, 依序排列的事件) -> None
+ShardHandler = Callable[[str, List[Any]], Awaitable[None]]
+
+
+@dataclass
+class QueuedEvent:
+    """待處理的 Webhook 事件"""
+    key: str
+    event: Any
+    enqueued_at: float
+
+
+class WebhookQueue:
+    """Webhook 事件分片派送器（分片內依序、分片間平行）"""
+
+    def __init__(self, workers: int, maxsize: int, shard_batch_size: int = 20):
+        self.worker_count = max(1, workers)
+        self.maxsize = maxsize
+        self.shard_batch_size = max(1, shard_batch_size)
+        self._handler: Optional[ShardHandler] = None
+        self._lanes: Dict[str, Deque[QueuedEvent]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._scheduled: Set[str] = set()  # 已在就緒隊列或處理中的分片
+        self._active: Set[str] = set()  # 處理中的分片
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+
+        # 統計
+        self._depth = 0
+        self._in_flight = 0
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def start(self, handler: ShardHandler) -> None:
+        """啟動 worker"""
+        if self._tasks:
+            return
+
+        self._handler = handler
+        self._ready = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"webhook-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        self._accepting = True
+        logger.info(
+            f"Webhook queue started (workers={self.worker_count}, maxsize={self.maxsize})"
+        )
+
+    def enqueue_batch(self, items: List[Tuple[str, Any]]) -> bool:
+        """將一批事件加入隊列
+
+        整批一起接受或一起拒絕，避免 LINE 重送時部分事件重複處理。
+
+        Args:
+            items: [(分片 key, 事件), ...]，key 為群組/聊天室/使用者 ID
+
+        Returns:
+            是否已加入隊列（未啟動或隊列已滿時回傳 False）
+        """
+        if not self._accepting:
+            return False
+
+        if self._depth + len(items) > self.maxsize:
+            self._rejected += len(items)
+            logger.warning(
+                f"Webhook queue full (depth={self._depth}), rejected {len(items)} events"
+            )
+            return False
+
+        now = time.monotonic()
+        for key, event in items:
+            lane = self._lanes.setdefault(key, deque())
+            lane.append(QueuedEvent(key=key, event=event, enqueued_at=now))
+            self._depth += 1
+            self._enqueued += 1
+            self._schedule(key)
+
+        return True
+
+    def _schedule(self, key: str) -> None:
+        """分片有待處理事件且未被排程時，放入就緒隊列"""
+        if key in self._scheduled:
+            return
+        self._scheduled.add(key)
+        self._ready.put_nowait(key)
+
+    def _take(self, key: str) -> List[QueuedEvent]:
+        """取出分片目前累積的事件（依序，最多 shard_batch_size 筆）"""
+        lane = self._lanes.get(key)
+        batch: List[QueuedEvent] = []
+        while lane and len(batch) < self.shard_batch_size:
+            batch.append(lane.popleft())
+        if lane is not None and not lane:
+            del self._lanes[key]
+        return batch
+
+    async def _worker(self) -> None:
+        """從就緒隊列取出分片並依序處理"""
+        while True:
+            key = await self._ready.get()
+            batch = self._take(key)
+            self._active.add(key)
+            self._depth -= len(batch)
+            self._in_flight += len(batch)
+
+            now = time.monotonic()
+            for item in batch:
+                wait_ms = (now - item.enqueued_at) * 1000
+                self._total_wait_ms += wait_ms
+                self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+
+            try:
+                if batch:
+                    await self._handler(key, [item.event for item in batch])
+                    self._processed += len(batch)
+            except Exception as e:
+                self._failed += len(batch)
+                logger.error(f"Webhook shard error (key={key}): {e}", exc_info=True)
+            finally:
+                self._in_flight -= len(batch)
+                self._active.discard(key)
+                self._scheduled.discard(key)
+                # 處理期間又有新事件進來，重新排到尾端
+                if key in self._lanes:
+                    self._schedule(key)
+                self._ready.task_done()
+
+    async def drain(self, timeout: float) -> None:
+        """停止接收新事件，等待隊列中事件處理完畢後關閉 worker"""
+        if not self._tasks:
+            return
+
+        self._accepting = False
+        logger.info(f"Draining webhook queue (depth={self._depth}, in_flight={self._in_flight})")
+
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Webhook queue drain timeout, dropping {self._depth} pending events"
+            )
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Webhook queue stopped")
+
+    def stats(self) -> dict:
+        """取得隊列統計"""
+        finished = self._processed + self._failed
+        return {
+            "running": self._accepting,
+            "workers": self.worker_count,
+            "maxsize": self.maxsize,
+            "depth": self._depth,
+            "in_flight": self._in_flight,
+            "shards_pending": len(self._lanes),
+            "shards_active": len(self._active),
+            "max_shard_depth": max((len(lane) for lane in self._lanes.values()), default=0),
+            "enqueued": self._enqueued,
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._total_wait_ms / finished, 1) if finished else 0,
+            "max_wait_ms": round(self._max_wait_ms, 1),
+        }
+
+
+# 全域隊列實例
+webhook_queue = WebhookQueue(
+    workers=settings.webhook_workers,
+    maxsize=settings.webhook_queue_size,
+)
+
+
+def start_webhook_queue(handler: ShardHandler) -> None:
+    """啟動 Webhook 隊列（由 main.py lifespan 呼叫）"""
+    webhook_queue.start(handler)
+
+
+async def stop_webhook_queue() -> None:
+    """處理完剩餘事件後停止 Webhook 隊列"""
+    await webhook_queue.drain(timeout=settings.webhook_drain_timeout)
@@ -8,6 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 import socketio
 
 from app.config import settings
+from app.services.socketio_manager import create_client_manager
 from app.routers import (
     public_router,
     board_router,
@@ -29,6 +30,11 @@ logger = logging.getLogger("jaba")
 async def lifespan(app: FastAPI):
     """應用程式生命週期管理"""
     from app.services.scheduler import start_scheduler, stop_scheduler
+    from app.services.line_client import init_line_client, close_line_client
+    from app.services.ai_service import get_ai_service
+    from app.services.webhook_queue import start_webhook_queue, stop_webhook_queue
+    from app.services.cache_bus import start_cache_bus, stop_cache_bus
+    from app.routers.line_webhook import process_shard
     from app.broadcast import register_broadcasters
 
     logger.info("Starting Jaba AI...")
@@ -44,16 +50,39 @@ async def lifespan(app: FastAPI):
         group_update=broadcast_group_update,
     )
 
+    # 建立共用客戶端（LINE API 連線池、Webhook 解析器、AI 服務）
+    init_line_client()
+    ai_service = get_ai_service()
+    ai_service.start()
+
+    # 啟動跨行程快取失效廣播
+    await start_cache_bus()
+
     # 自動建立初始管理員
     await _init_super_admin()
 
     # 啟動定時任務排程器
     start_scheduler()
 
+    # 啟動 Webhook 背景處理隊列
+    start_webhook_queue(process_shard)
+
     yield
 
+    # 處理完剩餘的 Webhook 事件
+    await stop_webhook_queue()
+
     # 停止排程器
     stop_scheduler()
+
+    # 關閉常駐 AI 行程
+    await ai_service.close()
+
+    # 停止快取失效廣播
+    await stop_cache_bus()
+
+    # 關閉 LINE API 連線池
+    await close_line_client()
     logger.info("Shutting down Jaba AI...")
 
 
@@ -98,10 +127,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Socket.IO
+# Socket.IO（設定 SOCKETIO_MANAGER 時透過訊息佇列廣播給所有 worker）
 sio = socketio.AsyncServer(
     async_mode="asgi",
     cors_allowed_origins="*",
+    client_manager=create_client_manager(),
 )
 socket_app = socketio.ASGIApp(sio, app)
 
@@ -195,34 +225,44 @@ async def root():
 
 
 # Socket.IO 廣播函數（供其他模組使用）
+def _board_rooms(group_id: str) -> list:
+    """群組看板與總看板房間（group_id 為 "all" 時只有總看板）"""
+    return list(dict.fromkeys([f"board:{group_id}", "board:all"]))
+
+
+async def _emit_board(event: str, group_id: str, data: dict, skip_sid=None):
+    """發送一次給群組看板與總看板（同時在兩個房間的客戶端只收到一次）
+
+    只序列化一次封包；使用訊息佇列 manager 時也只發布一則訊息。
+    其餘耗時在 python-socketio 的 AsyncManager.emit 為每個收件連線各建立一個
+    送出 task，與看板連線數成正比，不受房間數影響。
+    """
+    await sio.emit(event, data, room=_board_rooms(group_id), skip_sid=skip_sid)
+
+
 async def broadcast_order_update(group_id: str, data: dict):
     """廣播訂單更新"""
-    await sio.emit("order_update", data, room=f"board:{group_id}")
-    await sio.emit("order_update", data, room="board:all")
+    await _emit_board("order_update", group_id, data)
 
 
 async def broadcast_chat_message(group_id: str, data: dict):
     """廣播聊天訊息"""
-    await sio.emit("chat_message", data, room=f"board:{group_id}")
-    await sio.emit("chat_message", data, room="board:all")
+    await _emit_board("chat_message", group_id, data)
 
 
 async def broadcast_session_status(group_id: str, data: dict):
     """廣播 Session 狀態變更（開單/收單）"""
-    await sio.emit("session_status", data, room=f"board:{group_id}")
-    await sio.emit("session_status", data, room="board:all")
+    await _emit_board("session_status", group_id, data)
 
 
 async def broadcast_payment_update(group_id: str, data: dict):
     """廣播付款狀態變更"""
-    await sio.emit("payment_update", data, room=f"board:{group_id}")
-    await sio.emit("payment_update", data, room="board:all")
+    await _emit_board("payment_update", group_id, data)
 
 
 async def broadcast_store_change(group_id: str, data: dict):
     """廣播今日店家變更"""
-    await sio.emit("store_change", data, room=f"board:{group_id}")
-    await sio.emit("store_change", data, room="board:all")
+    await _emit_board("store_change", group_id, data)
 
 
 async def broadcast_application_update(room: str, data: dict):
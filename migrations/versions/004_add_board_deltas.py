@@ -0,0 +1,37 @@
+"""add board_deltas table and groups.board_seq
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'groups',
+        sa.Column('board_seq', sa.BigInteger, nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'board_deltas',
+        sa.Column('group_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('groups.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('seq', sa.BigInteger, primary_key=True),
+        sa.Column('payload', postgresql.JSONB, nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), index=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('board_deltas')
+    op.drop_column('groups', 'board_seq')
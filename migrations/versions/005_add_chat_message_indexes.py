@@ -0,0 +1,50 @@
+"""add chat_messages composite indexes for Taipei-day range queries
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # chat_messages 持續成長，以 CONCURRENTLY 建立索引避免鎖表（不能在交易內執行）
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_chat_messages_group_created', 'chat_messages', ['group_id', 'created_at'],
+            postgresql_where=sa.text('group_id IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'idx_chat_messages_group_session_created', 'chat_messages',
+            ['group_id', 'session_id', 'created_at'],
+            postgresql_where=sa.text('group_id IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'idx_chat_messages_user_created', 'chat_messages', ['user_id', 'created_at'],
+            postgresql_where=sa.text('group_id IS NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        # 已被 idx_chat_messages_group_created 涵蓋
+        op.drop_index(
+            'ix_chat_messages_group_id', table_name='chat_messages',
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    op.create_index('ix_chat_messages_group_id', 'chat_messages', ['group_id'])
+    op.drop_index('idx_chat_messages_user_created', table_name='chat_messages')
+    op.drop_index('idx_chat_messages_group_session_created', table_name='chat_messages')
+    op.drop_index('idx_chat_messages_group_created', table_name='chat_messages')
@@ -0,0 +1,48 @@
+"""add pg_trgm GIN indexes for admin search
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column)：ILIKE '%關鍵字%' 與 word_similarity 排序使用
+TRGM_COLUMNS = [
+    ('users', 'display_name'),
+    ('users', 'line_user_id'),
+    ('groups', 'name'),
+    ('groups', 'group_code'),
+    ('groups', 'line_group_id'),
+    ('stores', 'name'),
+    ('menu_items', 'name'),
+]
+
+
+def upgrade() -> None:
+    # 需要資料庫使用者有建立 extension 的權限（PostgreSQL 13+ 的 trusted extension 只需 CREATE 權限）
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # 以 CONCURRENTLY 建立索引避免鎖表（不能在交易內執行）
+    with op.get_context().autocommit_block():
+        for table, column in TRGM_COLUMNS:
+            op.create_index(
+                f'idx_{table}_{column}_trgm', table, [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    for table, column in TRGM_COLUMNS:
+        op.drop_index(f'idx_{table}_{column}_trgm', table_name=table)
+    # 保留 pg_trgm extension（可能有其他用途）
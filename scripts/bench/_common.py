@@ -0,0 +1,84 @@
+"""效能量測腳本共用工具
+
+各 bench_*.py 以 `python scripts/bench/bench_xxx.py` 執行，
+這裡負責把專案根目錄加入 sys.path，並提供計時與 SQL 語句計數。
+
+需要資料庫的量測預設使用記憶體 SQLite（需安裝 aiosqlite），只看語句數量；
+要量測實際延遲請以 --url 指定「可以清空的」PostgreSQL 測試資料庫，
+腳本會在其中建立資料表並寫入測試資料。
+"""
+import argparse
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.dialects.postgresql import JSONB  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+DEFAULT_URL = "sqlite+aiosqlite://"
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    """SQLite 沒有 JSONB，量測時以 JSON 代替"""
+    return "JSON"
+
+
+class StatementCounter:
+    """記錄 engine 送出的 SQL 語句"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.statements: List[str] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+def db_arg_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--url",
+        default=DEFAULT_URL,
+        help="資料庫連線字串（PostgreSQL 請指定可清空的測試資料庫）",
+    )
+    return parser
+
+
+async def create_bench_engine(url: str) -> AsyncEngine:
+    """建立 engine 並重建所有資料表"""
+    from app.models import Base
+
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            await conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+@contextmanager
+def timer() -> Iterator[dict]:
+    """量測區塊耗時（毫秒），結果寫入 yield 的 dict["ms"]"""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["ms"] = (time.perf_counter() - start) * 1000
@@ -0,0 +1,117 @@
+"""管理後台搜尋：沒有 / 有 pg_trgm GIN 索引的延遲（僅支援 PostgreSQL）
+
+在測試資料庫建立 --users 筆使用者（預設 10 萬），以
+UserRepository.get_all_paginated(search=...) 搜尋數個關鍵字，比較：
+- before：移除 users 的 trigram 索引（ILIKE '%關鍵字%' 只能全表掃描）
+- after：建立 idx_users_*_trgm GIN 索引
+
+每個關鍵字輸出耗時中位數與 EXPLAIN 的掃描方式。
+
+    python scripts/bench/bench_admin_search.py --url postgresql+asyncpg://.../jaba_bench
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from statistics import median
+from typing import List
+
+import _common
+from _common import create_bench_engine, timer
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.models import User
+from app.repositories import UserRepository
+from app.repositories.search import search_filter
+
+TERMS = ["王小明", "Alice", "便當", "U1a2b"]
+_SURNAMES = "王李張劉陳楊黃趙吳周徐孫馬朱胡郭何林高羅"
+_GIVEN = "小明美玲志豪家豪雅婷俊傑淑芬建宏怡君冠宇宗翰"
+_LATIN = ["Alice", "Bob", "Carol", "David", "Emma", "Frank", "Grace", "Henry"]
+_BATCH = 10000
+
+
+def _display_name(rng: random.Random, i: int) -> str:
+    if i % 5 == 0:
+        return f"{rng.choice(_LATIN)} {rng.randint(1, 9999)}"
+    name = rng.choice(_SURNAMES) + "".join(rng.sample(_GIVEN, 2))
+    return name + ("（便當團）" if i % 50 == 0 else "")
+
+
+async def seed(engine: AsyncEngine, users: int) -> None:
+    rng = random.Random(42)
+    async with engine.begin() as conn:
+        for start in range(0, users, _BATCH):
+            await conn.execute(insert(User), [
+                {
+                    "id": uuid.uuid4(),
+                    "line_user_id": "U" + uuid.UUID(int=rng.getrandbits(128)).hex,
+                    "display_name": _display_name(rng, i),
+                    "preferences": {},
+                    "is_banned": False,
+                }
+                for i in range(start, min(start + _BATCH, users))
+            ])
+        await conn.exec_driver_sql("ANALYZE users")
+
+
+def _trgm_indexes() -> List:
+    return [i for i in User.__table__.indexes if i.name.endswith("_trgm")]
+
+
+async def set_trgm_indexes(engine: AsyncEngine, present: bool) -> None:
+    async with engine.begin() as conn:
+        for index in _trgm_indexes():
+            if present:
+                await conn.run_sync(lambda sync_conn, index=index: index.create(sync_conn, checkfirst=True))
+            else:
+                await conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        await conn.exec_driver_sql("ANALYZE users")
+
+
+async def scan_type(engine: AsyncEngine, term: str) -> str:
+    """EXPLAIN 搜尋條件的掃描方式"""
+    query = select(User.id).where(search_filter((User.display_name, User.line_user_id), term))
+    compiled = query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    async with engine.connect() as conn:
+        plan = [row[0] for row in await conn.exec_driver_sql(f"EXPLAIN {compiled}")]
+    for node in ("Bitmap Index Scan", "Index Scan", "Seq Scan"):
+        if any(node in line for line in plan):
+            return node
+    return plan[0]
+
+
+async def measure(engine: AsyncEngine, label: str, rounds: int) -> None:
+    session_factory = async_sessionmaker(engine)
+    for term in TERMS:
+        times = []
+        for _ in range(rounds):
+            async with session_factory() as db:
+                with timer() as elapsed:
+                    _, total = await UserRepository(db).get_all_paginated(limit=20, search=term)
+                times.append(elapsed["ms"])
+        plan = await scan_type(engine, term)
+        print(f"{label:<7} {term:<8} {total:6d} hits  {median(times):8.1f} ms  {plan}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = await create_bench_engine(args.url)
+    await seed(engine, args.users)
+    print(f"{args.users} users")
+
+    await set_trgm_indexes(engine, present=False)
+    await measure(engine, "before", args.rounds)
+    await set_trgm_indexes(engine, present=True)
+    await measure(engine, "after", args.rounds)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = _common.db_arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    if not args.url.startswith("postgresql"):
+        parser.error("pg_trgm 需要 PostgreSQL，請以 --url 指定測試資料庫")
+    asyncio.run(main(args))
@@ -0,0 +1,109 @@
+"""Claude worker pool：預熱 worker 省下的啟動延遲
+
+以假的 claude 執行檔（啟動需 --startup-ms、每則回覆需 --reply-ms）代替 CLI，
+在 max_requests=1（每個行程只服務一次，避免不同群組的對話上下文互相可見）下比較：
+- cold：warm_per_key=0，每個請求都等行程啟動（等同每次 `claude -p`）
+- prewarm：warm_per_key=1，使用後在背景補一個預熱行程
+- reuse：max_requests=--reuse，同一行程連續服務（上限參考，會累積對話上下文）
+
+兩種到達方式：
+- sequential：同一群組每隔 --gap-ms 一則訊息（預熱來得及補上）
+- burst：--burst 則訊息同時到達（只有第一則拿得到預熱行程）
+
+    python scripts/bench/bench_ai_worker_prewarm.py --startup-ms 800 --reply-ms 200
+"""
+import argparse
+import asyncio
+import stat
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+from statistics import median
+from typing import List
+
+import _common  # noqa: F401  （設定 sys.path）
+from _common import timer
+
+from app.services.ai_worker_pool import ClaudeWorkerPool
+
+# 假的 claude：啟動延遲後才開始讀 stdin，每則訊息延遲後回覆
+_STUB = textwrap.dedent(
+    """
+    import json, sys, time
+
+    time.sleep({startup})
+    for line in sys.stdin:
+        time.sleep({reply})
+        text = json.loads(line)["message"]["content"]
+        print(json.dumps({{"type": "result", "result": text}}), flush=True)
+    """
+)
+
+
+def write_stub(directory: Path, startup_ms: int, reply_ms: int) -> str:
+    path = directory / "claude"
+    path.write_text(f"#!{sys.executable}\n" + _STUB.format(startup=startup_ms / 1000, reply=reply_ms / 1000))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+async def ask(pool: ClaudeWorkerPool, message: str) -> float:
+    with timer() as elapsed:
+        await pool.run("m", "sys", message, timeout=60)
+    return elapsed["ms"]
+
+
+async def sequential(pool: ClaudeWorkerPool, requests: int, gap_ms: int) -> List[float]:
+    times = []
+    for i in range(requests):
+        times.append(await ask(pool, str(i)))
+        await asyncio.sleep(gap_ms / 1000)
+    return times
+
+
+async def burst(pool: ClaudeWorkerPool, requests: int, gap_ms: int) -> List[float]:
+    # 先送一則讓預熱行程就位，再同時送出
+    await ask(pool, "warmup")
+    await asyncio.sleep(gap_ms / 1000)
+    return list(await asyncio.gather(*(ask(pool, str(i)) for i in range(requests))))
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        claude = write_stub(Path(tmp), args.startup_ms, args.reply_ms)
+        print(f"stub claude: startup {args.startup_ms} ms, reply {args.reply_ms} ms")
+        for scenario, func, requests in (
+            ("sequential", sequential, args.requests),
+            ("burst", burst, args.burst),
+        ):
+            for label, max_requests, warm_per_key in (
+                ("cold", 1, 0),
+                ("prewarm", 1, 1),
+                ("reuse", args.reuse, 1),
+            ):
+                pool = ClaudeWorkerPool(
+                    claude, tmp, size=max(args.burst, 2),
+                    max_requests=max_requests, warm_per_key=warm_per_key,
+                )
+                try:
+                    times = await func(pool, requests, args.gap_ms)
+                finally:
+                    await pool.close()
+                stats = pool.stats()
+                print(
+                    f"{scenario:<11} {label:<8} median {median(times):7.1f} ms  "
+                    f"max {max(times):7.1f} ms  spawned {stats['spawned']:3d}  "
+                    f"warm hits {stats['warm_hits']:3d}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--startup-ms", type=int, default=800)
+    parser.add_argument("--reply-ms", type=int, default=200)
+    parser.add_argument("--gap-ms", type=int, default=1500)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--burst", type=int, default=4)
+    parser.add_argument("--reuse", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,138 @@
+"""看板廣播：分別 emit 到兩個房間 vs 一次 emit 到房間聯集
+
+在 main.sio 註冊 --boards 個假看板連線，Engine.IO 送出改為只編碼與計數。
+client manager 換成只記錄發布內容的 pub/sub manager（等同多 worker 部署時
+每次廣播要送進 LISTEN/NOTIFY 或 Redis 的訊息）。
+
+看板依 board.html 的行為各自加入一個房間：--all-ratio 比例的看板加入
+board:all（總看板），其餘平均分在各群組的 board:{group_id}；
+另有 --overlap 比例的群組看板同時也在 board:all（切換看板時未離開舊房間）。
+
+對各群組廣播 --emits 次，比較：
+- before：sio.emit 到 board:{group_id}，再 sio.emit 到 board:all
+- after：main._emit_board（room=[board:{group_id}, board:all] 一次送出）
+
+after 只省下編碼與發布次數；總耗時大多花在 AsyncManager.emit 逐一為收件連線
+建立送出 task（每個連線數微秒），兩種做法的封包數相同，所以差距有限。
+
+    python scripts/bench/bench_board_emit.py --boards 2000 --emits 200
+"""
+import argparse
+import asyncio
+from typing import Dict, List
+
+import _common  # noqa: F401  （設定 sys.path）
+from _common import timer
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+import main
+from main import sio
+
+GROUPS = 50
+
+
+class _RecordingPubSubManager(AsyncPubSubManager):
+    """只記錄要發布給其他 worker 的訊息"""
+
+    def __init__(self):
+        super().__init__(write_only=True)
+        self.published: List[dict] = []
+
+    async def _publish(self, data):
+        self.json.dumps(data)
+        self.published.append(data)
+
+
+class _CountingPacket(sio.packet_class):
+    """計算 Socket.IO 封包編碼次數"""
+
+    encodes = 0
+
+    def encode(self):
+        _CountingPacket.encodes += 1
+        return super().encode()
+
+
+async def setup_boards(args: argparse.Namespace) -> None:
+    manager = sio.manager
+    all_every = round(1 / args.all_ratio) if args.all_ratio > 0 else 0
+    overlap_every = round(1 / args.overlap) if args.overlap > 0 else 0
+    group_boards = 0
+    for i in range(args.boards):
+        sid = await manager.connect(f"eio-{i}", "/")
+        if all_every and i % all_every == 0:
+            await manager.enter_room(sid, "/", "board:all")
+            continue
+        await manager.enter_room(sid, "/", f"board:group-{group_boards % GROUPS}")
+        if overlap_every and group_boards % overlap_every == 0:
+            await manager.enter_room(sid, "/", "board:all")
+        group_boards += 1
+
+
+async def run(emits: int, broadcast, sent: list) -> Dict[str, float]:
+    """廣播 emits 次，回傳各項計數與耗時"""
+    data = {"group_id": "", "action": "created", "display_name": "小明", "seq": 1}
+    sent.clear()
+    sio.manager.published.clear()
+    _CountingPacket.encodes = 0
+    with timer() as elapsed:
+        for i in range(emits):
+            group_id = f"group-{i % GROUPS}"
+            await broadcast(group_id, {**data, "group_id": group_id})
+            # 等待 manager 建立的送出 task 完成
+            await asyncio.gather(*(asyncio.all_tasks() - {asyncio.current_task()}))
+    return {
+        "packets": len(sent),
+        "encodes": _CountingPacket.encodes,
+        "published": len(sio.manager.published),
+        "ms": elapsed["ms"],
+    }
+
+
+async def amain(args: argparse.Namespace) -> None:
+    sent = []
+
+    async def send_packet(eio_sid, pkt):
+        pkt.encode()
+        sent.append(eio_sid)
+
+    sio.eio.send_packet = send_packet
+    sio.packet_class = _CountingPacket
+    sio.manager = _RecordingPubSubManager()
+    sio.manager.set_server(sio)
+    await setup_boards(args)
+
+    async def before(group_id: str, data: dict) -> None:
+        await sio.emit("order_update", data, room=f"board:{group_id}")
+        await sio.emit("order_update", data, room="board:all")
+
+    async def after(group_id: str, data: dict) -> None:
+        await main._emit_board("order_update", group_id, data)
+
+    print(
+        f"{args.boards} boards ({args.all_ratio:.0%} on board:all, "
+        f"{args.overlap:.0%} of group boards also on board:all), "
+        f"{GROUPS} groups, {args.emits} broadcasts"
+    )
+    # 交替執行數輪取最小耗時，降低執行順序與 GC 的影響
+    results = {"before": [], "after": []}
+    for _ in range(args.rounds):
+        for name, broadcast in (("before", before), ("after", after)):
+            results[name].append(await run(args.emits, broadcast, sent))
+    for name, runs in results.items():
+        first = runs[0]
+        best = min(r["ms"] for r in runs)
+        print(
+            f"{name:<7} {first['packets']:7d} packets  {first['encodes']:5d} encodes  "
+            f"{first['published']:5d} published  {best:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, default=2000)
+    parser.add_argument("--emits", type=int, default=200)
+    parser.add_argument("--all-ratio", type=float, default=0.25)
+    parser.add_argument("--overlap", type=float, default=0.0)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(amain(parser.parse_args()))
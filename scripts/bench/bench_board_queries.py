@@ -0,0 +1,133 @@
+"""看板查詢：逐群組 / 逐 Session 查詢 vs 批次查詢
+
+建立 --groups 個已啟用群組，每群組今日一個點餐 Session（各 --orders 筆訂單、
+每筆 2 個品項）與一間今日店家，比較 SQL 語句數與耗時：
+- before：舊版 /api/board/orders 與 /api/board/today-stores 的逐群組迴圈
+- after：app.routers.board 目前的 get_board_orders / get_all_today_stores
+
+today-stores 每輪前清空快取（冷快取）。
+
+    python scripts/bench/bench_board_queries.py --groups 200
+    python scripts/bench/bench_board_queries.py --url postgresql+asyncpg://.../jaba_bench
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from statistics import median
+
+import _common
+from _common import StatementCounter, create_bench_engine, timer
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models import Group, GroupTodayStore, Order, OrderItem, OrderSession, Store, User
+from app.repositories import GroupRepository, GroupTodayStoreRepository, OrderSessionRepository
+from app.repositories.order_repo import TW_TZ, get_today_tw
+from app.routers import board
+from app.services.board_feed import serialize_board_order
+from app.services.cache_service import CacheService
+
+
+async def seed(session_factory, groups: int, orders: int) -> None:
+    now = datetime.now(TW_TZ)
+    async with session_factory() as db:
+        store = Store(name="便當店")
+        users = [User(line_user_id=f"U{i}", display_name=f"使用者 {i}") for i in range(orders)]
+        db.add_all([store, *users])
+        for g in range(groups):
+            group = Group(line_group_id=f"C{g}", name=f"群組 {g}", status="active")
+            order_session = OrderSession(group=group, created_at=now)
+            db.add_all([
+                group,
+                order_session,
+                GroupTodayStore(group=group, store=store, date=get_today_tw()),
+            ])
+            for user in users:
+                db.add(Order(
+                    session=order_session, user=user, store=store, total_amount=Decimal("180"),
+                    items=[
+                        OrderItem(name="雞腿便當", unit_price=Decimal("100"), subtotal=Decimal("100")),
+                        OrderItem(name="紅茶", unit_price=Decimal("80"), subtotal=Decimal("80")),
+                    ],
+                ))
+        await db.commit()
+
+
+async def orders_before(db):
+    """舊版 get_board_orders：每群組查 Session，每個 Session 再載入訂單"""
+    session_repo = OrderSessionRepository(db)
+    result = []
+    for group in await GroupRepository(db).get_active_groups():
+        today = get_today_tw()
+        for session in await session_repo.get_group_sessions(group.id, today, today):
+            session_with_orders = await session_repo.get_with_orders(session.id)
+            result.append([serialize_board_order(o) for o in session_with_orders.orders])
+    return result
+
+
+async def orders_after(db):
+    return [s["orders"] for s in await board.get_board_orders(group_id=None, db=db)]
+
+
+async def stores_before(db):
+    """舊版 get_all_today_stores：每群組查一次今日店家"""
+    today_repo = GroupTodayStoreRepository(db)
+    result = []
+    for group in await GroupRepository(db).get_active_groups():
+        result.append([ts.store.name for ts in await today_repo.get_today_stores(group.id)])
+    return result
+
+
+async def stores_after(db):
+    return [
+        [s["store_name"] for s in g["stores"]]
+        for g in await board.get_all_today_stores(group_id=None, db=db)
+    ]
+
+
+async def measure(session_factory, counter, func, rounds: int):
+    """回傳 (語句數, 耗時中位數 ms, 結果)"""
+    times = []
+    for _ in range(rounds):
+        CacheService.clear_all()
+        async with session_factory() as db:
+            counter.reset()
+            with timer() as elapsed:
+                result = await func(db)
+            times.append(elapsed["ms"])
+    return counter.count, median(times), result
+
+
+def _normalize(result):
+    return sorted(
+        sorted(str(sorted(o.items())) if isinstance(o, dict) else str(o) for o in rows)
+        for rows in result
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = await create_bench_engine(args.url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory, args.groups, args.orders)
+    counter = StatementCounter(engine)
+
+    print(f"{engine.dialect.name}: {args.groups} groups, 1 session and {args.orders} orders each")
+    for name, before, after in (
+        ("orders", orders_before, orders_after),
+        ("today-stores", stores_before, stores_after),
+    ):
+        b_count, b_ms, b_result = await measure(session_factory, counter, before, args.rounds)
+        a_count, a_ms, a_result = await measure(session_factory, counter, after, args.rounds)
+        same = _normalize(b_result) == _normalize(a_result)
+        print(f"{name:<13} before {b_count:5d} statements {b_ms:8.1f} ms")
+        print(f"{'':<13} after  {a_count:5d} statements {a_ms:8.1f} ms   same result: {same}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = _common.db_arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,135 @@
+"""AI 回應 JSON 擷取：舊版括號平衡法 vs 反向 raw_decode
+
+對每個樣本確認兩種做法擷取結果相同，並比較 CPU 時間。
+樣本預設為程式產生的 CLI 輸出（說明文字 + 巢狀 actions，含數量不等的
+前置 JSON 片段）；指定 --url 時改讀資料庫中 ai_logs.raw_response 的實際紀錄。
+
+    python scripts/bench/bench_json_extract.py
+    python scripts/bench/bench_json_extract.py --url postgresql+asyncpg://... --limit 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+import _common  # noqa: F401  （設定 sys.path）
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.system import AiLog
+from app.services.ai_service import AiService
+
+
+def legacy_extract(text: str) -> Optional[str]:
+    """舊版 _extract_last_json_object：從每個 `{` 各自做括號平衡掃描"""
+    brace_positions = [i for i, c in enumerate(text) if c == '{']
+    valid_jsons = []
+
+    for start in brace_positions:
+        depth = 0
+        in_string = False
+        escape_next = False
+
+        for i in range(start, len(text)):
+            char = text[i]
+
+            if escape_next:
+                escape_next = False
+                continue
+
+            if char == '\\' and in_string:
+                escape_next = True
+                continue
+
+            if char == '"' and not escape_next:
+                in_string = not in_string
+                continue
+
+            if in_string:
+                continue
+
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    candidate = text[start:i+1]
+                    try:
+                        parsed = json.loads(candidate)
+                        if isinstance(parsed, dict) and "message" in parsed:
+                            valid_jsons.append(candidate)
+                    except json.JSONDecodeError:
+                        pass
+                    break
+
+    return valid_jsons[-1] if valid_jsons else None
+
+
+def synthetic_samples() -> List[str]:
+    """模擬 CLI 輸出：前面有說明與工具呼叫片段，最後是回覆 JSON"""
+    samples = []
+    for fragments in (0, 10, 50, 150, 300):
+        for items in (1, 5, 20):
+            reply = {
+                "message": f"好的，幫你點了 {items} 項 {{已確認}}",
+                "actions": [
+                    {
+                        "type": "create_order",
+                        "data": {"items": [
+                            {"name": f"雞腿便當 {i}", "quantity": 1, "note": "飯少 \"不要辣\""}
+                            for i in range(items)
+                        ]},
+                    }
+                ],
+            }
+            prefix = "".join(
+                f'思考中 {{"tool": "lookup", "input": {{"query": "品項 {i}", "limit": 5}}}}\n'
+                for i in range(fragments)
+            )
+            samples.append(f"{prefix}回覆如下：\n{json.dumps(reply, ensure_ascii=False)}\n")
+    return samples
+
+
+async def load_samples(url: str, limit: int) -> List[str]:
+    engine = create_async_engine(url)
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(AiLog.raw_response).order_by(AiLog.created_at.desc()).limit(limit)
+        )
+        samples = [row[0] for row in result if row[0]]
+    await engine.dispose()
+    return samples
+
+
+def cpu_ms(func, samples: List[str], repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        for sample in samples:
+            func(sample)
+    return (time.process_time() - start) * 1000 / repeat
+
+
+def main(args: argparse.Namespace) -> None:
+    samples = asyncio.run(load_samples(args.url, args.limit)) if args.url else synthetic_samples()
+    service = AiService()
+
+    mismatches = sum(
+        1 for sample in samples
+        if legacy_extract(sample) != service._extract_last_json_object(sample)
+    )
+    total_kb = sum(len(s) for s in samples) / 1024
+    print(f"{len(samples)} samples, {total_kb:.0f} KB, mismatches: {mismatches}")
+
+    before = cpu_ms(legacy_extract, samples, args.repeat)
+    after = cpu_ms(service._extract_last_json_object, samples, args.repeat)
+    print(f"before {before:9.1f} ms CPU per pass")
+    print(f"after  {after:9.1f} ms CPU per pass ({before / after:.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="讀取 ai_logs 的資料庫連線字串（唯讀）")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,112 @@
+"""LINE API 呼叫是否阻塞 event loop
+
+在背景執行緒啟動一個假的 LINE API（每次 reply 延遲 --delay 秒），
+同時處理 --webhooks 個 webhook，每個都回覆一則訊息，比較：
+- before：在 async 函數中直接呼叫同步 MessagingApi（舊版 LineService 的做法）
+- after：LineService.reply_message（共用 AsyncMessagingApi 連線池）
+
+輸出總耗時與 event loop 最大延遲（其他請求被卡住的時間）。
+
+    python scripts/bench/bench_line_client.py --webhooks 20 --delay 0.2
+"""
+import argparse
+import asyncio
+import threading
+
+import _common  # noqa: F401  （設定 sys.path）
+from _common import timer
+from aiohttp import web
+from linebot.v3.messaging import (
+    ApiClient,
+    AsyncApiClient,
+    AsyncMessagingApi,
+    Configuration,
+    MessagingApi,
+    ReplyMessageRequest,
+    TextMessage,
+)
+
+from app.config import settings
+from app.services.line_service import LineService
+
+
+def start_fake_line_api(delay: float) -> str:
+    """在獨立執行緒的 event loop 啟動假的 LINE API，回傳 host"""
+    started = threading.Event()
+    state = {}
+
+    async def reply(request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(delay)
+        return web.json_response({"sentMessages": [{"id": "1", "quoteToken": "q"}]})
+
+    async def serve() -> None:
+        app = web.Application()
+        app.router.add_post("/v2/bot/message/reply", reply)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        started.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    started.wait()
+    return f"http://127.0.0.1:{state['port']}"
+
+
+async def measure(name: str, webhooks: int, handle) -> None:
+    """同時處理 webhooks 個請求，並以 10ms ticker 量測 event loop 延遲"""
+    loop = asyncio.get_running_loop()
+    max_lag = 0.0
+    running = True
+
+    async def ticker() -> None:
+        nonlocal max_lag
+        while running:
+            expected = loop.time() + 0.01
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, loop.time() - expected)
+
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.05)
+    with timer() as elapsed:
+        await asyncio.gather(*(handle(i) for i in range(webhooks)))
+    running = False
+    await tick_task
+    print(f"{name:<7} total {elapsed['ms']:8.1f} ms   max loop lag {max_lag * 1000:8.1f} ms")
+
+
+async def main(args: argparse.Namespace) -> None:
+    host = start_fake_line_api(args.delay)
+    configuration = Configuration(host=host, access_token="bench")
+    configuration.connection_pool_maxsize = settings.line_api_pool_size
+
+    sync_api = MessagingApi(ApiClient(configuration))
+
+    async def handle_before(i: int) -> None:
+        sync_api.reply_message(
+            ReplyMessageRequest(reply_token=f"token-{i}", messages=[TextMessage(text="ok")])
+        )
+
+    api_client = AsyncApiClient(configuration)
+    line_service = LineService(None, messaging_api=AsyncMessagingApi(api_client))
+
+    async def handle_after(i: int) -> None:
+        await line_service.reply_message(f"token-{i}", "ok")
+
+    print(
+        f"{args.webhooks} concurrent webhooks, LINE reply latency {args.delay * 1000:.0f} ms, "
+        f"pool size {settings.line_api_pool_size}"
+    )
+    await measure("before", args.webhooks, handle_before)
+    await measure("after", args.webhooks, handle_after)
+    await api_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--webhooks", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
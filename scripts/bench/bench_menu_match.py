@@ -0,0 +1,108 @@
+"""菜單模糊比對：大型合成菜單的單品項查詢延遲
+
+產生約 --items 個品項的合成菜單（食材 × 料理 × 口味組合，飲料帶 M / L 變體），
+以完全相同、縮寫、尺寸說法、少字 / 多字等查詢量測：
+- 建立 MenuIndex 的時間
+- match_item 每個品項的延遲（平均 / p95）
+- match_order 整筆訂單（--order-size 個品項）平均每個品項的延遲
+
+    python scripts/bench/bench_menu_match.py --items 10000
+"""
+import argparse
+import random
+import time
+from statistics import mean, quantiles
+from typing import List, Tuple
+
+import _common  # noqa: F401  （設定 sys.path）
+from _common import timer
+
+from app.services.menu_index import IndexedItem, MenuIndex, match_item, match_order, normalize_name
+
+_INGREDIENTS = "雞腿 排骨 雞排 鯖魚 豬排 牛肉 羊肉 鮭魚 蝦仁 花枝 豆腐 香菇 鴨肉 燒肉 叉燒 控肉 鹹豬肉 蔥爆牛 宮保雞 麻婆".split()
+_DISHES = "便當 飯 麵 炒飯 炒麵 燴飯 拉麵 烏龍麵 河粉 米粉 粥 丼 堡 捲 餃 湯麵 乾麵 蓋飯 定食 套餐".split()
+_FLAVORS = "招牌 香辣 蒜香 椒鹽 紅燒 三杯 照燒 咖哩 黑胡椒 檸檬 泰式 韓式 日式 麻辣 沙茶 蔥油 醬燒 鹽烤 糖醋 酸菜 茄汁 塔香 打拋 避風塘 奶油".split()
+_DRINK_BASES = "紅茶 綠茶 烏龍 青茶 奶茶 鮮奶茶 冬瓜茶 檸檬茶 多多綠 抹茶拿鐵".split()
+_DRINK_TOPPINGS = "珍珠 椰果 布丁 仙草 芋圓 粉粿 蘆薈 奶蓋 波霸 寒天".split()
+
+
+def build_menu(size: int) -> List[IndexedItem]:
+    items = []
+    for flavor in _FLAVORS:
+        for ingredient in _INGREDIENTS:
+            for dish in _DISHES:
+                items.append((f"{flavor}{ingredient}{dish}", dish, 80 + len(items) % 90, ()))
+    for topping in _DRINK_TOPPINGS:
+        for base in _DRINK_BASES:
+            variants = ({"name": "M", "price": 45}, {"name": "L", "price": 55})
+            items.append((f"{topping}{base}", "飲料", 45, variants))
+    rng = random.Random(7)
+    rng.shuffle(items)
+    items = items[:size]
+    return [
+        IndexedItem(
+            name=name, normalized=normalize_name(name), category=category,
+            price=float(price), variants=variants, description=None,
+        )
+        for name, category, price, variants in items
+    ]
+
+
+def build_queries(items: List[IndexedItem], count: int) -> List[Tuple[str, str]]:
+    """各種說法的查詢：(品項名稱, 類別)"""
+    rng = random.Random(11)
+    queries = []
+    for _ in range(count):
+        item = rng.choice(items)
+        name = item.name
+        kind = rng.randrange(5)
+        if kind == 1 and len(name) > 3:
+            name = name[0] + name[2] + name[-1]           # 縮寫
+        elif kind == 2 and item.variants:
+            name = rng.choice(["大杯", ""]) + name + rng.choice(["大", "L", ""])  # 尺寸
+        elif kind == 3 and len(name) > 3:
+            cut = rng.randrange(len(name))
+            name = name[:cut] + name[cut + 1:]            # 少一個字
+        elif kind == 4:
+            name = name + "加蛋"                           # 多出加點
+        queries.append((name, item.category if rng.random() < 0.5 else None))
+    return queries
+
+
+def per_item_us(samples: List[float]) -> str:
+    p95 = quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+    return f"mean {mean(samples):8.1f} µs   p95 {p95:8.1f} µs"
+
+
+def main(args: argparse.Namespace) -> None:
+    items = build_menu(args.items)
+    with timer() as build:
+        index = MenuIndex("store-1", None, items, [])
+    print(f"{len(items)} items, index built in {build['ms']:.0f} ms")
+
+    queries = build_queries(items, args.queries)
+    timings = []
+    for name, category in queries:
+        start = time.perf_counter()
+        match_item([index], name, category)
+        timings.append((time.perf_counter() - start) * 1e6)
+    print(f"match_item  ({len(queries)} queries)        {per_item_us(timings)}")
+
+    orders = [
+        queries[i:i + args.order_size]
+        for i in range(0, len(queries) - args.order_size + 1, args.order_size)
+    ]
+    timings = []
+    for order in orders:
+        start = time.perf_counter()
+        match_order([index], order)
+        timings.append((time.perf_counter() - start) * 1e6 / len(order))
+    print(f"match_order ({len(orders)} orders x {args.order_size} items)  {per_item_us(timings)} per item")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--order-size", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,132 @@
+"""菜單儲存：逐筆 create vs 批次 INSERT ... RETURNING
+
+以 --categories 個分類、共 --items 個品項的菜單，對已有同樣大小菜單的店家
+重新儲存（AI 辨識後覆蓋菜單的情境），比較 SQL 語句數與耗時：
+- before：舊版 MenuService.save_menu（逐一刪除分類，每個分類 / 品項各自 flush + refresh）
+- after：目前的 MenuService.save_menu
+
+    python scripts/bench/bench_menu_save.py --items 200
+    python scripts/bench/bench_menu_save.py --url postgresql+asyncpg://.../jaba_bench
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from statistics import median
+from typing import List
+from uuid import UUID
+
+import _common
+from _common import StatementCounter, create_bench_engine, timer
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models import Menu, MenuCategory, MenuItem, Store
+from app.services.cache_service import CacheService
+from app.services.menu_service import MenuService
+
+
+async def save_menu_before(service: MenuService, store_id: UUID, categories_data: List[dict]) -> Menu:
+    """舊版 save_menu"""
+    menu = await service.menu_repo.get_or_create(store_id)
+    menu.updated_at = datetime.now(timezone.utc)
+
+    for category in menu.categories:
+        await service.category_repo.delete(category)
+
+    for sort_order, cat_data in enumerate(categories_data):
+        category = await service.category_repo.create(MenuCategory(
+            menu_id=menu.id,
+            name=cat_data["name"],
+            sort_order=sort_order,
+        ))
+        for item_order, item_data in enumerate(cat_data.get("items", [])):
+            await service.item_repo.create(MenuItem(
+                category_id=category.id,
+                name=item_data["name"],
+                price=item_data["price"],
+                description=item_data.get("description"),
+                variants=item_data.get("variants", []),
+                promo=item_data.get("promo"),
+                sort_order=item_order,
+            ))
+
+    CacheService.clear_menu(str(store_id))
+    await service.session.refresh(menu, ["categories"])
+    return menu
+
+
+async def save_menu_after(service: MenuService, store_id: UUID, categories_data: List[dict]) -> Menu:
+    return await service.save_menu(store_id, categories_data)
+
+
+def build_menu(categories: int, items: int) -> List[dict]:
+    per_category = max(1, items // categories)
+    return [
+        {
+            "name": f"分類 {c}",
+            "items": [
+                {
+                    "name": f"品項 {c}-{i}",
+                    "price": 50 + i,
+                    "description": "招牌",
+                    "variants": [{"name": "大", "price": 60 + i}] if i % 3 == 0 else [],
+                }
+                for i in range(per_category)
+            ],
+        }
+        for c in range(categories)
+    ]
+
+
+async def measure(session_factory, counter, save, categories_data, rounds: int):
+    """回傳 (語句數, 耗時中位數 ms, 儲存後的 (分類, 品項, 排序))"""
+    async with session_factory() as db:
+        store = Store(name="便當店")
+        db.add(store)
+        await db.commit()
+        store_id = store.id
+        # 先存一份同樣大小的菜單，量測的是覆蓋既有菜單
+        await MenuService(db).save_menu(store_id, categories_data)
+        await db.commit()
+
+    counts, times = [], []
+    for _ in range(rounds):
+        async with session_factory() as db:
+            counter.reset()
+            with timer() as elapsed:
+                menu = await save(MenuService(db), store_id, categories_data)
+                await db.commit()
+            counts.append(counter.count)
+            times.append(elapsed["ms"])
+
+    async with session_factory() as db:
+        menu = await MenuService(db).menu_repo.get_by_store_id(store_id)
+        saved = sorted(
+            (c.sort_order, c.name, i.sort_order, i.name, float(i.price))
+            for c in menu.categories for i in c.items
+        )
+    return counts[-1], median(times), saved
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = await create_bench_engine(args.url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    counter = StatementCounter(engine)
+    categories_data = build_menu(args.categories, args.items)
+    total_items = sum(len(c["items"]) for c in categories_data)
+
+    print(f"{engine.dialect.name}: re-saving a menu of {args.categories} categories, {total_items} items")
+    results = {}
+    for name, save in (("before", save_menu_before), ("after", save_menu_after)):
+        count, ms, saved = await measure(session_factory, counter, save, categories_data, args.rounds)
+        results[name] = saved
+        print(f"{name:<7} {count:5d} statements  {ms:8.1f} ms")
+    print(f"same menu saved: {results['before'] == results['after']}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = _common.db_arg_parser(__doc__.splitlines()[0])
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,143 @@
+"""Claude CLI 常駐 worker pool 測試（以假的 claude 執行檔代替 CLI）"""
+import stat
+import sys
+import textwrap
+
+import pytest
+
+from app.services.ai_worker_pool import ClaudeWorkerError, ClaudeWorkerPool
+
+# 假的 claude：讀 stream-json user 訊息，回覆 "<pid>:<第幾則>:<內容>"
+# 內容為 crash 時不回覆直接異常結束，為 exit 時回覆後結束
+_STUB = textwrap.dedent(
+    """
+    import json, os, sys
+
+    count = 0
+    for line in sys.stdin:
+        content = json.loads(line)["message"]["content"]
+        if content == "crash":
+            sys.stderr.write("boom\\n")
+            sys.exit(1)
+        count += 1
+        text = f"{os.getpid()}:{count}:{content}"
+        delta = {"type": "text_delta", "text": text}
+        print(json.dumps({"type": "stream_event", "event": {"delta": delta}}), flush=True)
+        print(json.dumps({"type": "stream_event", "event": {"type": "message_stop"}}), flush=True)
+        print(json.dumps({"type": "result", "result": text}), flush=True)
+        if content == "exit":
+            break
+    """
+)
+
+
+@pytest.fixture
+def claude_stub(tmp_path):
+    path = tmp_path / "claude"
+    path.write_text(f"#!{sys.executable}\n{_STUB}")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@pytest.fixture
+async def make_pool(claude_stub, tmp_path):
+    pools = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("size", 2)
+        kwargs.setdefault("warm_per_key", 0)
+        pool = ClaudeWorkerPool(claude_stub, str(tmp_path), **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield factory
+    for pool in pools:
+        await pool.close()
+
+
+async def _ask(pool, message, model="m", system_prompt="sys"):
+    result = await pool.run(model, system_prompt, message, timeout=10)
+    pid, count, _ = result["result"].split(":", 2)
+    return int(pid), int(count)
+
+
+async def test_worker_reused_between_requests(make_pool):
+    pool = make_pool(max_requests=3)
+    chunks = []
+
+    result = await pool.run(
+        "m", "sys", "hi", timeout=10, on_text=chunks.append, on_text_end=lambda: chunks.append(None)
+    )
+    pid, count = await _ask(pool, "again")
+
+    assert chunks == [result["result"], None]
+    assert int(result["result"].split(":")[0]) == pid
+    assert count == 2
+    assert pool.stats()["spawned"] == 1
+    assert pool.stats()["warm_hits"] == 1
+
+
+async def test_worker_recycled_after_max_requests(make_pool):
+    pool = make_pool(max_requests=2)
+
+    first = await _ask(pool, "1")
+    second = await _ask(pool, "2")
+    third = await _ask(pool, "3")
+
+    assert first[0] == second[0]
+    assert third[0] != first[0]
+    assert third[1] == 1
+    assert pool.stats()["recycled"] == 1
+    assert pool.stats()["spawned"] == 2
+
+
+async def test_crashed_worker_replaced(make_pool):
+    pool = make_pool(max_requests=5)
+    pid, _ = await _ask(pool, "hi")
+
+    with pytest.raises(ClaudeWorkerError, match="boom"):
+        await pool.run("m", "sys", "crash", timeout=10)
+    new_pid, count = await _ask(pool, "hi")
+
+    assert new_pid != pid
+    assert count == 1
+
+
+async def test_dead_idle_worker_skipped(make_pool):
+    pool = make_pool(max_requests=5)
+    pid, _ = await _ask(pool, "exit")
+    worker = pool._idle[pool._key("m", "sys")][0]
+    await worker.proc.wait()
+
+    new_pid, _ = await _ask(pool, "hi")
+
+    assert new_pid != pid
+    assert pool.stats()["unhealthy"] == 1
+
+
+async def test_idle_worker_of_other_key_evicted_at_capacity(make_pool):
+    pool = make_pool(size=1, max_requests=5)
+    await _ask(pool, "hi", system_prompt="a")
+    worker_a = pool._idle[pool._key("m", "a")][0]
+
+    await _ask(pool, "hi", system_prompt="b")
+
+    assert worker_a.proc.returncode is not None
+    assert pool.stats()["evicted"] == 1
+    assert sum(len(queue) for queue in pool._idle.values()) == 1
+
+
+async def test_warm_workers_stay_within_size(make_pool):
+    pool = make_pool(size=2, max_requests=5, warm_per_key=2)
+
+    for prompt in ("a", "b", "c"):
+        await _ask(pool, "hi", system_prompt=prompt)
+        for task in list(pool._background):
+            await task
+        alive = [
+            worker
+            for queue in pool._idle.values()
+            for worker in queue
+            if worker.is_alive()
+        ]
+        assert len(alive) <= pool.size
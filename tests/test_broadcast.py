@@ -0,0 +1,93 @@
+"""廣播事件合併 / 節流測試"""
+import asyncio
+
+import pytest
+
+from app import broadcast
+from app.config import settings
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    events = []
+
+    async def record(room, data):
+        events.append((room, data))
+
+    monkeypatch.setattr(
+        broadcast,
+        "_event_broadcasters",
+        {name: record for name in ("order_update", "payment_update", "chat_message", "store_change")},
+    )
+    monkeypatch.setattr(broadcast, "_last_sent", {})
+    monkeypatch.setattr(broadcast, "_trailing", {})
+    broadcast.clear_events()
+    return events
+
+
+@pytest.fixture
+def no_debounce(monkeypatch):
+    monkeypatch.setattr(settings, "broadcast_debounce_ms", 0)
+
+
+async def test_same_action_and_user_coalesced(sent, no_debounce):
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u1", "seq": 1})
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u1", "seq": 2})
+
+    await broadcast.flush_events()
+
+    assert [data["seq"] for _, data in sent] == [2]
+
+
+async def test_different_action_or_user_not_coalesced(sent, no_debounce):
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u1"})
+    await broadcast.emit_order_update("g1", {"action": "cancelled", "user_id": "u1"})
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u2"})
+    await broadcast.emit_payment_update("g1", {"payment_status": "paid", "user_id": "u1"})
+    await broadcast.emit_payment_update("g1", {"payment_status": "refunded", "user_id": "u1"})
+
+    await broadcast.flush_events()
+
+    assert len(sent) == 5
+
+
+async def test_store_change_never_coalesced(sent, no_debounce):
+    await broadcast.emit_store_change("g1", {"action": "add", "store_name": "A"})
+    await broadcast.emit_store_change("g1", {"action": "add", "store_name": "B"})
+
+    await broadcast.flush_events()
+
+    assert [data["store_name"] for _, data in sent] == ["A", "B"]
+
+
+async def test_debounce_keeps_distinct_users(sent, monkeypatch):
+    monkeypatch.setattr(settings, "broadcast_debounce_ms", 50)
+
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u1", "seq": 1})
+    await broadcast.flush_events()
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u2", "seq": 2})
+    await broadcast.flush_events()
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u1", "seq": 3})
+    await broadcast.flush_events()
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u1", "seq": 4})
+    await broadcast.flush_events()
+
+    assert [data["seq"] for _, data in sent] == [1, 2]
+    await asyncio.gather(*broadcast._trailing_tasks)
+    assert [data["seq"] for _, data in sent] == [1, 2, 4]
+
+
+async def test_delta_events_bypass_debounce(sent, monkeypatch):
+    monkeypatch.setattr(settings, "broadcast_debounce_ms", 50)
+
+    for seq in (1, 2):
+        await broadcast.emit_order_update(
+            "g1", {"action": "created", "user_id": "u1", "seq": seq, "delta": {"order_id": f"o{seq}"}}
+        )
+        await broadcast.flush_events()
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u1", "seq": 3, "delta": {}})
+    await broadcast.emit_order_update("g1", {"action": "created", "user_id": "u1", "seq": 4, "delta": {}})
+    await broadcast.flush_events()
+
+    assert [data["seq"] for _, data in sent] == [1, 2, 3, 4]
+    assert broadcast._trailing == {}
@@ -0,0 +1,55 @@
+"""快取失效廣播時機測試"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.services import cache_service
+from app.services.cache_service import CacheService
+
+
+@pytest.fixture
+def published(monkeypatch):
+    messages = []
+    monkeypatch.setattr(
+        cache_service.cache_bus, "publish", lambda namespace, key: messages.append((namespace, key))
+    )
+    return messages
+
+
+@pytest.fixture
+def session():
+    with Session(create_engine("sqlite://")) as session:
+        session.connection()  # 開始交易
+        yield session
+
+
+def test_clear_without_session_publishes_immediately(published):
+    CacheService.set_menu("store-1", {"name": "menu"})
+
+    CacheService.clear_menu("store-1")
+
+    assert CacheService.get_menu("store-1") is None
+    assert published == [("menu", "store-1")]
+
+
+def test_clear_in_transaction_publishes_after_commit(published, session):
+    CacheService.set_menu("store-1", {"name": "menu"})
+
+    CacheService.clear_menu("store-1", session)
+    assert CacheService.get_menu("store-1") is None
+    assert published == []
+
+    # 交易期間被其他請求以舊資料填回，commit 後再清一次
+    CacheService.set_menu("store-1", {"name": "stale"})
+    session.commit()
+
+    assert CacheService.get_menu("store-1") is None
+    assert published == [("menu", "store-1")]
+
+
+def test_clear_in_transaction_not_published_on_rollback(published, session):
+    CacheService.clear_prompt("system", session)
+    session.rollback()
+    session.commit()
+
+    assert published == []
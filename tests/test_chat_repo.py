@@ -0,0 +1,97 @@
+"""對話記錄查詢的台北日期範圍測試"""
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.chat import ChatMessage
+from app.repositories import chat_repo
+from app.repositories.chat_repo import ChatRepository, get_day_range_tw
+
+TODAY = date(2026, 10, 17)
+
+
+class _RecordingSession:
+    """記錄 repository 送出的查詢，回傳空結果"""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def _in_range(moment, day_range):
+    start, end = day_range
+    return start <= moment < end
+
+
+def test_day_range_starts_at_taipei_midnight():
+    start, end = get_day_range_tw(TODAY)
+
+    assert start == _utc(2026, 10, 16, 16, 0)
+    assert end - start == timedelta(days=1)
+
+
+@pytest.mark.parametrize(
+    "moment, expected",
+    [
+        (_utc(2026, 10, 16, 15, 59, 59), False),  # 台北 10/16 23:59:59
+        (_utc(2026, 10, 16, 16, 0, 0), True),     # 台北 10/17 00:00:00
+        (_utc(2026, 10, 17, 0, 30, 0), True),     # UTC 已是 10/17，台北 08:30
+        (_utc(2026, 10, 17, 15, 59, 59), True),   # 台北 10/17 23:59:59
+        (_utc(2026, 10, 17, 16, 0, 0), False),    # 台北 10/18 00:00:00
+    ],
+)
+def test_day_range_bounds_around_midnight(moment, expected):
+    assert _in_range(moment, get_day_range_tw(TODAY)) is expected
+
+
+def _compile(statement):
+    compiled = statement.compile(dialect=postgresql.dialect())
+    return str(compiled), compiled.params
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    monkeypatch.setattr(chat_repo, "get_today_tw", lambda: TODAY)
+    return ChatRepository(_RecordingSession())
+
+
+@pytest.mark.parametrize(
+    "call, filter_sql",
+    [
+        (lambda repo: repo.get_group_messages(uuid4()), "chat_messages.group_id = "),
+        (lambda repo: repo.get_today_messages(uuid4()), "chat_messages.group_id = "),
+        (lambda repo: repo.get_user_messages(uuid4()), "chat_messages.group_id IS NULL"),
+    ],
+)
+async def test_today_queries_use_created_at_range(repo, call, filter_sql):
+    await call(repo)
+
+    sql, params = _compile(repo.session.statements[0])
+    assert filter_sql in sql
+    assert "chat_messages.created_at >= %(created_at_1)s" in sql
+    assert "chat_messages.created_at < %(created_at_2)s" in sql
+    assert "date(" not in sql.lower()
+    assert (params["created_at_1"], params["created_at_2"]) == get_day_range_tw(TODAY)
+
+
+def test_group_created_index_matches_range_predicate():
+    index = next(
+        i for i in ChatMessage.__table__.indexes if i.name == "idx_chat_messages_group_created"
+    )
+
+    assert [c.name for c in index.columns] == ["group_id", "created_at"]
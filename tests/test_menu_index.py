@@ -0,0 +1,134 @@
+"""菜單索引模糊比對測試"""
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.models.menu import Menu, MenuCategory, MenuItem
+from app.services.menu_index import (
+    MIN_CONFIDENCE,
+    IndexedItem,
+    MenuIndex,
+    describe_no_match,
+    find_by_code,
+    match_item,
+    match_order,
+    normalize_name,
+    pick_candidate,
+    to_order_item,
+)
+
+
+def _item(name, category, price, variants=()):
+    return IndexedItem(
+        name=name,
+        normalized=normalize_name(name),
+        category=category,
+        price=price,
+        variants=tuple(variants),
+        description=None,
+    )
+
+
+def _index(*items):
+    return MenuIndex("store-1", None, list(items), [])
+
+
+def test_exact_match_prefers_requested_category():
+    index = _index(_item("雞腿", "便當", 100), _item("雞腿", "單點", 60))
+
+    matched = pick_candidate(match_item([index], "雞腿", "單點"))
+    assert matched.item.category == "單點"
+    assert matched.price == 60
+
+    matched = pick_candidate(match_item([index], "雞腿", "便當"))
+    assert matched.item.category == "便當"
+    assert matched.price == 100
+
+
+def test_query_with_extra_text_is_not_accepted():
+    index = _index(_item("雞腿便當", "便當", 100), _item("排骨便當", "便當", 95))
+
+    candidates = match_item([index], "雞腿便當加蛋")
+    assert candidates[0].item.name == "雞腿便當"
+    assert candidates[0].score < MIN_CONFIDENCE
+    assert pick_candidate(candidates) is None
+    assert "雞腿便當" in describe_no_match("雞腿便當加蛋", candidates)
+
+
+def test_contained_query_still_matches():
+    index = _index(_item("雞腿便當", "便當", 100), _item("紅茶", "飲料", 30))
+
+    matched = pick_candidate(match_item([index], "雞腿"))
+    assert matched.item.name == "雞腿便當"
+
+
+def test_size_alias_prefix_and_suffix():
+    index = _index(_item("紅茶", "飲料", 30, [{"name": "L", "price": 40}]))
+
+    for query in ("大杯紅茶", "紅茶大", "紅茶大杯", "紅茶 L"):
+        matched = pick_candidate(match_item([index], query))
+        assert matched is not None, query
+        assert matched.variant == "L", query
+        assert matched.price == 40, query
+
+
+def test_size_suffix_without_variant_is_not_accepted():
+    index = _index(_item("綠茶", "飲料", 25))
+
+    assert pick_candidate(match_item([index], "綠茶大")) is None
+
+
+def test_to_order_item_uses_menu_name_and_variant_note():
+    index = _index(_item("紅茶", "飲料", 30, [{"name": "L", "price": 40}]))
+    matched = pick_candidate(match_item([index], "大杯紅茶"))
+
+    order_item = to_order_item(matched, None, 2, "少冰")
+    assert order_item.name == "紅茶"
+    assert order_item.note == "L 少冰"
+    assert order_item.unit_price == Decimal("40.0")
+    assert order_item.subtotal == Decimal("80.0")
+
+
+def test_match_order_matches_each_query_like_match_item():
+    indexes = [
+        _index(_item("雞腿便當", "便當", 100), _item("排骨便當", "便當", 95)),
+        MenuIndex("store-2", None, [
+            _item("紅茶", "飲料", 30, [{"name": "L", "price": 40}]),
+            _item("珍珠奶茶", "飲料", 55),
+        ], []),
+    ]
+    queries = [("雞腿便當", None), ("珍奶", None), ("紅茶大", "飲料"), ("雞腿便當", None), ("", None)]
+
+    results = match_order(indexes, queries)
+
+    assert results == [match_item(indexes, name, category) for name, category in queries]
+    assert results[2][0].variant == "L"
+
+
+def test_match_limit_keeps_top_candidates_in_menu_order():
+    flavors = ["招牌", "香辣", "蒜香", "椒鹽", "紅燒", "三杯"]
+    index = _index(*(
+        _item(f"{flavor}{meat}便當", "便當", 100) for flavor in flavors for meat in ("雞腿", "排骨", "豬排")
+    ), _item("雞腿飯", "飯", 90))
+
+    for query, category in [("雞腿便當", None), ("香辣雞腿", "便當"), ("雞腿便當加蛋", None), ("三杯排骨飯", "飯")]:
+        everything = index.match(query, category)
+        assert index.match(query, category, limit=3) == everything[:3]
+        assert [c.score for c in everything] == sorted((c.score for c in everything), reverse=True)
+
+
+def test_context_keeps_item_code_and_skips_unavailable_items():
+    chicken, sold_out = uuid.uuid4(), uuid.uuid4()
+    menu = Menu(store_id=uuid.uuid4(), updated_at=datetime.now(timezone.utc), categories=[
+        MenuCategory(name="便當", sort_order=0, items=[
+            MenuItem(id=chicken, name="雞腿便當", price=Decimal("100"), sort_order=0, is_available=True),
+            MenuItem(id=sold_out, name="排骨便當", price=Decimal("95"), sort_order=1, is_available=False),
+        ]),
+    ])
+
+    index = MenuIndex.from_menu(menu)
+
+    assert index.categories == [{"name": "便當", "items": [{"id": str(chicken)[:8], "name": "雞腿便當", "price": 100}]}]
+    assert find_by_code([index], str(chicken)[:8]).item.name == "雞腿便當"
+    assert find_by_code([index], "missing") is None
+    assert pick_candidate(match_item([index], "排骨便當")).item.name == "排骨便當"
@@ -0,0 +1,71 @@
+"""串流回覆 JSON 偵測測試"""
+import json
+
+from app.services.ai_service import _ReplyDetector
+
+REPLY = {
+    "message": "好的 {已記錄} \"雞腿\" \\ 便當",
+    "actions": [{"type": "create_order", "data": {"items": [{"name": "雞腿便當"}]}}],
+}
+
+
+def _feed_all(detector, text, size):
+    for i in range(0, len(text), size):
+        detector.feed(text[i:i + size])
+
+
+async def test_reply_found_when_stream_finishes():
+    detector = _ReplyDetector()
+    body = json.dumps(REPLY, ensure_ascii=False)
+
+    _feed_all(detector, "說明文字 \"引號\" {不完整\n" + body[:-1], 1)
+    detector.feed(body[-1] + "\n後續")
+    assert not detector.found.done()
+
+    detector.finish()
+    assert detector.found.result() == REPLY
+    assert detector.text.endswith("後續")
+
+
+async def test_reply_found_regardless_of_chunk_boundaries():
+    body = json.dumps(REPLY, ensure_ascii=False)
+    for size in (1, 2, 3, 7, len(body)):
+        detector = _ReplyDetector()
+        _feed_all(detector, body, size)
+        detector.finish()
+        assert detector.found.result() == REPLY
+        assert detector.text == body
+
+
+async def test_example_object_before_reply_not_accepted():
+    detector = _ReplyDetector()
+    example = '格式範例：{"message": "你的回應訊息", "actions": []}\n'
+
+    _feed_all(detector, example + json.dumps(REPLY, ensure_ascii=False), 5)
+    detector.finish()
+
+    assert detector.found.result() == REPLY
+
+
+async def test_object_without_reply_keys_ignored():
+    detector = _ReplyDetector()
+
+    detector.feed('{"message": "只有訊息"} {"actions": []}')
+    detector.finish()
+
+    assert not detector.found.done()
+
+
+async def test_only_open_object_text_kept_for_parsing():
+    detector = _ReplyDetector()
+    detector.feed("說明" * 500)
+    assert detector._open_parts == []
+
+    detector.feed('前言 {"message": "x", ')
+    detector.feed('"actions": []')
+    assert "".join(detector._open_parts) == '{"message": "x", "actions": []'
+
+    detector.feed("}")
+    assert detector._starts == []
+    assert detector._open_parts == []
+    assert detector._reply == {"message": "x", "actions": []}
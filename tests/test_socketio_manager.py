@@ -0,0 +1,147 @@
+"""PostgreSQL Socket.IO manager 多 worker 測試（以記憶體中的假 LISTEN/NOTIFY 代替資料庫）"""
+import asyncio
+
+import pytest
+import socketio
+
+from app.services import socketio_manager
+from app.services.socketio_manager import AsyncPostgresManager
+
+
+class _FakeHub:
+    """模擬 PostgreSQL 的 NOTIFY：送給所有 LISTEN 該 channel 的連線（包含自己）"""
+
+    def __init__(self):
+        self.listeners = []
+        self.payloads = []
+
+    def notify(self, sender, channel, payload):
+        self.payloads.append(payload)
+        loop = asyncio.get_running_loop()
+        for conn, listen_channel, callback in list(self.listeners):
+            if listen_channel == channel and not conn.is_closed():
+                loop.call_soon(callback, conn, 1234, channel, payload)
+
+
+class _FakeConnection:
+    """asyncpg.Connection 中 manager 用到的介面"""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self._closed = False
+        self._termination_listeners = []
+
+    async def execute(self, query, channel, payload):
+        assert query == "SELECT pg_notify($1, $2)"
+        self.hub.notify(self, channel, payload)
+
+    async def add_listener(self, channel, callback):
+        self.hub.listeners.append((self, channel, callback))
+
+    def add_termination_listener(self, callback):
+        self._termination_listeners.append(callback)
+
+    def is_closed(self):
+        return self._closed
+
+    async def close(self):
+        self._closed = True
+
+    def terminate(self):
+        self._closed = True
+        for callback in self._termination_listeners:
+            callback(self)
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met before timeout")
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def hub():
+    return _FakeHub()
+
+
+@pytest.fixture
+async def workers(hub, monkeypatch):
+    """兩個 worker 行程的 manager，記錄各自實際送給本機看板的 emit"""
+    monkeypatch.setattr(socketio_manager, "_RECONNECT_DELAY", 0)
+    managers = []
+    for _ in range(2):
+        manager = AsyncPostgresManager(channel="test_channel")
+        connections = []
+
+        async def connect(connections=connections):
+            conn = _FakeConnection(hub)
+            connections.append(conn)
+            return conn
+
+        manager._connect = connect
+        manager.connections = connections
+        manager.delivered = []
+
+        async def handle_emit(message, delivered=manager.delivered):
+            delivered.append(message)
+
+        manager._handle_emit = handle_emit
+        socketio.AsyncServer(client_manager=manager, async_mode="asgi")
+        manager.initialize()
+        managers.append(manager)
+
+    await _wait_for(lambda: len(hub.listeners) == 2)
+    yield managers
+    for manager in managers:
+        manager.thread.cancel()
+    await asyncio.gather(*(m.thread for m in managers), return_exceptions=True)
+
+
+async def test_emit_relayed_to_other_worker(workers):
+    sender, receiver = workers
+
+    await sender.emit("order_update", {"action": "created"}, room="g1")
+    await _wait_for(lambda: receiver.delivered)
+
+    message = receiver.delivered[0]
+    assert message["event"] == "order_update"
+    assert message["room"] == "g1"
+    assert message["data"] == [{"action": "created"}]
+
+
+async def test_chunked_payload_reassembled(workers, hub):
+    sender, receiver = workers
+    orders = [{"name": f"雞腿便當 {i}", "note": "不要辣" * 20} for i in range(200)]
+
+    await sender.emit("order_update", {"orders": orders}, room="g1")
+    await _wait_for(lambda: receiver.delivered)
+
+    assert len(hub.payloads) > 1
+    assert all(len(p.encode("utf-8")) <= socketio_manager._MAX_PAYLOAD for p in hub.payloads)
+    assert receiver.delivered[0]["data"] == [{"orders": orders}]
+    assert receiver._chunks == {}
+
+
+async def test_sender_does_not_receive_own_message(workers, hub):
+    sender, receiver = workers
+
+    await sender.emit("chat_message", {"content": "hi"}, room="g1")
+    await _wait_for(lambda: receiver.delivered)
+    await asyncio.sleep(0.05)
+
+    # 本機只處理一次（emit 時直接送出），NOTIFY 回到自己時依 host_id 略過
+    assert len(sender.delivered) == 1
+    assert len(receiver.delivered) == 1
+
+
+async def test_listener_reconnects_after_disconnect(workers, hub):
+    sender, receiver = workers
+    receiver.connections[0].terminate()
+    await _wait_for(lambda: len(receiver.connections) == 2 and len(hub.listeners) == 3)
+
+    await sender.emit("order_update", {"action": "created"}, room="g1")
+    await _wait_for(lambda: receiver.delivered)
+
+    assert receiver.delivered[0]["data"] == [{"action": "created"}]